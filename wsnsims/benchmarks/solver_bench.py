@@ -0,0 +1,103 @@
+"""Tour quality versus wall-clock time for each registered tour solver"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from wsnsims.core import tour
+
+SIZES = [10, 30, 100, 300, 1000, 3000, 5000]
+
+#: The benchmark entry for each solver: the largest point count it is timed
+#: on. The refinement heuristics are quadratic (or worse) per pass, so they
+#: are capped to keep a full run reasonable.
+BENCHMARKS = {
+    'hull_insertion': 5000,
+    'nearest_neighbor_2opt': 1000,
+    'or_opt': 300,
+    'greedy_edge': 5000,
+}
+
+#: The limit used for solvers registered without a benchmark entry.
+DEFAULT_LIMIT = 1000
+
+# Tour lengths (m) over uniformly random points in a 1200 x 1200 m field
+# (seed 0), hull insertion versus greedy edge:
+#
+#   points   range 0          range 25         range 50         range 100
+#      300   17612 / 18755    13306 / 15490    11331 / 15116     7598 / 15042
+#     1200   35549 / 35133    21779 / 27543    16183 / 27385     9710 / 27387
+#     3000   57667 / 55236    28881 / 42649    18863 / 42504    10275 / 42429
+#
+# Greedy edge is 6 to 12 times faster (0.04 s versus 0.26 s at 1200 points),
+# but it orders the points as if the radio range were zero, so it only keeps
+# up with hull insertion at range 0. This is why the "auto" policy only
+# switches to it for tours without a radio range (see core.tour.AUTO_POLICY).
+
+
+def run(sizes, solvers, radio_ranges, repeat):
+    """
+    Time each solver over uniformly random point sets of each size, and
+    report its tour length relative to the hull insertion tour.
+
+    :param sizes: The point counts to benchmark
+    :type sizes: list(int)
+    :param solvers: The solver names to benchmark
+    :type solvers: list(str)
+    :param radio_ranges: The radio ranges to pass to each tour
+    :type radio_ranges: list(float)
+    :param repeat: The number of timings to take (the best is reported)
+    :type repeat: int
+    :return: None
+    """
+
+    print("{:>6} {:>6} {:>22} {:>10} {:>12} {:>8}".format(
+        "points", "range", "solver", "time (s)", "length", "ratio"))
+
+    for size, radio_range in itertools.product(sizes, radio_ranges):
+        points = np.random.rand(size, 2) * 1200.
+        baseline = None
+
+        for name in solvers:
+            if size > BENCHMARKS.get(name, DEFAULT_LIMIT):
+                continue
+
+            best = np.inf
+            route = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                route = tour.compute_tour(points, radio_range, solver=name)
+                best = min(best, time.perf_counter() - start)
+
+            if baseline is None:
+                baseline = route.length
+
+            print("{:>6} {:>6.0f} {:>22} {:>10.4f} {:>12.1f} {:>8.3f}".format(
+                size, radio_range, name, best, route.length,
+                route.length / baseline))
+
+
+def get_argparser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--solvers', nargs='+',
+                        default=list(tour.SOLVERS.keys()))
+    parser.add_argument('--radio-ranges', type=float, nargs='+',
+                        default=[0., 50., 100.])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def main():
+    parser = get_argparser()
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    run(args.sizes, args.solvers, args.radio_ranges, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
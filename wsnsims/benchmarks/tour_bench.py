@@ -0,0 +1,167 @@
+"""Side-by-side timing of the tour construction kernels"""
+
+import argparse
+import time
+
+import numpy as np
+import scipy.spatial as sp
+
+from wsnsims.core import linalg
+from wsnsims.core import tour
+
+SIZES = [10, 50, 100, 500, 1000, 2000, 5000]
+
+
+def reference_tour(points, radio_range=0.):
+    """
+    The original, scalar implementation of compute_tour(). Each interior point
+    is inserted by walking every edge of the tour and calling
+    linalg.closest_point() once per edge. This is kept only as a baseline for
+    benchmarking and for verifying that the vectorized kernel produces the
+    same tours.
+
+    :param points: The set of 2D points over which to find a path.
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param radio_range:
+    :type radio_range: float
+    :return: The tour path as a list of indexes into points
+    :rtype: np.array
+    """
+
+    if len(points) < 2:
+        return np.array(range(len(points)))
+
+    if len(points) == 2:
+        vertices = np.array([0, 1])
+    else:
+        hull = sp.ConvexHull(points, qhull_options='QJ Pp')
+        vertices = hull.vertices
+
+    path = list(vertices)
+
+    collection_points = np.empty_like(points)
+    center_of_mass = linalg.centroid(points[vertices])
+    for vertex in vertices:
+        if np.all(np.isclose(center_of_mass, points[vertex])):
+            collection_points[vertex] = np.copy(points[vertex])
+            continue
+
+        cp = center_of_mass - points[vertex]
+        cp /= np.linalg.norm(cp)
+        cp *= radio_range
+        cp += points[vertex]
+        collection_points[vertex] = cp
+
+    interior = np.arange(start=0, stop=len(points), step=1)
+    interior = np.delete(interior, vertices, 0)
+
+    for point_idx in interior:
+
+        closest_segment = -1
+        closest_distance = np.inf
+        closest_perp = np.zeros((1, 2))
+
+        p = points[point_idx]
+
+        tail = len(path) - 1
+        head = 0
+        while head < len(path):
+            start = collection_points[path[tail]]
+            end = collection_points[path[head]]
+
+            perp_len, perp_vec = linalg.closest_point(start, end, p)
+
+            if perp_len < closest_distance:
+                closest_segment = head
+                closest_distance = perp_len
+                closest_perp = perp_vec
+
+            tail = head
+            head += 1
+
+        path.insert(closest_segment, point_idx)
+
+        collect_point = closest_perp - p
+        radius = np.linalg.norm(collect_point)
+
+        if radius > radio_range:
+            collect_point /= radius
+            collect_point *= radio_range
+
+        collect_point += p
+        collection_points[point_idx] = collect_point
+
+    path.append(path[0])
+    return np.array(path)
+
+
+def _time(func, *args, repeat=1):
+    best = np.inf
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def run(sizes, radio_range, repeat, reference_limit):
+    """
+    Time the scalar reference against compute_tour() over uniformly random
+    point sets of each size.
+
+    :param sizes: The point counts to benchmark
+    :type sizes: list(int)
+    :param radio_range: The radio range passed to each tour
+    :type radio_range: float
+    :param repeat: The number of timings to take (the best is reported)
+    :type repeat: int
+    :param reference_limit: Skip the scalar reference above this size
+    :type reference_limit: int
+    :return: None
+    """
+
+    print("{:>6} {:>12} {:>12} {:>9} {:>9}".format(
+        "points", "scalar (s)", "vector (s)", "speedup", "same"))
+
+    for size in sizes:
+        points = np.random.rand(size, 2) * 1200.
+
+        vector_time, route = _time(tour.compute_tour, points, radio_range,
+                                   repeat=repeat)
+
+        if size > reference_limit:
+            print("{:>6} {:>12} {:>12.4f} {:>9} {:>9}".format(
+                size, "-", vector_time, "-", "-"))
+            continue
+
+        scalar_time, path = _time(reference_tour, points, radio_range,
+                                  repeat=repeat)
+
+        same = np.array_equal(path, route.vertices)
+        print("{:>6} {:>12.4f} {:>12.4f} {:>8.1f}x {:>9}".format(
+            size, scalar_time, vector_time, scalar_time / vector_time,
+            "yes" if same else "NO"))
+
+
+def get_argparser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--radio-range', type=float, default=100.)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reference-limit', type=int, default=max(SIZES))
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def main():
+    parser = get_argparser()
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    run(args.sizes, args.radio_range, args.repeat, args.reference_limit)
+
+
+if __name__ == '__main__':
+    main()
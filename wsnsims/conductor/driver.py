@@ -67,6 +67,8 @@ def run_tocs(parameters):
                       0.,
                       runner.average_energy(),
                       runner.max_buffer_size())
+    cache_stats = tocs_sim.traffic.release()
+    logger.debug("ToCS tour cache: %s", cache_stats)
 
     print("Finished ToCS in {} seconds".format(time.time() - start))
     return results
@@ -99,6 +101,8 @@ def run_flower(parameters):
                       0.,
                       runner.average_energy(),
                       runner.max_buffer_size())
+    cache_stats = flower_sim.traffic.release()
+    logger.debug("FLOWER tour cache: %s", cache_stats)
 
     print("Finished FLOWER in {} seconds".format(time.time() - start))
     return results
@@ -131,6 +135,8 @@ def run_minds(parameters):
                       0.,
                       runner.average_energy(),
                       runner.max_buffer_size())
+    cache_stats = minds_sim.traffic.release()
+    logger.debug("MINDS tour cache: %s", cache_stats)
 
     print("Finished MINDS in {} seconds".format(time.time() - start))
     return results
@@ -163,6 +169,8 @@ def run_focus(parameters):
                       0.,
                       runner.average_energy(),
                       runner.max_buffer_size())
+    cache_stats = focus_sim.traffic.release()
+    logger.debug("FOCUS tour cache: %s", cache_stats)
 
     print("Finished FOCUS in {} seconds".format(time.time() - start))
     return results
@@ -44,6 +44,9 @@ def run_sim(kwargs):
                 'energy_balance': runner.energy_balance(),
                 'max_buffer_size': runner.max_buffer_size(),
             }
+            cache_stats = simulator.traffic.release()
+            logger.debug("%s tour cache: %s", algorithm.__name__,
+                         cache_stats)
 
             complete = True
         except Exception:
@@ -1,15 +1,23 @@
+import collections
 import itertools
 import logging
 
 import numpy as np
+from scipy.spatial import cKDTree
 
-from wsnsims.core import tour, point
+from wsnsims.core import tour, point, tour_cache
 from ordered_set import OrderedSet
 
 from wsnsims.core import linalg
+from wsnsims.core import positions
+from wsnsims.core import spatial
 
 logger = logging.getLogger(__name__)
 
+#: The saved state of a cluster (see BaseCluster.snapshot())
+ClusterSnapshot = collections.namedtuple('ClusterSnapshot',
+                                         ['attributes', 'nodes', 'node_ids'])
+
 
 class BaseCluster(object):
     count = 0
@@ -37,6 +45,22 @@ class BaseCluster(object):
         #: set to None when a node is added or removed.
         self._tour = None
 
+        #: Cached locations of this cluster's nodes, in node order. This must
+        #: be set to None when a node is added or removed.
+        self._points = None
+
+        #: Cached KD-tree over self._points. This must be set to None when a
+        #: node is added or removed.
+        self._tree = None
+
+        #: The position store holding this cluster's nodes, if any
+        self._store = None
+
+        #: The row of each node in self._store, in node order, or None if the
+        #: nodes are not all in a single store. The array is replaced rather
+        #: than changed in place, so snapshots can share it.
+        self._rows = np.zeros(0, dtype=int)
+
         #: The current simulation environment
         self.env = environment
 
@@ -49,9 +73,115 @@ class BaseCluster(object):
         #: points).
         self._radio_range = self.env.comms_range
 
+        #: Membership indexes (see core.membership) to keep up to date as
+        #: nodes are added and removed.
+        self.membership_indexes = list()
+
     def _invalidate_cache(self) -> None:
         self._location = None
         self._tour = None
+        self._points = None
+        self._tree = None
+
+    def _spliced_tour(self, added=None, removed=None):
+        """
+        Splice a single node into or out of the cached tour, as done by
+        add() and remove() when incremental tours are enabled. The cached
+        tour itself is not modified.
+
+        :param added: The node to add, if any
+        :param removed: The node to remove, if any
+        :return: The edited tour, or None if incremental tours are disabled,
+                 there is no cached tour, the tour cannot be updated locally
+                 or it has grown more than env.tour_drift longer than at
+                 its last full computation
+        :rtype: core.tour.Tour | None
+        """
+
+        if not (self.env.incremental_tours and self._tour):
+            return None
+
+        if added is not None:
+            route = tour.insert_point(self._tour, added.location.nd, added,
+                                      radio_range=self._radio_range)
+        else:
+            index = self._tour.objects.index(removed)
+            route = tour.remove_point(self._tour, index)
+
+        if not route or route.drift > self.env.tour_drift:
+            return None
+
+        return route
+
+    def _update_cache(self, added=None, removed=None) -> None:
+        """
+        Update the cached values after a single node has been added or
+        removed. If incremental tours are enabled, the node is spliced into or
+        out of the cached tour. Otherwise, or if the tour cannot be updated
+        locally, or if it has drifted too far from a full computation, the
+        cache is simply invalidated.
+
+        :param added: The node that was just added, if any
+        :param removed: The node that was just removed, if any
+        :return: None
+        """
+
+        route = self._spliced_tour(added=added, removed=removed)
+        if not route:
+            self._invalidate_cache()
+            return
+
+        self._location = None
+        self._points = None
+        self._tree = None
+        self._tour = route
+
+    def rebuild_tour(self) -> tour.Tour:
+        """
+        Discard any incrementally maintained tour and compute it from scratch.
+
+        :return: The new tour
+        :rtype: core.tour.Tour
+        """
+        self._tour = None
+        return self.tour
+
+    def snapshot(self) -> ClusterSnapshot:
+        """
+        Save the state of the cluster so that a trial edit can be undone with
+        rollback(). Along with the node list, this keeps the cached tour and
+        location (and any subclass attributes, such as a relay node), so
+        nothing needs to be recomputed after rolling back.
+
+        :return: The saved state
+        :rtype: ClusterSnapshot
+        """
+        nodes = list(self._nodes)
+        return ClusterSnapshot(dict(vars(self)), nodes,
+                               [node.cluster_id for node in nodes])
+
+    def rollback(self, snapshot: ClusterSnapshot) -> None:
+        """
+        Restore the state saved by snapshot(). Nodes added since then are
+        released (unless another cluster has claimed them in the meantime),
+        and the saved nodes get back the cluster IDs they had.
+
+        :param snapshot: A state returned by snapshot() on this cluster
+        :type snapshot: ClusterSnapshot
+        :return: None
+        """
+        saved = set(snapshot.nodes)
+        for node in self._nodes:
+            if node not in saved and node.cluster_id == self.cluster_id:
+                node.cluster_id = -1
+
+        vars(self).update(snapshot.attributes)
+        self._nodes = list(snapshot.nodes)
+        for node, cluster_id in zip(snapshot.nodes, snapshot.node_ids):
+            node.cluster_id = cluster_id
+
+        for index in self.membership_indexes:
+            index.update(self)
 
     def __str__(self):
         return "Cluster {}".format(self.cluster_id)
@@ -77,47 +207,152 @@ class BaseCluster(object):
         self._relay_node = value
         self._invalidate_cache()
 
+        for index in self.membership_indexes:
+            index.update(self)
+
+    @property
+    def points(self):
+        """
+        The locations of this cluster's nodes (not including any relay node),
+        gathered from the scenario's position store.
+
+        :return: An N x 2 array, in the order of self.nodes
+        :rtype: np.array
+        """
+        if self._points is None:
+            if self._store is not None and self._rows is not None:
+                self._points = self._store.points[self._rows]
+            else:
+                self._points = positions.gather(self.nodes)
+
+        return self._points
+
+    @property
+    def tree(self):
+        """
+        A KD-tree over the locations of this cluster's nodes, for nearest
+        neighbour queries (see core.spatial).
+
+        :return: The tree, indexed in the order of self.nodes
+        :rtype: scipy.spatial.cKDTree
+        """
+        if self._tree is None:
+            self._tree = cKDTree(self.points)
+
+        return self._tree
+
     @property
     def location(self):
         if self._location:
             return self._location
 
-        points = [node.location.nd for node in self.nodes]
+        points = self.points
 
         # If we have a relay node, make sure to include it in the centroid
         # calculation.
         if self.relay_node:
-            points.append(self.relay_node.location.nd)
+            points = np.vstack((points, self.relay_node.location.nd))
 
-        location = linalg.centroid(np.array(points))
+        location = linalg.centroid(points)
         self._location = point.Vec2(location)
         return self._location
 
-    @property
-    def tour(self) -> tour.Tour:
-        if self._tour:
-            return self._tour
+    def _build_tour(self, nodes, points=None) -> tour.Tour:
+        """
+        Compute the tour over the given nodes (and the relay node, if any)
+        from scratch, without touching the cached tour.
+
+        :param nodes: The nodes to tour
+        :param points: The locations of the nodes, if already known
+        :type points: np.array
+        :return: The tour
+        :rtype: core.tour.Tour
+        """
 
-        points = [node.location.nd for node in self.nodes]
+        objects = list(nodes)
 
         # If we have a relay node, make sure to add it to the tour
         if self.relay_node:
-            points.append(self.relay_node.location.nd)
-
-        points = np.array(points)
-        self._tour = tour.compute_tour(points,
-                                       radio_range=self._radio_range)
+            objects.append(self.relay_node)
+
+        # Identical sets of nodes are frequently toured by different cluster
+        # objects (e.g., the trial merges in tocs.cluster.combine_clusters), so
+        # check the environment's tour cache first.
+        key = None
+        if self.env.tour_cache:
+            key = tour_cache.tour_key(objects, self._radio_range,
+                                      self.env.tour_solver)
+            cached = self.env.tours.get(key)
+            if cached:
+                return cached
+
+        if points is None:
+            points = positions.gather(nodes)
 
-        self._tour.objects = list(self.nodes)
         if self.relay_node:
-            self._tour.objects.append(self.relay_node)
+            points = np.vstack((points, self.relay_node.location.nd))
+
+        route = tour.compute_tour(points, radio_range=self._radio_range,
+                                  solver=self.env.tour_solver)
+        route.objects = objects
 
+        if key:
+            self.env.tours.put(key, route)
+
+        return route
+
+    @property
+    def tour(self) -> tour.Tour:
+        if self._tour:
+            return self._tour
+
+        self._tour = self._build_tour(self.nodes, self.points)
         return self._tour
 
     @property
     def tour_length(self):
         return self.tour.length
 
+    def tour_length_with(self, node):
+        """
+        Find the tour length this cluster would have after add(node), without
+        changing the cluster or its cached tour.
+
+        :param node: The node to (hypothetically) add
+        :return: The tour length with node added
+        :rtype: float
+        """
+
+        if node in self.nodes:
+            return self.tour_length
+
+        route = self._spliced_tour(added=node)
+        if not route:
+            points = np.vstack((self.points, node.location.nd))
+            route = self._build_tour(self.nodes + [node], points)
+
+        return route.length
+
+    def tour_length_without(self, node):
+        """
+        Find the tour length this cluster would have after remove(node),
+        without changing the cluster or its cached tour.
+
+        :param node: The node to (hypothetically) remove
+        :return: The tour length with node removed
+        :rtype: float
+        """
+
+        index = self.nodes.index(node)
+        nodes = self.nodes[:index] + self.nodes[index + 1:]
+
+        route = self._spliced_tour(removed=node)
+        if not route:
+            points = np.delete(self.points, index, axis=0)
+            route = self._build_tour(nodes, points)
+
+        return route.length
+
     @property
     def nodes(self):
         return self._nodes
@@ -125,6 +360,35 @@ class BaseCluster(object):
     @nodes.setter
     def nodes(self, value):
         self._nodes = value
+        self._store, self._rows = positions.locate(value)
+        if not value:
+            self._rows = np.zeros(0, dtype=int)
+        self._points = None
+        self._tree = None
+
+        for index in self.membership_indexes:
+            index.update(self)
+
+    def _add_row(self, node):
+        """
+        Record the store row of a node about to be appended to self.nodes.
+
+        :param node: The node being added
+        :return: None
+        """
+
+        if self._rows is None:
+            return
+
+        store = getattr(node, 'store', None)
+        if store is None or (self.nodes and store is not self._store):
+            # Nodes from several stores (or none) are gathered one by one
+            self._store = None
+            self._rows = None
+            return
+
+        self._store = store
+        self._rows = np.append(self._rows, node.position)
 
     def add(self, node):
         """
@@ -136,18 +400,32 @@ class BaseCluster(object):
         if node not in self.nodes:
             logger.debug("Adding %s to %s", node, self)
             node.cluster_id = self.cluster_id
+            self._add_row(node)
             self.nodes.append(node)
-            self._invalidate_cache()
+            self._update_cache(added=node)
+
+            for index in self.membership_indexes:
+                index.added(self, node)
         else:
             logger.debug("Re-added %s to %s", node, self)
             node.cluster_id = self.cluster_id
-            self._invalidate_cache()
+            if not self.env.incremental_tours:
+                self._invalidate_cache()
 
     def remove(self, node):
         logger.debug("Removing %s from %s", node, self)
-        self.nodes.remove(node)
+        index = self.nodes.index(node)
+        del self.nodes[index]
+        if not self.nodes:
+            self._store = None
+            self._rows = np.zeros(0, dtype=int)
+        elif self._rows is not None:
+            self._rows = np.delete(self._rows, index)
         node.cluster_id = -1
-        self._invalidate_cache()
+        self._update_cache(removed=node)
+
+        for index in self.membership_indexes:
+            index.removed(self, node)
 
     def merge(self, other):
         new_cluster = type(self)(self.env)
@@ -155,6 +433,13 @@ class BaseCluster(object):
         return new_cluster
 
 
+def _points(cluster):
+    if isinstance(cluster, BaseCluster):
+        return cluster.points
+
+    return positions.gather(cluster)
+
+
 def closest_nodes(cluster_1, cluster_2, dist=None):
     if isinstance(cluster_1, BaseCluster):
         node_list_1 = cluster_1.nodes
@@ -166,16 +451,25 @@ def closest_nodes(cluster_1, cluster_2, dist=None):
     else:
         node_list_2 = cluster_2
 
-    pairs = itertools.product(node_list_1, node_list_2)
-
     if dist:
+        pairs = itertools.product(node_list_1, node_list_2)
         decorated = [(dist(cell_1, cell_2), i, cell_1, cell_2) for
                      i, (cell_1, cell_2) in enumerate(pairs)]
-    else:
-        decorated = [(np.linalg.norm(cell_1.location.nd - cell_2.location.nd),
-                      i, cell_1, cell_2)
-                     for i, (cell_1, cell_2) in enumerate(pairs)]
 
-    closest = min(decorated)
-    cells = closest[2], closest[3]
+        closest = min(decorated)
+        cells = closest[2], closest[3]
+        return cells
+
+    # Clusters keep a KD-tree over their nodes, so query against one of
+    # those when we can.
+    points_1 = _points(cluster_1)
+    points_2 = _points(cluster_2)
+    tree_1 = tree_2 = None
+    if isinstance(cluster_2, BaseCluster):
+        tree_2 = cluster_2.tree
+    elif isinstance(cluster_1, BaseCluster):
+        tree_1 = cluster_1.tree
+
+    i, j = spatial.closest_pair(points_1, points_2, tree_1, tree_2)
+    cells = node_list_1[i], node_list_2[j]
     return cells
@@ -0,0 +1,141 @@
+"""Helpers for the cluster graphs of the relay-based simulations (MINDS and
+FOCUS), where two clusters are adjacent when their tours share a segment"""
+
+import numpy as np
+
+import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
+
+
+def branches(graph):
+    """
+    For every node of an undirected graph, find the groups of nodes that are
+    left disconnected from each other when that node is removed. This is
+    done with a single depth-first pass that tracks lowpoints, so cycles in
+    the graph are handled as well as trees.
+
+    A DFS child whose lowpoint does not reach above its parent is cut off by
+    removing the parent, so its whole subtree is one branch. Everything else
+    in the parent's connected component is a single branch, and every other
+    connected component is a branch of its own.
+
+    :param graph: The (symmetric) adjacency matrix of the graph
+    :type graph: sp.csr_matrix
+    :return: For each node, the list of node index arrays of its branches
+    :rtype: list(list(np.array))
+    """
+
+    graph = sp.csr_matrix(graph)
+    graph = graph + graph.T
+    graph.eliminate_zeros()
+    node_count = graph.shape[0]
+
+    _, labels = csgraph.connected_components(graph, directed=False)
+    neighbours = [graph.indices[graph.indptr[i]:graph.indptr[i + 1]]
+                  for i in range(node_count)]
+
+    discovered = np.full(node_count, -1, dtype=int)
+    low = np.zeros(node_count, dtype=int)
+    parents = np.full(node_count, -1, dtype=int)
+    subtrees = [[node] for node in range(node_count)]
+    separated = [list() for _ in range(node_count)]
+
+    timer = 0
+    for root in range(node_count):
+        if discovered[root] >= 0:
+            continue
+
+        discovered[root] = low[root] = timer
+        timer += 1
+        stack = [(root, iter(neighbours[root]))]
+        while stack:
+            node, remaining = stack[-1]
+            for neighbour in remaining:
+                if discovered[neighbour] < 0:
+                    parents[neighbour] = node
+                    discovered[neighbour] = low[neighbour] = timer
+                    timer += 1
+                    stack.append((neighbour, iter(neighbours[neighbour])))
+                    break
+
+                if neighbour != parents[node]:
+                    low[node] = min(low[node], discovered[neighbour])
+            else:
+                stack.pop()
+                parent = parents[node]
+                if parent < 0:
+                    continue
+
+                low[parent] = min(low[parent], low[node])
+                if low[node] >= discovered[parent]:
+                    separated[parent].append(subtrees[node])
+                subtrees[parent].extend(subtrees[node])
+
+    all_branches = list()
+    for node in range(node_count):
+        node_branches = [np.array(sorted(b)) for b in separated[node]]
+
+        in_component = labels == labels[node]
+        in_component[node] = False
+        for branch in node_branches:
+            in_component[branch] = False
+        if np.any(in_component):
+            node_branches.append(np.flatnonzero(in_component))
+
+        for label in np.unique(labels):
+            if label != labels[node]:
+                node_branches.append(np.flatnonzero(labels == label))
+
+        all_branches.append(node_branches)
+
+    return all_branches
+
+
+def relay_volumes(clusters, graph, traffic, intercluster_only=False):
+    """
+    Compute the data volume handled by every cluster of a relay-based
+    simulation. A cluster relays all traffic between its branches of the
+    cluster graph (see branches()), sends its own segments' traffic to every
+    segment outside of its tour and, optionally, carries the traffic between
+    the segments on its tour.
+
+    Each cluster's tour is reduced to a segment count vector, so the traffic
+    between any two groups of clusters comes from one K x K matrix of
+    cluster-to-cluster volumes.
+
+    :param clusters: The clusters, in the order of the graph's nodes
+    :type clusters: list(core.cluster.BaseCluster)
+    :param graph: The cluster adjacency graph
+    :type graph: sp.csr_matrix
+    :param traffic: The segment traffic for the scenario
+    :type traffic: core.data.TrafficMatrix
+    :param intercluster_only: Leave out the traffic between segments on the
+                              same tour
+    :type intercluster_only: bool
+    :return: The data volume of each cluster
+    :rtype: np.array
+    """
+
+    objects = np.zeros((len(clusters), len(traffic.segments)))
+    for i, cluster in enumerate(clusters):
+        np.add.at(objects[i], traffic.indexes(cluster.tour.objects), 1.)
+
+    sent = objects.dot(traffic.volumes)
+    cluster_traffic = sent.dot(objects.T)
+
+    volumes = np.zeros(len(clusters))
+    for i, cluster_branches in enumerate(branches(graph)):
+        weights = np.zeros((len(cluster_branches), len(clusters)))
+        for j, branch in enumerate(cluster_branches):
+            weights[j, branch] = 1.
+
+        branch_traffic = weights.dot(cluster_traffic).dot(weights.T)
+        volumes[i] = np.sum(branch_traffic) - np.trace(branch_traffic)
+
+    volumes += np.sum(sent, axis=1, where=objects == 0)
+
+    if not intercluster_only:
+        self_traffic = objects.dot(np.diag(traffic.volumes))
+        volumes += np.diag(cluster_traffic) - self_traffic
+
+    return volumes
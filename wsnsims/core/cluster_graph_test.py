@@ -0,0 +1,91 @@
+import itertools
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
+
+from wsnsims.core import cluster_graph
+from wsnsims.core import data
+from wsnsims.core import segment
+from wsnsims.core.environment import Environment
+
+
+def _removal_components(dense, node):
+    dense = np.copy(dense)
+    dense[node] = 0
+    dense[:, node] = 0
+    _, labels = csgraph.connected_components(dense, directed=False)
+
+    components = set()
+    for label in np.unique(np.delete(labels, node)):
+        members = np.flatnonzero(labels == label)
+        components.add(tuple(m for m in members if m != node))
+    return components
+
+
+def test_branches_match_node_removal():
+    np.random.seed(3)
+    for _ in range(50):
+        node_count = np.random.randint(1, 12)
+        dense = np.random.rand(node_count, node_count) < 0.25
+        dense = np.triu(dense, 1)
+        dense = (dense | dense.T).astype(float)
+
+        all_branches = cluster_graph.branches(sp.csr_matrix(dense))
+        for node, node_branches in enumerate(all_branches):
+            found = set(tuple(b) for b in node_branches)
+            assert len(found) == len(node_branches)
+            assert found == _removal_components(dense, node)
+
+
+class _Tour(object):
+    def __init__(self, objects):
+        self.objects = objects
+
+
+class _Cluster(object):
+    def __init__(self, objects):
+        self.tour = _Tour(objects)
+
+
+def test_relay_volumes_on_a_cycle():
+    env = Environment()
+    np.random.seed(5)
+    segments = [segment.Segment(nd) for nd in np.random.rand(9, 2)]
+    traffic = data.TrafficMatrix(segments, env)
+
+    # A triangle of clusters sharing relay segments, plus one leaf cluster
+    s = segments
+    clusters = [_Cluster([s[0], s[1], s[2]]),
+                _Cluster([s[2], s[3], s[4]]),
+                _Cluster([s[4], s[5], s[0]]),
+                _Cluster([s[4], s[6], s[7], s[8]])]
+    dense = np.zeros((4, 4))
+    for i, j in [(0, 1), (1, 2), (2, 0), (1, 3), (2, 3)]:
+        dense[i, j] = dense[j, i] = 1.
+
+    volumes = cluster_graph.relay_volumes(clusters, sp.csr_matrix(dense),
+                                          traffic)
+
+    # Removing any one cluster leaves the others connected, so nothing is
+    # relayed and only each cluster's own traffic counts.
+    for cluster, volume in zip(clusters, volumes):
+        objects = cluster.tour.objects
+        others = [seg for seg in segments if seg not in objects]
+        expected = traffic.block_sum(objects, others)
+        expected += traffic.pairwise_sum(objects)
+        assert np.isclose(volume, expected)
+
+    # Without the (2, 3) link, cluster 1 relays for the leaf cluster
+    dense[2, 3] = dense[3, 2] = 0.
+    volumes = cluster_graph.relay_volumes(clusters, sp.csr_matrix(dense),
+                                          traffic, intercluster_only=True)
+
+    objects = clusters[1].tour.objects
+    others = [seg for seg in segments if seg not in objects]
+    leaf = clusters[3].tour.objects
+    rest = clusters[0].tour.objects + clusters[2].tour.objects
+    expected = traffic.block_sum(objects, others)
+    for src, dst in itertools.permutations([leaf, rest]):
+        expected += traffic.block_sum(src, dst)
+    assert np.isclose(volumes[1], expected)
@@ -0,0 +1,191 @@
+import numpy as np
+
+from wsnsims.core import positions
+from wsnsims.core import segment
+from wsnsims.core.cluster import BaseCluster
+from wsnsims.core.environment import Environment
+
+
+def _square_cluster(env):
+    env.comms_range = 10.
+    clust = BaseCluster(env)
+    for nd in [[0, 0], [100, 0], [100, 100], [0, 100], [40, 50]]:
+        clust.add(segment.Segment(np.array(nd, dtype=float)))
+    return clust
+
+
+def _check_points(cluster):
+    expected = [node.location.nd for node in cluster.nodes]
+    assert np.array_equal(cluster.points, np.array(expected).reshape(-1, 2))
+
+
+def test_incremental_add_splices_into_cached_tour():
+    env = Environment()
+    env.incremental_tours = True
+    env.tour_drift = 1.
+    clust = _square_cluster(env)
+    original = clust.tour
+
+    seg = segment.Segment(np.array([60., 50.]))
+    clust.add(seg)
+
+    assert clust.tour is not original
+    assert clust.tour.edits == 1
+    assert seg in clust.tour.objects
+    assert sorted(clust.tour.vertices[:-1]) == list(range(6))
+
+    # The cached tour must not be modified in place
+    assert seg not in original.objects
+
+
+def test_incremental_remove_splices_out_of_cached_tour():
+    env = Environment()
+    env.incremental_tours = True
+    env.tour_drift = 1.
+    clust = _square_cluster(env)
+    interior = clust.nodes[-1]
+    full_length = clust.tour_length
+
+    clust.remove(interior)
+
+    assert clust.tour.edits == 1
+    assert interior not in clust.tour.objects
+    assert sorted(clust.tour.vertices[:-1]) == list(range(4))
+    assert clust.tour_length < full_length
+    assert np.isclose(clust.tour_length, clust.rebuild_tour().length)
+
+
+def test_points_outside_the_hull_force_a_rebuild():
+    env = Environment()
+    env.incremental_tours = True
+    env.tour_drift = 1.
+    clust = _square_cluster(env)
+    clust.tour
+
+    clust.add(segment.Segment(np.array([200., 50.])))
+    assert clust.tour.edits == 0
+    assert len(clust.tour.hull) == 5
+
+
+def test_drift_threshold_forces_a_rebuild():
+    env = Environment()
+    env.incremental_tours = True
+    env.tour_drift = 0.05
+    clust = _square_cluster(env)
+    full_length = clust.tour_length
+
+    # Splices that barely lengthen the tour are kept, however many there are
+    clust.add(segment.Segment(np.array([5., 50.])))
+    clust.add(segment.Segment(np.array([50., 95.])))
+    assert clust.tour.edits == 2
+    assert clust.tour.base_length == full_length
+    assert 0. < clust.tour.drift <= env.tour_drift
+
+    # A splice that takes the tour too far past its last full computation
+    # is replaced by a full computation
+    clust.add(segment.Segment(np.array([60., 50.])))
+    assert clust.tour.edits == 0
+    assert clust.tour.drift == 0.
+
+
+def test_rollback_restores_cached_state():
+    env = Environment()
+    clust = _square_cluster(env)
+    other = BaseCluster(env)
+    original_tour = clust.tour
+    original_location = clust.location
+    nodes = list(clust.nodes)
+
+    saved = clust.snapshot()
+    moved = nodes[1]
+    clust.remove(moved)
+    other.add(moved)
+    extra = segment.Segment(np.array([60., 50.]))
+    clust.add(extra)
+    clust.relay_node = nodes[0]
+    assert clust.tour is not original_tour
+
+    clust.rollback(saved)
+    assert clust.nodes == nodes
+    assert clust.tour is original_tour
+    assert clust.location is original_location
+    assert clust.relay_node is None
+    assert extra.cluster_id == -1
+    assert all(node.cluster_id == clust.cluster_id for node in nodes)
+
+
+def test_what_if_tour_lengths_leave_the_cluster_alone():
+    for incremental in (False, True):
+        env = Environment()
+        env.incremental_tours = incremental
+        env.tour_drift = 1.
+        clust = _square_cluster(env)
+        original = clust.tour
+        interior = clust.nodes[-1]
+        seg = segment.Segment(np.array([60., 50.]))
+
+        with_seg = clust.tour_length_with(seg)
+        without_interior = clust.tour_length_without(interior)
+        assert clust.tour is original
+        assert seg not in clust.nodes and interior in clust.nodes
+
+        clust.add(seg)
+        assert np.isclose(clust.tour_length, with_seg)
+        clust.remove(seg)
+        clust.remove(interior)
+        assert np.isclose(clust.tour_length, without_interior)
+
+
+def test_cached_tree_follows_node_edits():
+    env = Environment()
+    cluster = BaseCluster(env)
+    segments = [segment.Segment(np.array([x, 0.])) for x in (0., 10., 20.)]
+    for seg in segments[:2]:
+        cluster.add(seg)
+
+    assert cluster.tree.n == 2
+
+    cluster.add(segments[2])
+    assert cluster.tree.n == 3
+    _, index = cluster.tree.query([19., 0.])
+    assert cluster.nodes[index] is segments[2]
+
+    cluster.remove(segments[0])
+    assert np.array_equal(cluster.tree.data, cluster.points)
+
+
+def test_points_follow_node_edits():
+    env = Environment()
+    np.random.seed(12)
+    segments = [segment.Segment(nd) for nd in np.random.rand(20, 2) * 100.]
+    store = positions.PositionStore(segments)
+
+    cluster = BaseCluster(env)
+    for step in range(100):
+        chosen = segments[np.random.randint(len(segments))]
+        saved = cluster.snapshot()
+        if chosen in cluster.nodes:
+            cluster.remove(chosen)
+        else:
+            cluster.add(chosen)
+
+        _check_points(cluster)
+
+        if step % 4 == 0:
+            cluster.rollback(saved)
+            _check_points(cluster)
+
+    # Nodes from outside the position store still show up in the points
+    loose = segment.Segment(np.array([7., 7.]))
+    saved = cluster.snapshot()
+    cluster.add(loose)
+    _check_points(cluster)
+
+    cluster.remove(loose)
+    _check_points(cluster)
+
+    cluster.rollback(saved)
+    _check_points(cluster)
+
+    cluster.nodes = segments[:5]
+    _check_points(cluster)
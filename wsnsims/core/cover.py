@@ -0,0 +1,94 @@
+"""Set cover over sparse incidence matrices"""
+
+import heapq
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def row_groups(incidence):
+    """
+    Group the rows of a sparse incidence matrix that have the same pattern
+    (e.g., the cells that cover exactly the same segments).
+
+    :param incidence: An N x M sparse matrix
+    :type incidence: sp.spmatrix
+    :return: The group of each row. Groups are numbered in the order of the
+             first row in each.
+    :rtype: np.array
+    """
+
+    incidence = sp.csr_matrix(incidence)
+    incidence.sort_indices()
+    lengths = np.diff(incidence.indptr)
+    if not len(lengths):
+        return np.zeros(0, dtype=int)
+
+    # Lay each row's column indexes out in a padded dense block, so that
+    # identical rows are identical lines of the block.
+    block = np.full((len(lengths), max(1, np.max(lengths))), -1, dtype=int)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.arange(len(rows)) - np.repeat(incidence.indptr[:-1], lengths)
+    block[rows, offsets] = incidence.indices
+
+    _, first, inverse = np.unique(block, axis=0, return_index=True,
+                                  return_inverse=True)
+
+    ranks = np.empty(len(first), dtype=int)
+    ranks[np.argsort(first)] = np.arange(len(first))
+    return ranks[np.ravel(inverse)]
+
+
+def greedy_cover(incidence):
+    """
+    Find a set cover with the greedy heuristic: repeatedly take the set (row)
+    covering the most columns not yet covered, with ties going to the first
+    such row. Gains only ever shrink as the cover grows, so the rows are kept
+    in a priority queue of possibly stale gains, and a row's gain is only
+    measured again when it reaches the front of the queue (the "lazy greedy"
+    method). The result is the same as measuring every row on every pick.
+
+    :param incidence: An N x M sparse matrix where entry [i, j] is non-zero
+                      if set i contains element j
+    :type incidence: sp.spmatrix
+    :return: The rows chosen, in the order they were picked
+    :rtype: list(int)
+    :raises ValueError: If some column is in none of the sets
+    """
+
+    incidence = sp.csr_matrix(incidence)
+    incidence.eliminate_zeros()
+
+    uncovered = np.ones(incidence.shape[1], dtype=bool)
+    uncovered[incidence.indices] = False
+    if np.any(uncovered):
+        raise ValueError("Columns {} are in none of the sets".format(
+            np.flatnonzero(uncovered)))
+
+    uncovered[:] = True
+    remaining = len(uncovered)
+
+    lengths = np.diff(incidence.indptr)
+    queue = [(-gain, row) for row, gain in enumerate(lengths) if gain]
+    heapq.heapify(queue)
+
+    cover = list()
+    while remaining:
+        stale_gain, row = heapq.heappop(queue)
+
+        columns = incidence.indices[
+            incidence.indptr[row]:incidence.indptr[row + 1]]
+        columns = columns[uncovered[columns]]
+        gain = len(columns)
+
+        if gain == -stale_gain:
+            # No row behind this one can do better, as their gains are only
+            # upper bounds, and earlier rows with equal gains sort first.
+            uncovered[columns] = False
+            remaining -= gain
+            cover.append(row)
+
+        elif gain:
+            heapq.heappush(queue, (-gain, row))
+
+    return cover
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from wsnsims.core import cover
+
+
+def _naive_cover(sets, count):
+    uncovered = set(range(count))
+    picks = list()
+    while uncovered:
+        selected = max(range(len(sets)),
+                       key=lambda i: len(uncovered.intersection(sets[i])))
+        uncovered -= sets[selected]
+        picks.append(selected)
+
+    return picks
+
+
+def test_greedy_cover_matches_naive_greedy():
+    np.random.seed(11)
+    for _ in range(50):
+        # Small, dense instances, so there are many ties between gains
+        matrix = np.random.rand(15, 12) < 0.25
+        matrix[np.random.randint(15, size=12), np.arange(12)] = True
+        sets = [set(np.flatnonzero(row)) for row in matrix]
+
+        assert cover.greedy_cover(sp.csr_matrix(matrix)) == _naive_cover(
+            sets, 12)
+
+
+def test_greedy_cover_rejects_uncoverable_columns():
+    matrix = sp.csr_matrix(np.array([[1, 0, 0], [1, 1, 0]]))
+    with pytest.raises(ValueError):
+        cover.greedy_cover(matrix)
+
+
+def test_row_groups_number_patterns_by_first_row():
+    matrix = np.array([[0, 1, 1],
+                       [1, 0, 0],
+                       [0, 1, 1],
+                       [0, 0, 0],
+                       [1, 0, 0],
+                       [1, 1, 1]])
+
+    groups = cover.row_groups(sp.csr_matrix(matrix))
+    assert list(groups) == [0, 1, 0, 2, 1, 3]
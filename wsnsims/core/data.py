@@ -1,13 +1,107 @@
+import logging
+
 import numpy as np
 
-data_memo = {}
+logger = logging.getLogger(__name__)
+
+
+class TrafficMatrix(object):
+    def __init__(self, segments, env):
+        """
+        The data volume sent between every ordered pair of segments in a
+        scenario. All volumes are drawn once, up front, and each segment is
+        given its integer index into the matrix (see Segment.index). This
+        lets volume totals over groups of segments be computed as block sums
+        rather than one lookup per pair.
+
+        :param segments: All segments in the scenario
+        :type segments: list(core.segment.Segment)
+        :param env:
+        :type env: core.environment.Environment
+        """
+
+        #: The segments in the order of the matrix rows and columns
+        self.segments = list(segments)
+        for index, seg in enumerate(self.segments):
+            seg.index = index
+
+        count = len(self.segments)
+
+        #: The volume sent from segments[i] to segments[j] is volumes[i, j]
+        self.volumes = np.random.normal(env.isdva, env.isdvsd,
+                                        size=(count, count))
+
+        #: Aggregated volumes derived from this matrix (e.g., the FLOWER cell
+        #: traffic, see flower.data.cell_traffic()), by key. These live only
+        #: as long as the scenario does (see release()).
+        self.aggregates = dict()
+
+        #: The scenario's tour cache, cleared along with the volumes
+        self._tours = env.tours
+
+    def release(self):
+        """
+        Drop any aggregated volumes and tours cached for this scenario. This
+        should be called once the metrics for a run have been extracted.
+
+        :return: The scenario's tour cache counters, as they were just before
+                 the release
+        :rtype: core.tour_cache.CacheStats
+        """
+
+        stats = self._tours.stats()
+        logger.debug("Releasing %d aggregated volumes and %d tours "
+                     "(%d hits, %d misses, %d evictions)",
+                     len(self.aggregates), stats.entries, stats.hits,
+                     stats.misses, stats.evictions)
+        self.aggregates.clear()
+        self._tours.clear()
+        return stats
+
+    def indexes(self, segments):
+        """
+        :param segments: A collection of segments from this scenario
+        :return: The matrix indexes of the segments
+        :rtype: np.array
+        """
+        return np.fromiter((seg.index for seg in segments), dtype=int)
+
+    def volume(self, src, dst):
+        """
+        :param src: The sending segment
+        :type src: core.segment.Segment
+        :param dst: The receiving segment
+        :type dst: core.segment.Segment
+        :return: The data volume sent from src to dst
+        :rtype: float
+        """
+        return self.volumes[src.index, dst.index]
+
+    def block_sum(self, src_segments, dst_segments):
+        """
+        Sum the volumes over every (src, dst) pair in the product of two
+        groups of segments. This is the block sum equivalent of
+        itertools.product(src_segments, dst_segments).
 
+        :param src_segments: The sending segments
+        :param dst_segments: The receiving segments
+        :return: The total data volume
+        :rtype: float
+        """
+        src = self.indexes(src_segments)
+        dst = self.indexes(dst_segments)
+        return np.sum(self.volumes[np.ix_(src, dst)])
 
-def segment_volume(src, dst, env):
-    if (src, dst) in data_memo:
-        return data_memo[(src, dst)]
+    def pairwise_sum(self, segments):
+        """
+        Sum the volumes between every ordered pair of distinct segments in a
+        group. This is the block sum equivalent of
+        itertools.permutations(segments, 2).
 
-    size = np.random.normal(env.isdva, env.isdvsd)
-    # size *= env.isdva.units
-    data_memo[(src, dst)] = size
-    return size
+        :param segments: The segments exchanging data
+        :return: The total data volume
+        :rtype: float
+        """
+        indexes = self.indexes(segments)
+        block = self.volumes[np.ix_(indexes, indexes)]
+        return np.sum(block) - np.trace(block)
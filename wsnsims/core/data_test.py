@@ -0,0 +1,65 @@
+import itertools
+
+import numpy as np
+
+from wsnsims.core import data
+from wsnsims.core import segment
+from wsnsims.core.cluster import BaseCluster
+from wsnsims.core.environment import Environment
+
+
+def _traffic(count):
+    env = Environment()
+    np.random.seed(3)
+    segments = [segment.Segment(nd) for nd in np.random.rand(count, 2)]
+    return segments, data.TrafficMatrix(segments, env)
+
+
+def test_segments_are_indexed_in_order():
+    segments, traffic = _traffic(8)
+    assert [seg.index for seg in segments] == list(range(8))
+    assert traffic.volumes.shape == (8, 8)
+
+
+def test_block_sum_matches_pairwise_volumes():
+    segments, traffic = _traffic(12)
+    src = segments[:5]
+    dst = segments[3:9]
+
+    expected = sum(traffic.volume(s, d)
+                   for s, d in itertools.product(src, dst))
+    assert np.isclose(traffic.block_sum(src, dst), expected)
+
+
+def test_pairwise_sum_skips_self_traffic():
+    segments, traffic = _traffic(12)
+    group = segments[2:7]
+
+    expected = sum(traffic.volume(s, d)
+                   for s, d in itertools.permutations(group, 2))
+    assert np.isclose(traffic.pairwise_sum(group), expected)
+    assert traffic.pairwise_sum([]) == 0.
+
+
+def test_release_drops_aggregated_volumes():
+    segments, traffic = _traffic(4)
+    traffic.aggregates['total'] = np.sum(traffic.volumes)
+
+    traffic.release()
+    assert not traffic.aggregates
+
+
+def test_release_reports_tour_cache_stats():
+    env = Environment()
+    env.tour_cache = True
+    segments = [segment.Segment(nd) for nd in np.random.rand(6, 2) * 100.]
+    traffic = data.TrafficMatrix(segments, env)
+
+    for _ in range(2):
+        cluster = BaseCluster(env)
+        cluster.nodes = list(segments)
+        assert cluster.tour
+
+    stats = traffic.release()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert len(env.tours) == 0
@@ -0,0 +1,42 @@
+"""Helpers used by the runners to build all-pairs communication delays"""
+
+import numpy as np
+
+
+def transmission_counts(memberships, hub):
+    """
+    Find the number of transmissions needed between every pair of nodes in a
+    hub-and-spoke layout (as used by ToCS and FLOWER). Data within a cluster
+    is sent once, data to or from the hub cluster is sent twice and all other
+    data is relayed through the hub, so it is sent three times.
+
+    :param memberships: The cluster number of each node
+    :type memberships: np.array
+    :param hub: The cluster number of the hub (or centroid) cluster
+    :type hub: int
+    :return: An N x N matrix of transmission counts
+    :rtype: np.array
+    """
+
+    memberships = np.asarray(memberships)
+    same = memberships[:, np.newaxis] == memberships[np.newaxis, :]
+    on_hub = memberships == hub
+    via_hub = on_hub[:, np.newaxis] | on_hub[np.newaxis, :]
+
+    counts = np.full(same.shape, 3)
+    counts[via_hub] = 2
+    counts[same] = 1
+    return counts
+
+
+def pair_delays(delays):
+    """
+    Flatten an all-pairs delay matrix into the delays between distinct nodes.
+    The diagonal is ignored.
+
+    :param delays: An N x N matrix of delays
+    :type delays: np.array
+    :return: The N * (N - 1) off-diagonal delays, in row-major order
+    :rtype: np.array
+    """
+    return delays[~np.eye(len(delays), dtype=bool)]
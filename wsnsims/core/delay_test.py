@@ -0,0 +1,21 @@
+import numpy as np
+
+from wsnsims.core import delay
+
+
+def test_transmission_counts_follow_the_hub():
+    # Nodes 0 and 1 share a cluster, node 2 is on the hub (cluster 0) and
+    # node 3 is in a cluster of its own.
+    counts = delay.transmission_counts([1, 1, 0, 2], hub=0)
+
+    assert counts[0, 1] == 1
+    assert counts[0, 2] == 2
+    assert counts[2, 3] == 2
+    assert counts[0, 3] == 3
+    assert counts[3, 1] == 3
+    assert np.all(np.diag(counts) == 1)
+
+
+def test_pair_delays_skip_the_diagonal():
+    delays = np.arange(9.).reshape((3, 3))
+    assert list(delay.pair_delays(delays)) == [1., 2., 3., 5., 6., 7.]
@@ -1,3 +1,6 @@
+from wsnsims.core import tour_cache
+
+
 class Environment(object):
     def __init__(self):
         # Common things to change
@@ -21,6 +24,29 @@ class Environment(object):
         self.grid_width = 1200. # * pq.m
         self.grid_height = 1200. # * pq.m
 
+        # The TSP solver used for cluster tours. See core.tour.SOLVERS for the
+        # available solvers, or use "auto" to choose one by cluster size (see
+        # core.tour.AUTO_POLICY).
+        self.tour_solver = 'hull_insertion'
+
+        # Share computed tours between clusters that tour the same nodes, in
+        # the same order (the tour solvers depend on input order, so only an
+        # identical sequence gives the same tour). This is opt-in: the
+        # simulations rarely tour an identical sequence twice, so the cache
+        # mostly holds tours that are never reused. The tours are kept in
+        # self.tours, which lives only as long as this environment (and is
+        # cleared by TrafficMatrix.release()).
+        self.tour_cache = False
+        self.tours = tour_cache.TourCache()
+
+        # Cluster tour maintenance. When incremental_tours is set, adding or
+        # removing a single node splices it into (or out of) the cached tour
+        # instead of recomputing it. A full recomputation happens once a
+        # spliced tour has grown by more than the fraction tour_drift of its
+        # length at the last full computation (see core.tour.Tour.drift).
+        self.incremental_tours = False
+        self.tour_drift = 0.25
+
     @property
     def comms_cost(self):
         """ The energy required to transmit 1 bit in J/Mb """
@@ -25,9 +25,81 @@ def closest_point(v, w, p):
     vw = w - v
     len_squared = np.dot(vw, vw)
     if 0. == len_squared:
-        # Handles the case when v == w
-        projection = v
+        # Handles the case when v == w. Return a copy, as callers may modify
+        # the projection in place.
+        projection = np.copy(v)
     else:
         t = max(0., min(1., np.dot((p - v), vw) / len_squared))
         projection = v + t * vw
     return np.linalg.norm(projection - p), projection
+
+
+def inside_polygon(polygon, p):
+    """
+    Determine if p lies inside (or on the boundary of) a convex polygon.
+
+    :param polygon: The polygon vertices in counter-clockwise order, as
+                    returned by scipy.spatial.ConvexHull for 2D points.
+    :type polygon: numpy.array laid out as [[3,4], [9,2], ...]
+    :param p: The point to test
+    :type p: numpy.array
+
+    :return: True if p is inside the polygon, False otherwise
+    :rtype: bool
+    """
+    edges = np.roll(polygon, -1, axis=0) - polygon
+    offsets = p - polygon
+    cross = edges[:, 0] * offsets[:, 1] - edges[:, 1] * offsets[:, 0]
+    return bool(np.all(cross >= 0.))
+
+
+def row_dot(a, b):
+    """
+    Compute the dot product of each row of a with the matching row of b.
+
+    This deliberately goes through matmul rather than an elementwise multiply
+    and sum, so that each result is rounded exactly as np.dot() would round it
+    for a single pair of vectors.
+
+    :param a: The left-hand vectors
+    :type a: numpy.array laid out as [[3,4], [9,2], ...]
+    :param b: The right-hand vectors
+    :type b: numpy.array laid out as [[3,4], [9,2], ...]
+    :return: The dot product of each pair of rows
+    :rtype: numpy.array
+    """
+    return np.matmul(a[:, np.newaxis, :], b[:, :, np.newaxis])[:, 0, 0]
+
+
+def closest_points(starts, ends, p):
+    """
+    Vectorized form of closest_point(). Find the point closest to p on each of
+    the line segments described by the rows of starts and ends. The results
+    are identical to calling closest_point() once per line segment.
+
+    :param starts: The first endpoint of each line segment
+    :type starts: numpy.array laid out as [[3,4], [9,2], ...]
+    :param ends: The second endpoint of each line segment
+    :type ends: numpy.array laid out as [[3,4], [9,2], ...]
+    :param p: The point to project onto each line segment, or one point per
+              line segment.
+    :type p: numpy.array
+
+    :return: The distance from p to each line segment, and the projection of p
+             onto each line segment.
+    :rtype: (numpy.array, numpy.array)
+    """
+    vw = ends - starts
+    len_squared = row_dot(vw, vw)
+
+    # Handles the case when a segment has v == w by leaving t at zero, so the
+    # projection collapses to the start point.
+    t = row_dot(p - starts, vw)
+    t = np.divide(t, len_squared, out=np.zeros_like(t),
+                  where=(len_squared != 0.))
+    np.clip(t, 0., 1., out=t)
+
+    projections = starts + t[:, np.newaxis] * vw
+    delta = projections - p
+    distances = np.sqrt(row_dot(delta, delta))
+    return distances, projections
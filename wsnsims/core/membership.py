@@ -0,0 +1,240 @@
+"""Cluster membership lookups that avoid scanning every cluster"""
+
+import numpy as np
+
+
+class MembershipIndex(object):
+    def __init__(self, clusters, relays=True):
+        """
+        Track which of a set of clusters hold each object (segment or cell).
+        An object may be held by several clusters (e.g., a relay segment
+        shared by neighbouring tours). Once built, the index is kept up to
+        date by the clusters themselves as nodes are added and removed (see
+        core.cluster.BaseCluster).
+
+        :param clusters: The clusters to index. The position of a cluster in
+                         this list is its index in all bulk queries.
+        :type clusters: list(core.cluster.BaseCluster)
+        :param relays: Count each cluster's relay node as one of its members
+        :type relays: bool
+        """
+
+        #: The indexed clusters, in order
+        self.clusters = list(clusters)
+
+        #: Whether relay nodes count as members of their clusters
+        self.relays = relays
+
+        #: The position of each cluster in self.clusters
+        self._positions = {c: i for i, c in enumerate(self.clusters)}
+
+        #: Cluster ID to cluster lookups, refreshed when IDs change
+        self._ids = dict()
+
+        #: The row of each object in self._members
+        self._rows = dict()
+
+        #: The object in each row of self._members
+        self._objects = list()
+
+        #: Entry [i, j] is True if self._objects[i] is in self.clusters[j].
+        #: Rows are allocated in blocks, so only the first len(self._objects)
+        #: are in use.
+        self._members = np.zeros((0, len(self.clusters)), dtype=bool)
+
+        for cluster in self.clusters:
+            cluster.membership_indexes.append(self)
+            self.update(cluster)
+
+    def detach(self):
+        """
+        Stop following changes to the indexed clusters.
+
+        :return: None
+        """
+        for cluster in self.clusters:
+            if self in cluster.membership_indexes:
+                cluster.membership_indexes.remove(self)
+
+    def _row(self, obj):
+        """
+        :return: The row of an object, allocating one if needed
+        :rtype: int
+        """
+        row = self._rows.get(obj)
+        if row is not None:
+            return row
+
+        row = len(self._objects)
+        if row == len(self._members):
+            grown = np.zeros((max(2 * row, 16), len(self.clusters)),
+                             dtype=bool)
+            grown[:row] = self._members
+            self._members = grown
+
+        self._rows[obj] = row
+        self._objects.append(obj)
+        return row
+
+    def _nodes(self, cluster):
+        """
+        :return: The members of a cluster
+        :rtype: list
+        """
+        nodes = list(cluster.nodes)
+        if self.relays and cluster.relay_node:
+            nodes.append(cluster.relay_node)
+
+        return nodes
+
+    def update(self, cluster):
+        """
+        Re-read all of the members of a cluster.
+
+        :param cluster: An indexed cluster
+        :type cluster: core.cluster.BaseCluster
+        :return: None
+        """
+        rows = [self._row(node) for node in self._nodes(cluster)]
+
+        column = self._positions[cluster]
+        self._members[:, column] = False
+        self._members[rows, column] = True
+
+    def added(self, cluster, node):
+        """
+        Record a node just added to a cluster.
+
+        :param cluster: An indexed cluster
+        :type cluster: core.cluster.BaseCluster
+        :param node: The added node
+        :return: None
+        """
+        self._members[self._row(node), self._positions[cluster]] = True
+
+    def removed(self, cluster, node):
+        """
+        Record a node just removed from a cluster. The node stays a member if
+        it is still the cluster's relay node.
+
+        :param cluster: An indexed cluster
+        :type cluster: core.cluster.BaseCluster
+        :param node: The removed node
+        :return: None
+        """
+        row = self._row(node)
+        self._members[row, self._positions[cluster]] = (
+            self.relays and node is cluster.relay_node)
+
+    def index(self, cluster):
+        """
+        :param cluster: An indexed cluster
+        :type cluster: core.cluster.BaseCluster
+        :return: The position of the cluster in self.clusters
+        :rtype: int
+        """
+        return self._positions[cluster]
+
+    def find(self, cluster_id):
+        """
+        Look up a cluster by its ID. As with a scan of self.clusters, the
+        first cluster with the ID is returned.
+
+        :param cluster_id: The ID to look for
+        :type cluster_id: int
+        :return: The cluster, or None if no indexed cluster has the ID
+        :rtype: core.cluster.BaseCluster | None
+        """
+        cluster = self._ids.get(cluster_id)
+        if cluster is None or cluster.cluster_id != cluster_id:
+            self._ids = {c.cluster_id: c for c in reversed(self.clusters)}
+            cluster = self._ids.get(cluster_id)
+
+        return cluster
+
+    def clusters_of(self, obj):
+        """
+        :param obj: A segment or cell
+        :return: The clusters holding the object, in index order
+        :rtype: list(core.cluster.BaseCluster)
+        """
+        row = self._rows.get(obj)
+        if row is None:
+            return list()
+
+        return [self.clusters[i] for i in np.flatnonzero(self._members[row])]
+
+    def rows(self, objects):
+        """
+        Find the rows of many objects in the membership table at once.
+
+        :param objects: The objects to look up
+        :type objects: list
+        :return: The row of each object, or -1 for objects the index has not
+                 seen
+        :rtype: np.array
+        """
+        return np.fromiter((self._rows.get(obj, -1) for obj in objects),
+                           dtype=int, count=len(objects))
+
+    def membership_matrix(self, objects=None):
+        """
+        Get the membership of many objects at once.
+
+        :param objects: The objects to look up, or None for every object the
+                        index has seen (in the order they were first seen)
+        :type objects: list
+        :return: An N x K matrix where entry [i, j] is True if objects[i] is
+                 in self.clusters[j]
+        :rtype: np.array
+        """
+        if objects is None:
+            return self._members[:len(self._objects)].copy()
+
+        rows = self.rows(objects)
+        known = rows >= 0
+
+        matrix = np.zeros((len(objects), len(self.clusters)), dtype=bool)
+        matrix[known] = self._members[rows[known]]
+        return matrix
+
+    def cluster_indexes(self, objects):
+        """
+        Find the first cluster holding each of many objects.
+
+        :param objects: The objects to look up
+        :type objects: list
+        :return: The position in self.clusters of the first cluster holding
+                 each object, or -1 for objects in no cluster
+        :rtype: np.array
+        """
+        matrix = self.membership_matrix(objects)
+        return np.where(np.any(matrix, axis=1), np.argmax(matrix, axis=1), -1)
+
+
+def refresh(index, clusters, relays=True):
+    """
+    Get a membership index over a list of clusters, reusing an existing
+    index if it covers exactly the same clusters. Otherwise, the old index
+    (if any) is detached and a new one is built. This lets a simulation keep
+    a single index while its list of clusters changes.
+
+    :param index: The current index, if any
+    :type index: MembershipIndex | None
+    :param clusters: The clusters to index
+    :type clusters: list(core.cluster.BaseCluster)
+    :param relays: Count each cluster's relay node as one of its members
+    :type relays: bool
+    :return: An index over the clusters
+    :rtype: MembershipIndex
+    """
+
+    if index and index.relays == relays and len(index.clusters) == len(
+            clusters) and all(a is b for a, b in zip(index.clusters,
+                                                     clusters)):
+        return index
+
+    if index:
+        index.detach()
+
+    return MembershipIndex(clusters, relays=relays)
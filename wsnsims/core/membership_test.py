@@ -0,0 +1,70 @@
+import numpy as np
+
+from wsnsims.core import membership
+from wsnsims.core import segment
+from wsnsims.core.cluster import BaseCluster
+from wsnsims.core.environment import Environment
+
+
+def _scan(clusters, obj):
+    return [c for c in clusters if obj in c.nodes or obj is c.relay_node]
+
+
+def test_index_follows_cluster_edits():
+    env = Environment()
+    np.random.seed(2)
+    segments = [segment.Segment(loc) for loc in np.random.rand(10, 2) * 100.]
+
+    clusters = [BaseCluster(env) for _ in range(3)]
+    for i, seg in enumerate(segments[:9]):
+        clusters[i % 3].add(seg)
+
+    index = membership.MembershipIndex(clusters)
+
+    # Shared relay nodes, single moves and a trial edit that is rolled back
+    clusters[0].relay_node = segments[1]
+    clusters[2].relay_node = segments[9]
+    clusters[1].remove(segments[4])
+    clusters[2].add(segments[4])
+    saved = clusters[0].snapshot()
+    clusters[0].add(segments[9])
+    clusters[0].remove(segments[0])
+    clusters[0].rollback(saved)
+
+    for seg in segments:
+        assert index.clusters_of(seg) == _scan(clusters, seg)
+
+    matrix = index.membership_matrix(segments)
+    for i, seg in enumerate(segments):
+        expected = [clusters.index(c) for c in _scan(clusters, seg)]
+        assert list(np.flatnonzero(matrix[i])) == expected
+
+    first = index.cluster_indexes(segments)
+    assert list(first) == [clusters.index(_scan(clusters, seg)[0])
+                           for seg in segments]
+
+    # Objects the index has never seen are in no cluster
+    unseen = segment.Segment(np.array([0., 0.]))
+    assert index.rows([unseen, segments[0]])[0] == -1
+    assert not np.any(index.membership_matrix([unseen, segments[0]])[0])
+    assert index.cluster_indexes([unseen])[0] == -1
+
+    for cluster in clusters:
+        assert index.find(cluster.cluster_id) is cluster
+        assert index.index(cluster) == clusters.index(cluster)
+
+    clusters[1].cluster_id = 1000
+    assert index.find(1000) is clusters[1]
+
+
+def test_refresh_rebuilds_when_clusters_change():
+    env = Environment()
+    clusters = [BaseCluster(env) for _ in range(2)]
+
+    index = membership.refresh(None, clusters)
+    assert membership.refresh(index, list(clusters)) is index
+
+    new_index = membership.refresh(index, clusters[:1])
+    assert new_index is not index
+    assert index not in clusters[0].membership_indexes
+    assert new_index in clusters[0].membership_indexes
@@ -0,0 +1,722 @@
+"""Shortest path support shared by the movement models"""
+
+import collections
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.csgraph as csgraph
+
+
+def tour_graph(tours, indexes, node_count, points='collection_points'):
+    """
+    Build the sparse, directed graph formed by a set of cluster tours. Each
+    tour contributes an edge from every stop to the next one, weighted by the
+    distance between them. The edges are collected directly in coordinate
+    form, so only O(E) memory is used no matter how many nodes there are.
+
+    When several tours share an edge, the tour that comes last wins. Zero
+    length edges are kept as explicit entries, so they remain edges for the
+    scipy.sparse.csgraph routines.
+
+    :param tours: The tours to join
+    :type tours: list(core.tour.Tour)
+    :param indexes: The graph node index of every object on the tours
+    :type indexes: dict
+    :param node_count: The total number of nodes in the graph
+    :type node_count: int
+    :param points: The attribute of each tour holding the stop locations
+                   (e.g., "collection_points" or "points")
+    :type points: str
+    :return: The node_count x node_count adjacency matrix
+    :rtype: sp.csr_matrix
+    """
+
+    edges = dict()
+    for route in tours:
+        stops = np.asarray(route.vertices)
+        starts = np.roll(stops, 1)
+
+        locations = getattr(route, points)
+        distances = np.linalg.norm(locations[stops] - locations[starts],
+                                   axis=1)
+
+        for start, stop, distance in zip(starts, stops, distances):
+            start_index = indexes[route.objects[start]]
+            stop_index = indexes[route.objects[stop]]
+            edges[(start_index, stop_index)] = distance
+
+    rows = np.fromiter((edge[0] for edge in edges), dtype=int,
+                       count=len(edges))
+    columns = np.fromiter((edge[1] for edge in edges), dtype=int,
+                          count=len(edges))
+    weights = np.fromiter(edges.values(), dtype=float, count=len(edges))
+
+    return sp.csr_matrix((weights, (rows, columns)),
+                         shape=(node_count, node_count))
+
+
+def tour_cycles(tours, indexes):
+    """
+    List the graph nodes visited by each tour, in tour order. These are the
+    directed cycles that make up the graph built by tour_graph().
+
+    :param tours: The tours to list
+    :type tours: list(core.tour.Tour)
+    :param indexes: The graph node index of every object on the tours
+    :type indexes: dict
+    :return: The node indexes of each tour (without the closing stop)
+    :rtype: list(np.array)
+    """
+
+    cycles = list()
+    for route in tours:
+        vertices = route.vertices
+        if len(vertices) > 1:
+            vertices = vertices[:-1]
+
+        cycles.append(np.fromiter((indexes[route.objects[v]] for v in vertices),
+                                  dtype=int, count=len(vertices)))
+
+    return cycles
+
+
+def edge_clusters(cycles, memberships):
+    """
+    Label every edge of the tour cycles with the cluster a path is counted
+    as passing through when it uses that edge. This is the rule the MINDS and
+    FOCUS runners use for the clusters a path passes through: a hop onto or
+    off a relay segment counts the cluster of its other end, a hop between
+    two relay segments counts the first cluster they share and any other hop
+    counts nothing. The rule is symmetric, so it does not matter which way
+    the edge is used.
+
+    :param cycles: The node indexes of each tour, as from tour_cycles()
+    :type cycles: list(np.array)
+    :param memberships: For each node index, the (sorted) indexes of the
+                        clusters whose tours visit it
+    :type memberships: dict
+    :return: For each cycle, the cluster index of the edge from each stop to
+             the next one, or -1 if the edge counts no cluster
+    :rtype: list(np.array)
+    """
+
+    labels = list()
+    for cycle in cycles:
+        cycle_labels = np.full(len(cycle), -1, dtype=int)
+        for stop, (start_node, stop_node) in enumerate(
+                zip(cycle, np.roll(cycle, -1))):
+            start_clusters = memberships[start_node]
+            stop_clusters = memberships[stop_node]
+
+            if len(start_clusters) > 1 and len(stop_clusters) > 1:
+                shared = [c for c in start_clusters if c in stop_clusters]
+                if shared:
+                    cycle_labels[stop] = shared[0]
+
+            elif len(start_clusters) > 1:
+                cycle_labels[stop] = stop_clusters[0]
+
+            elif len(stop_clusters) > 1:
+                cycle_labels[stop] = start_clusters[0]
+
+        labels.append(cycle_labels)
+
+    return labels
+
+
+class TourPaths(object):
+    def __init__(self, graph, cycles):
+        """
+        Shortest paths over a graph made of directed tour cycles that are
+        joined at shared nodes (relay segments, rendezvous points, anchor
+        cells). Such a path runs along the cycle of its first node up to a
+        junction (a node on more than one cycle), hops between junctions and
+        runs along the cycle of its last node. So, only the small junction
+        graph needs an all-pairs search. Positions along each cycle come from
+        the cumulative edge lengths, and every pair distance is then an O(1)
+        combination of the two.
+
+        :param graph: The tour graph, as built by tour_graph()
+        :type graph: sp.csr_matrix
+        :param cycles: The node indexes of each tour, as from tour_cycles()
+        :type cycles: list(np.array)
+        """
+
+        graph = sp.csr_matrix(graph)
+        node_count = graph.shape[0]
+
+        #: The nodes visited by each cycle, in order
+        self._cycles = list()
+
+        #: The distance of each stop from the first stop of its cycle
+        self._offsets = list()
+
+        #: The total length of each cycle
+        self._lengths = list()
+
+        occurrences = collections.defaultdict(list)
+        for cycle in cycles:
+            cycle = np.asarray(cycle, dtype=int)
+            if not len(cycle):
+                # Keep a place for empty tours, so cycle indexes still line
+                # up with the tours passed in
+                self._cycles.append(cycle)
+                self._offsets.append(np.zeros(1))
+                self._lengths.append(0.)
+                continue
+
+            stops = np.roll(cycle, -1)
+            weights = np.asarray(graph[cycle, stops]).ravel()
+
+            # Self loops are never used by a shortest path
+            weights[cycle == stops] = 0.
+
+            for stop, node in enumerate(cycle):
+                occurrences[node].append((len(self._cycles), stop))
+
+            self._cycles.append(cycle)
+            self._offsets.append(np.concatenate(([0.], np.cumsum(weights))))
+            self._lengths.append(self._offsets[-1][-1])
+
+        junctions = sorted(n for n, occ in occurrences.items() if len(occ) > 1)
+        junction_count = len(junctions)
+        self._junction_index = {node: i for i, node in enumerate(junctions)}
+
+        #: The junctions, by junction index
+        self._junctions = np.array(junctions, dtype=int)
+
+        # Link each junction to the next one along every cycle
+        self._hops = dict()
+        for cycle_index, cycle in enumerate(self._cycles):
+            stops = [s for s, n in enumerate(cycle) if n in self._junction_index]
+            for start, stop in zip(stops, stops[1:] + stops[:1]):
+                hop = (self._junction_index[cycle[start]],
+                       self._junction_index[cycle[stop]])
+                if hop[0] == hop[1]:
+                    continue
+
+                distance = self._forward(cycle_index, start, stop)
+                if hop not in self._hops or distance < self._hops[hop][0]:
+                    self._hops[hop] = (distance, cycle_index, start, stop)
+
+        rows = np.fromiter((hop[0] for hop in self._hops), dtype=int,
+                           count=len(self._hops))
+        columns = np.fromiter((hop[1] for hop in self._hops), dtype=int,
+                              count=len(self._hops))
+        weights = np.fromiter((h[0] for h in self._hops.values()), dtype=float,
+                              count=len(self._hops))
+        junction_graph = sp.csr_matrix((weights, (rows, columns)),
+                                       shape=(junction_count, junction_count))
+
+        # The junction distances get an extra row and column of inf, used by
+        # nodes that cannot reach (or be reached from) any junction.
+        self._junction_distances = np.full(
+            (junction_count + 1, junction_count + 1), np.inf)
+        self._junction_preds = np.full((junction_count, junction_count), -9999)
+        if junction_count:
+            distances, preds = csgraph.dijkstra(junction_graph, directed=True,
+                                                return_predecessors=True)
+            self._junction_distances[:-1, :-1] = distances
+            self._junction_preds = preds
+
+        # Per node, the position on its cycle (for nodes on exactly one
+        # cycle) and the first junction reached from it and the last junction
+        # passed before it.
+        self._cycle_of = np.full(node_count, -1)
+        self._stop_of = np.zeros(node_count, dtype=int)
+        self._offset_of = np.zeros(node_count)
+        self._length_of = np.zeros(node_count)
+        self._exit = np.full(node_count, junction_count)
+        self._exit_stop = np.zeros(node_count, dtype=int)
+        self._exit_distance = np.zeros(node_count)
+        self._entry = np.full(node_count, junction_count)
+        self._entry_stop = np.zeros(node_count, dtype=int)
+        self._entry_distance = np.zeros(node_count)
+
+        self._exit[junctions] = np.arange(junction_count)
+        self._entry[junctions] = np.arange(junction_count)
+
+        for cycle_index, cycle in enumerate(self._cycles):
+            stops = np.array([s for s, n in enumerate(cycle)
+                              if n in self._junction_index], dtype=int)
+
+            for stop, node in enumerate(cycle):
+                if node in self._junction_index:
+                    continue
+
+                self._cycle_of[node] = cycle_index
+                self._stop_of[node] = stop
+                self._offset_of[node] = self._offsets[cycle_index][stop]
+                self._length_of[node] = self._lengths[cycle_index]
+
+                if not len(stops):
+                    continue
+
+                after = np.searchsorted(stops, stop)
+                exit_stop = stops[after % len(stops)]
+                entry_stop = stops[after - 1]
+
+                self._exit[node] = self._junction_index[cycle[exit_stop]]
+                self._exit_stop[node] = exit_stop
+                self._exit_distance[node] = self._forward(cycle_index, stop,
+                                                          exit_stop)
+                self._entry[node] = self._junction_index[cycle[entry_stop]]
+                self._entry_stop[node] = entry_stop
+                self._entry_distance[node] = self._forward(cycle_index,
+                                                           entry_stop, stop)
+
+    def _forward(self, cycle_index, start, stop):
+        """
+        :return: The distance travelled along a cycle from one stop to another
+        :rtype: float
+        """
+        offsets = self._offsets[cycle_index]
+        if stop >= start:
+            return offsets[stop] - offsets[start]
+
+        return self._lengths[cycle_index] - offsets[start] + offsets[stop]
+
+    def _walk(self, cycle_index, start, stop):
+        """
+        :return: The nodes visited along a cycle from one stop to another
+        :rtype: np.array
+        """
+        cycle = self._cycles[cycle_index]
+        if stop >= start:
+            return cycle[start:stop + 1]
+
+        return np.concatenate((cycle[start:], cycle[:stop + 1]))
+
+    def _candidates(self, begin, end):
+        """
+        :return: The distance staying on a single cycle and the distance
+                 through the junction graph
+        :rtype: (float, float)
+        """
+
+        via = (self._exit_distance[begin] +
+               self._junction_distances[self._exit[begin], self._entry[end]] +
+               self._entry_distance[end])
+
+        cycle_index = self._cycle_of[begin]
+        direct = np.inf
+        if cycle_index >= 0 and cycle_index == self._cycle_of[end]:
+            direct = self._forward(cycle_index, self._stop_of[begin],
+                                   self._stop_of[end])
+
+        return direct, via
+
+    def distance(self, begin, end):
+        """
+        Get the shortest distance between two nodes.
+
+        :param begin: The index of the starting node
+        :type begin: int
+        :param end: The index of the final node
+        :type end: int
+        :return: The distance, or inf if end cannot be reached
+        :rtype: float
+        """
+
+        if begin == end:
+            return 0.
+
+        return min(self._candidates(begin, end))
+
+    def _candidate_matrices(self, nodes):
+        """
+        :return: For every pair of the given nodes, the distance staying on a
+                 single cycle (inf if they are not on the same one) and the
+                 distance through the junction graph
+        :rtype: (np.array, np.array)
+        """
+
+        via = self._junction_distances[
+            np.ix_(self._exit[nodes], self._entry[nodes])]
+        via += self._exit_distance[nodes][:, np.newaxis]
+        via += self._entry_distance[nodes][np.newaxis, :]
+
+        cycles = self._cycle_of[nodes]
+        same = (cycles[:, np.newaxis] == cycles) & (cycles >= 0)[:, np.newaxis]
+
+        stops = self._stop_of[nodes]
+        offsets = self._offset_of[nodes]
+        ahead = offsets[np.newaxis, :] - offsets[:, np.newaxis]
+        behind = ahead + self._length_of[nodes][:, np.newaxis]
+        direct = np.where(stops[:, np.newaxis] <= stops, ahead, behind)
+        direct[~same] = np.inf
+
+        return direct, via
+
+    def distance_matrix(self, nodes):
+        """
+        Get the shortest distances between every pair of the given nodes.
+
+        :param nodes: The node indexes
+        :type nodes: list(int)
+        :return: An N x N matrix where entry [i, j] is the shortest distance
+                 from nodes[i] to nodes[j]
+        :rtype: np.array
+        """
+
+        nodes = np.asarray(nodes, dtype=int)
+
+        distances = np.minimum(*self._candidate_matrices(nodes))
+        np.fill_diagonal(distances, 0.)
+        return distances
+
+    def _walk_labels(self, tables, cycle_indexes, starts, stops):
+        """
+        :return: For each of the given cycle walks, which labels its edges
+                 carry and the label of the last labelled edge (or -1)
+        :rtype: (np.array, np.array)
+        """
+
+        counts, last_labels, last_edges, bases, lengths = tables
+
+        bases = bases[cycle_indexes]
+        ends = bases + lengths[cycle_indexes]
+        starts = bases + starts
+        stops = bases + stops
+
+        wrapped = (stops < starts)[:, np.newaxis]
+        totals = counts[stops] - counts[starts] + wrapped * counts[ends]
+        present = totals > 0
+
+        # Going backwards from the last stop, the first labelled edge is
+        # either before it on the cycle, or (for a walk past the end of the
+        # cycle) before the end of the cycle.
+        last = np.where(last_edges[stops] >= starts - bases,
+                        last_labels[stops], -1)
+        wrapped = wrapped.ravel()
+        last_before = np.where(last_edges[stops] >= 0, last_labels[stops],
+                               np.where(last_edges[ends] >= starts - bases,
+                                        last_labels[ends], -1))
+        last = np.where(wrapped, last_before, last)
+
+        return present, last
+
+    def label_matrix(self, nodes, labels, label_count):
+        """
+        Find the labels met along the shortest path between every pair of
+        the given nodes, given a label for each edge of the cycles (as from
+        edge_clusters()). Only the routes between junctions are followed hop
+        by hop, once per pair of junctions; the rest comes from running
+        label counts along each cycle, just as distances come from the
+        cumulative edge lengths.
+
+        :param nodes: The node indexes
+        :type nodes: list(int)
+        :param labels: For each cycle (in the order given to the
+                       constructor), the label of the edge from each stop to
+                       the next one, between 0 and label_count - 1, or -1
+                       for no label
+        :type labels: list(np.array)
+        :param label_count: The number of distinct labels
+        :type label_count: int
+        :return: An N x N x label_count matrix where entry [i, j, k] is True
+                 if label k is met on the path from nodes[i] to nodes[j],
+                 and an N x N matrix of the last label met on each path (or
+                 -1 if there is none)
+        :rtype: (np.array, np.array)
+        """
+
+        nodes = np.asarray(nodes, dtype=int)
+        junction_count = len(self._junctions)
+
+        # Running label counts along each cycle, stacked into one table
+        counts = list()
+        last_labels = list()
+        last_edges = list()
+        lengths = np.array([len(cycle) for cycle in self._cycles], dtype=int)
+        bases = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        for cycle_index, cycle in enumerate(self._cycles):
+            cycle_labels = np.asarray(labels[cycle_index], dtype=int)
+            labelled = np.flatnonzero(cycle_labels >= 0)
+
+            onehot = np.zeros((len(cycle) + 1, label_count), dtype=int)
+            onehot[labelled + 1, cycle_labels[labelled]] = 1
+            counts.append(np.cumsum(onehot, axis=0))
+
+            edges = np.full(len(cycle) + 1, -1)
+            edges[labelled + 1] = labelled
+            edges = np.maximum.accumulate(edges)
+            last_edges.append(edges)
+            last_labels.append(np.where(edges >= 0, cycle_labels[edges], -1))
+
+        tables = (np.concatenate(counts), np.concatenate(last_labels),
+                  np.concatenate(last_edges), bases, lengths)
+
+        # The labels of every hop, and then of every route between junctions
+        hops = list(self._hops)
+        hop_walks = np.array([self._hops[hop][1:] for hop in hops],
+                             dtype=int).reshape(-1, 3)
+        hop_present, hop_last = self._walk_labels(tables, *hop_walks.T)
+        hop_index = {hop: i for i, hop in enumerate(hops)}
+
+        route_present = np.zeros(
+            (junction_count + 1, junction_count + 1, label_count), dtype=bool)
+        route_last = np.full((junction_count + 1, junction_count + 1), -1)
+        for first in range(junction_count):
+            for last in range(junction_count):
+                if first == last or np.isinf(
+                        self._junction_distances[first, last]):
+                    continue
+
+                hubs = [last]
+                while hubs[-1] != first:
+                    hubs.append(self._junction_preds[first, hubs[-1]])
+                hubs.reverse()
+
+                for hop in zip(hubs, hubs[1:]):
+                    i = hop_index[hop]
+                    route_present[first, last] |= hop_present[i]
+                    if hop_last[i] >= 0:
+                        route_last[first, last] = hop_last[i]
+
+        # The labels from each node to its exit junction, and from its entry
+        # junction to it
+        on_cycle = np.flatnonzero(self._cycle_of[nodes] >= 0)
+        cycle_nodes = nodes[on_cycle]
+        exit_present = np.zeros((len(nodes), label_count), dtype=bool)
+        exit_last = np.full(len(nodes), -1)
+        entry_present = np.zeros((len(nodes), label_count), dtype=bool)
+        entry_last = np.full(len(nodes), -1)
+        if len(on_cycle):
+            exit_present[on_cycle], exit_last[on_cycle] = self._walk_labels(
+                tables, self._cycle_of[cycle_nodes],
+                self._stop_of[cycle_nodes], self._exit_stop[cycle_nodes])
+            entry_present[on_cycle], entry_last[on_cycle] = self._walk_labels(
+                tables, self._cycle_of[cycle_nodes],
+                self._entry_stop[cycle_nodes], self._stop_of[cycle_nodes])
+
+        exits = self._exit[nodes][:, np.newaxis]
+        entries = self._entry[nodes][np.newaxis, :]
+        present = (exit_present[:, np.newaxis, :] |
+                   route_present[exits, entries] |
+                   entry_present[np.newaxis, :, :])
+        last = np.where(entry_last[np.newaxis, :] >= 0,
+                        entry_last[np.newaxis, :],
+                        np.where(route_last[exits, entries] >= 0,
+                                 route_last[exits, entries],
+                                 exit_last[:, np.newaxis]))
+
+        # As in path(), a path stays on one cycle whenever that is no longer
+        # than going through the junctions
+        direct, via = self._candidate_matrices(nodes)
+        rows, columns = np.nonzero(np.isfinite(direct) & (direct <= via))
+        if len(rows):
+            present[rows, columns], last[rows, columns] = self._walk_labels(
+                tables, self._cycle_of[nodes[rows]],
+                self._stop_of[nodes[rows]], self._stop_of[nodes[columns]])
+
+        unreachable = np.isinf(direct) & np.isinf(via)
+        unreachable[np.diag_indices(len(nodes))] = True
+        present[unreachable] = False
+        last[unreachable] = -1
+
+        return present, last
+
+    def sum_matrix(self, nodes, values):
+        """
+        Sum a value for each edge along the shortest path between every pair
+        of the given nodes (e.g., the time each edge takes to travel). Entry
+        [i, j] equals the sum of edge_values(nodes[i], nodes[j], values).
+        As in label_matrix(), only the routes between junctions are followed
+        hop by hop, and the rest comes from running sums along each cycle.
+
+        :param nodes: The node indexes
+        :type nodes: list(int)
+        :param values: For each cycle (in the order given to the
+                       constructor), the value of the edge from each stop
+                       to the next one
+        :type values: list(np.array)
+        :return: An N x N matrix where entry [i, j] is the total value of the
+                 edges on the path from nodes[i] to nodes[j], or 0 if there
+                 is no such path
+        :rtype: np.array
+        """
+
+        nodes = np.asarray(nodes, dtype=int)
+        junction_count = len(self._junctions)
+
+        # Running sums along each cycle, stacked into one table
+        lengths = np.array([len(cycle) for cycle in self._cycles], dtype=int)
+        bases = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        sums = np.concatenate([
+            np.concatenate(([0.], np.cumsum(cycle_values, dtype=float)))
+            for cycle_values in values])
+
+        def walk_sums(cycle_indexes, starts, stops):
+            cycle_bases = bases[cycle_indexes]
+            wrapped = stops < starts
+            return (sums[cycle_bases + stops] - sums[cycle_bases + starts] +
+                    wrapped * sums[cycle_bases + lengths[cycle_indexes]])
+
+        # The sum over every hop, and then over every route between junctions
+        hops = list(self._hops)
+        hop_walks = np.array([self._hops[hop][1:] for hop in hops],
+                             dtype=int).reshape(-1, 3)
+        hop_sums = dict(zip(hops, walk_sums(*hop_walks.T)))
+
+        route_sums = np.zeros((junction_count + 1, junction_count + 1))
+        for first in range(junction_count):
+            for last in range(junction_count):
+                if first == last or np.isinf(
+                        self._junction_distances[first, last]):
+                    continue
+
+                hubs = [last]
+                while hubs[-1] != first:
+                    hubs.append(self._junction_preds[first, hubs[-1]])
+                hubs.reverse()
+
+                route_sums[first, last] = sum(
+                    hop_sums[hop] for hop in zip(hubs, hubs[1:]))
+
+        # The sums from each node to its exit junction, and from its entry
+        # junction to it
+        on_cycle = np.flatnonzero(self._cycle_of[nodes] >= 0)
+        cycle_nodes = nodes[on_cycle]
+        exit_sums = np.zeros(len(nodes))
+        entry_sums = np.zeros(len(nodes))
+        if len(on_cycle):
+            exit_sums[on_cycle] = walk_sums(
+                self._cycle_of[cycle_nodes], self._stop_of[cycle_nodes],
+                self._exit_stop[cycle_nodes])
+            entry_sums[on_cycle] = walk_sums(
+                self._cycle_of[cycle_nodes], self._entry_stop[cycle_nodes],
+                self._stop_of[cycle_nodes])
+
+        totals = route_sums[np.ix_(self._exit[nodes], self._entry[nodes])]
+        totals += exit_sums[:, np.newaxis]
+        totals += entry_sums[np.newaxis, :]
+
+        # As in path(), a path stays on one cycle whenever that is no longer
+        # than going through the junctions
+        direct, via = self._candidate_matrices(nodes)
+        rows, columns = np.nonzero(np.isfinite(direct) & (direct <= via))
+        totals[rows, columns] = walk_sums(
+            self._cycle_of[nodes[rows]], self._stop_of[nodes[rows]],
+            self._stop_of[nodes[columns]])
+
+        unreachable = np.isinf(direct) & np.isinf(via)
+        unreachable[np.diag_indices(len(nodes))] = True
+        totals[unreachable] = 0.
+
+        return totals
+
+    def legs(self, begin, end):
+        """
+        Get the shortest path between two nodes as the cycle walks it is made
+        of, without listing the nodes along it. Each walk ends at the stop the
+        next one starts from.
+
+        :param begin: The index of the starting node
+        :type begin: int
+        :param end: The index of the final node
+        :type end: int
+        :return: The (cycle index, first stop, last stop) of each walk, or an
+                 empty list if begin is end or end cannot be reached
+        :rtype: list((int, int, int))
+        """
+
+        if begin == end:
+            return list()
+
+        direct, via = self._candidates(begin, end)
+        if np.isinf(direct) and np.isinf(via):
+            return list()
+
+        if direct <= via:
+            return [(self._cycle_of[begin], self._stop_of[begin],
+                     self._stop_of[end])]
+
+        first = self._exit[begin]
+        last = self._entry[end]
+
+        walks = list()
+        if self._cycle_of[begin] >= 0:
+            walks.append((self._cycle_of[begin], self._stop_of[begin],
+                          self._exit_stop[begin]))
+
+        hubs = [last]
+        while hubs[-1] != first:
+            hubs.append(self._junction_preds[first, hubs[-1]])
+        hubs.reverse()
+
+        for hop in zip(hubs, hubs[1:]):
+            walks.append(self._hops[hop][1:])
+
+        if self._cycle_of[end] >= 0:
+            walks.append((self._cycle_of[end], self._entry_stop[end],
+                          self._stop_of[end]))
+
+        return walks
+
+    def path(self, begin, end, reverse=False):
+        """
+        Lazily yield the nodes along the shortest path between two nodes.
+
+        :param begin: The index of the starting node
+        :type begin: int
+        :param end: The index of the final node
+        :type end: int
+        :param reverse: If True, yield the nodes from end back to begin
+        :type reverse: bool
+        :return: The node indexes from begin to end (inclusive). Nothing is
+                 yielded if end cannot be reached.
+        :rtype: iterator(int)
+        """
+
+        if begin == end:
+            yield begin
+            return
+
+        walks = self.legs(begin, end)
+        if reverse:
+            walks.reverse()
+
+        skip = 0
+        for cycle_index, start, stop in walks:
+            nodes = self._walk(cycle_index, start, stop)
+            if reverse:
+                nodes = nodes[::-1]
+
+            for node in nodes[skip:]:
+                yield int(node)
+
+            # Each walk starts where the last one ended
+            skip = 1
+
+    def edge_values(self, begin, end, values):
+        """
+        Collect a value for each edge along the shortest path between two
+        nodes, straight from per-cycle arrays and without listing the nodes
+        along the path.
+
+        :param begin: The index of the starting node
+        :type begin: int
+        :param end: The index of the final node
+        :type end: int
+        :param values: For each cycle (in the order given to the
+                       constructor), the value of the edge from each stop
+                       to the next one
+        :type values: list(np.array)
+        :return: The values of the edges from begin to end, in order
+        :rtype: np.array
+        """
+
+        pieces = list()
+        for cycle_index, start, stop in self.legs(begin, end):
+            cycle_values = values[cycle_index]
+            if stop >= start:
+                pieces.append(cycle_values[start:stop])
+            else:
+                pieces.append(cycle_values[start:])
+                pieces.append(cycle_values[:stop])
+
+        if not pieces:
+            return np.empty(0)
+
+        return np.concatenate(pieces)
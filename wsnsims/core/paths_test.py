@@ -0,0 +1,147 @@
+import numpy as np
+import scipy.sparse.csgraph as sp
+
+from wsnsims.core import paths
+from wsnsims.core import tour
+
+
+def _route(points, objects):
+    route = tour.compute_tour(np.array(points, dtype=float))
+    route.objects = objects
+    return route
+
+
+def _dense_graph(tours, indexes, node_count):
+    dense = np.full((node_count, node_count), np.inf)
+    for route in tours:
+        vertices = route.vertices
+        for start, stop in zip(np.roll(vertices, 1), vertices):
+            distance = np.linalg.norm(route.collection_points[stop] -
+                                      route.collection_points[start])
+            dense[indexes[route.objects[start]],
+                  indexes[route.objects[stop]]] = distance
+    return sp.csgraph_from_dense(dense, null_value=np.inf)
+
+
+def _tour_engine(seed, count, members):
+    np.random.seed(seed)
+    locations = np.random.rand(count, 2) * 100.
+    objects = list(range(count))
+    indexes = {obj: obj for obj in objects}
+
+    tours = [_route(locations[m], m) for m in members]
+    cycles = paths.tour_cycles(tours, indexes)
+
+    graph = paths.tour_graph(tours, indexes, len(objects))
+    engine = paths.TourPaths(graph, cycles)
+    return objects, cycles, graph, engine
+
+
+def test_tour_graph_matches_dense_construction():
+    names = 'abcdefg'
+    indexes = {name: i for i, name in enumerate(names)}
+    tours = [
+        _route([[0, 0], [100, 0], [100, 100], [0, 100]], list('abcd')),
+        _route([[100, 100], [200, 100], [200, 200]], list('cef')),
+        _route([[0, 0], [0, 0]], list('ag')),
+    ]
+
+    graph = paths.tour_graph(tours, indexes, len(names) + 1)
+    expected = _dense_graph(tours, indexes, len(names) + 1)
+
+    assert graph.shape == expected.shape
+    assert graph.nnz == expected.nnz
+    assert np.array_equal(graph.toarray(), expected.toarray())
+    assert np.array_equal(sp.dijkstra(graph), sp.dijkstra(expected))
+
+
+def test_tour_paths_match_dijkstra():
+    # Overlapping tours joined at shared stops, plus a tour of its own
+    members = [[0, 1, 2, 3, 4, 5], [5, 6, 7, 8, 9], [9, 10, 11, 0, 12],
+               [3, 13, 14, 15, 7], [16, 17, 18, 19], [20], [21, 22]]
+    objects, _, graph, engine = _tour_engine(7, 30, members)
+
+    expected = sp.dijkstra(graph, directed=True)
+    distances = engine.distance_matrix(objects)
+    assert np.allclose(distances, expected)
+
+    for begin in objects:
+        for end in objects:
+            assert np.isclose(engine.distance(begin, end),
+                              expected[begin, end])
+
+            path = list(engine.path(begin, end))
+            if np.isinf(expected[begin, end]):
+                assert path == []
+                continue
+
+            assert path[0] == begin and path[-1] == end
+            length = sum(graph[a, b] for a, b in zip(path, path[1:]))
+            assert np.isclose(length, expected[begin, end])
+
+            assert list(engine.path(begin, end, reverse=True)) == path[::-1]
+
+
+def test_edge_values_follow_path():
+    members = [[0, 1, 2, 3, 4], [4, 5, 6, 7], [7, 8, 9, 0], [2, 10, 11, 12],
+               [13, 14, 15]]
+    objects, cycles, _, engine = _tour_engine(11, 16, members)
+
+    # Give every edge a unique value, so the edges used can be recovered
+    values = list()
+    edge_of = dict()
+    for cycle_index, cycle in enumerate(cycles):
+        cycle_values = np.arange(len(cycle)) + 100 * cycle_index
+        values.append(cycle_values)
+        for value, edge in zip(cycle_values, zip(cycle, np.roll(cycle, -1))):
+            edge_of[value] = edge
+
+    for begin in objects:
+        for end in objects:
+            path = list(engine.path(begin, end))
+            edges = [edge_of[v] for v in engine.edge_values(begin, end,
+                                                            values)]
+            assert edges == list(zip(path, path[1:]))
+
+
+def test_edge_clusters():
+    cycles = [np.array([0, 1, 2]), np.array([2, 3, 4]), np.array([4, 5, 2])]
+    memberships = {0: [0], 1: [0], 2: [0, 1, 2], 3: [1], 4: [1, 2], 5: [2]}
+
+    labels = paths.edge_clusters(cycles, memberships)
+
+    assert list(labels[0]) == [-1, 0, 0]
+    assert list(labels[1]) == [1, 1, 1]
+    assert list(labels[2]) == [2, 2, 1]
+
+
+def test_label_matrix_follows_path():
+    members = [[0, 1, 2, 3, 4, 5], [5, 6, 7, 8, 9], [9, 10, 11, 0, 12],
+               [3, 13, 14, 15, 7], [16, 17, 18, 19], [20], [21, 22, 23]]
+    objects, cycles, _, engine = _tour_engine(3, 24, members)
+
+    label_count = 4
+    labels = [np.random.randint(-1, label_count, len(c)) for c in cycles]
+    present, last = engine.label_matrix(objects, labels, label_count)
+
+    for begin in objects:
+        for end in objects:
+            found = engine.edge_values(begin, end, labels).astype(int)
+            found = found[found >= 0]
+
+            assert set(np.flatnonzero(present[begin, end])) == set(found)
+            assert last[begin, end] == (found[-1] if len(found) else -1)
+
+
+def test_sum_matrix_follows_path():
+    members = [[0, 1, 2, 3, 4, 5], [5, 6, 7, 8, 9], [9, 10, 11, 0, 12],
+               [3, 13, 14, 15, 7], [16, 17, 18, 19], [20], [21, 22, 23]]
+    objects, cycles, _, engine = _tour_engine(5, 24, members)
+
+    values = [np.random.rand(len(c)) for c in cycles]
+    sums = engine.sum_matrix(objects, values)
+
+    for begin in objects:
+        for end in objects:
+            expected = np.sum(engine.edge_values(begin, end, values))
+            assert np.isclose(sums[begin, end], expected)
@@ -0,0 +1,97 @@
+"""Contiguous storage for the locations of segments and cells"""
+
+import numpy as np
+
+
+class PositionStore(object):
+    def __init__(self, objects=(), points=None):
+        """
+        Keep the locations of a scenario's objects (segments or cells) in a
+        single N x 2 array. Each object's location becomes a view of its row
+        of the array, and the object records the store and its row (as
+        "store" and "position"), so the locations of any group of objects can
+        be gathered with one fancy index.
+
+        :param objects: The objects to store, each with a "location"
+                        attribute that is a Vec2
+        :type objects: list
+        :param points: The locations to store, if the objects are to be
+                       placed later (see place()). objects is ignored if this
+                       is given.
+        :type points: np.array
+        """
+
+        #: The objects stored at construction, by row
+        self.objects = list(objects) if points is None else list()
+
+        #: The location of every object, one row per object
+        if points is None:
+            points = [obj.location.nd for obj in self.objects]
+        self.points = np.array(points, dtype=float).reshape(-1, 2)
+
+        for row, obj in enumerate(self.objects):
+            self.place(obj, row)
+
+    def place(self, obj, row):
+        """
+        Back an object's location with a row of the store.
+
+        :param obj: An object with a "location" attribute that is a Vec2
+        :param row: The object's row in self.points
+        :type row: int
+        :return: None
+        """
+        obj.location.nd = self.points[row]
+        obj.store = self
+        obj.position = row
+
+    def rows(self, objects):
+        """
+        :param objects: Objects in this store
+        :type objects: list
+        :return: The row of each object
+        :rtype: np.array
+        """
+        return np.fromiter((obj.position for obj in objects), dtype=int,
+                           count=len(objects))
+
+
+def locate(objects):
+    """
+    Find the position store holding a group of objects, and their rows in it.
+
+    :param objects: Objects with a "location" attribute that is a Vec2
+    :type objects: list
+    :return: The store and the row of each object, or (None, None) if the
+             objects are not all in a single store
+    :rtype: (PositionStore, np.array)
+    """
+
+    store = getattr(objects[0], 'store', None) if objects else None
+    if store is not None and all(
+            getattr(obj, 'store', None) is store for obj in objects):
+        return store, store.rows(objects)
+
+    return None, None
+
+
+def gather(objects):
+    """
+    Get the locations of a group of objects. If they all share a position
+    store, this is a single fancy index into it. Otherwise (e.g., for relay
+    nodes created during a simulation), the locations are stacked one by
+    one. Clusters keep the rows of their nodes as they change, and so skip
+    this search (see core.cluster.BaseCluster.points).
+
+    :param objects: Objects with a "location" attribute that is a Vec2
+    :type objects: list
+    :return: An N x 2 array of locations, in the order of objects
+    :rtype: np.array
+    """
+
+    store, rows = locate(objects)
+    if store is not None:
+        return store.points[rows]
+
+    return np.array([obj.location.nd for obj in objects],
+                    dtype=float).reshape(-1, 2)
@@ -0,0 +1,51 @@
+import itertools
+
+import numpy as np
+
+from wsnsims.core import positions
+from wsnsims.core import segment
+from wsnsims.core.cluster import BaseCluster, closest_nodes
+from wsnsims.core.environment import Environment
+
+
+def test_store_backs_object_locations():
+    np.random.seed(5)
+    locs = np.random.rand(8, 2) * 100.
+    segments = [segment.Segment(nd) for nd in locs]
+    store = positions.PositionStore(segments)
+
+    assert np.array_equal(store.points, locs)
+    assert np.array_equal(positions.gather(segments[::-1]), locs[::-1])
+
+    # Locations are views of the store
+    segments[3].location.x = -1.
+    assert store.points[3, 0] == -1.
+
+    # Objects outside the store are gathered one by one
+    loose = segment.Segment(np.array([7., 7.]))
+    gathered = positions.gather(segments[:2] + [loose])
+    assert np.array_equal(gathered, np.vstack((locs[:2], [7., 7.])))
+
+
+def test_closest_nodes_matches_pairwise_search():
+    env = Environment()
+
+    # Points on a lattice, so there are many exact ties
+    locs = np.array(list(itertools.product(range(6), range(6))), dtype=float)
+    segments = [segment.Segment(nd) for nd in locs * 13.]
+    positions.PositionStore(segments)
+
+    np.random.seed(9)
+    for _ in range(20):
+        chosen = np.random.permutation(len(segments))
+        cluster = BaseCluster(env)
+        for i in chosen[:10]:
+            cluster.add(segments[i])
+        others = [segments[i] for i in chosen[10:20]]
+
+        pairs = itertools.product(cluster.nodes, others)
+        expected = min(
+            (np.linalg.norm(a.location.nd - b.location.nd), i, a, b)
+            for i, (a, b) in enumerate(pairs))
+
+        assert closest_nodes(cluster, others) == expected[2:]
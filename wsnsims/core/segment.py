@@ -11,6 +11,15 @@ class Segment(object):
         self.location = point.Vec2(nd)
         self.cluster_id = -1
 
+        #: The index of this segment in its scenario's traffic matrix (see
+        #: core.data.TrafficMatrix)
+        self.index = -1
+
+        #: The position store holding this segment's location, and its row
+        #: there (see core.positions.PositionStore)
+        self.store = None
+        self.position = -1
+
     def __str__(self):
         return "Segment {}".format(self.segment_id)
 
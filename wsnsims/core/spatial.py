@@ -0,0 +1,87 @@
+"""Nearest neighbour queries between sets of points"""
+
+import numpy as np
+import scipy.spatial.distance as sp_dist
+
+#: Distances within this fraction of the minimum are re-measured exactly, as
+#: the vectorized and tree distances can differ in the last bit.
+_TOLERANCE = 1e-9
+
+
+def _first_closest(pairs, points_1, points_2):
+    """
+    :return: The (i, j) pair with the smallest distance, measured exactly as
+             np.linalg.norm(points_1[i] - points_2[j]). Ties go to the pair
+             that comes first in itertools.product() order.
+    :rtype: (int, int)
+    """
+    count = len(points_2)
+    _, index = min((np.linalg.norm(points_1[i] - points_2[j]), i * count + j)
+                   for i, j in pairs)
+
+    return index // count, index % count
+
+
+def closest_pair(points_1, points_2, tree_1=None, tree_2=None):
+    """
+    Find the closest pair of points drawn from two sets (the bichromatic
+    closest pair). If a KD-tree is given for either set, the other set is
+    queried against it. Otherwise, all of the pair distances are found at
+    once with cdist(). Either way, the result is the same as measuring every
+    pair in turn: the smallest distance wins, and ties go to the first pair
+    in itertools.product(points_1, points_2) order.
+
+    :param points_1: The first set of points
+    :type points_1: np.array
+    :param points_2: The second set of points
+    :type points_2: np.array
+    :param tree_1: A tree over points_1, if one is available
+    :type tree_1: scipy.spatial.cKDTree
+    :param tree_2: A tree over points_2, if one is available
+    :type tree_2: scipy.spatial.cKDTree
+    :return: The index of the closest point in each set
+    :rtype: (int, int)
+    """
+
+    if not len(points_1) or not len(points_2):
+        raise ValueError("closest_pair() needs two non-empty sets of points")
+
+    if tree_2 is not None:
+        distances, _ = tree_2.query(points_1)
+        radius = np.min(distances) * (1. + _TOLERANCE)
+        neighbours = tree_2.query_ball_point(points_1, radius)
+        pairs = [(i, j) for i, js in enumerate(neighbours) for j in js]
+
+    elif tree_1 is not None:
+        distances, _ = tree_1.query(points_2)
+        radius = np.min(distances) * (1. + _TOLERANCE)
+        neighbours = tree_1.query_ball_point(points_2, radius)
+        pairs = [(i, j) for j, is_ in enumerate(neighbours) for i in is_]
+
+    else:
+        distances = sp_dist.cdist(points_1, points_2)
+        radius = np.min(distances) * (1. + _TOLERANCE)
+        pairs = zip(*np.nonzero(distances <= radius))
+
+    return _first_closest(pairs, points_1, points_2)
+
+
+def nearest(point, points, tree=None):
+    """
+    Find the point in a set closest to a single point. As with a linear scan
+    that keeps the first strictly closer point, ties go to the point that
+    comes first.
+
+    :param point: The point to search from
+    :type point: np.array
+    :param points: The points to search
+    :type points: np.array
+    :param tree: A tree over points, if one is available
+    :type tree: scipy.spatial.cKDTree
+    :return: The index of the closest point
+    :rtype: int
+    """
+
+    point = np.asarray(point, dtype=float).reshape(1, 2)
+    _, index = closest_pair(point, points, tree_2=tree)
+    return index
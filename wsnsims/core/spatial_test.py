@@ -0,0 +1,37 @@
+import itertools
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from wsnsims.core import spatial
+
+
+def _expected(points_1, points_2):
+    pairs = itertools.product(range(len(points_1)), range(len(points_2)))
+    _, i, j = min((np.linalg.norm(points_1[i] - points_2[j]), i, j)
+                  for i, j in pairs)
+    return i, j
+
+
+def test_closest_pair_matches_pairwise_search():
+    np.random.seed(13)
+    for _ in range(20):
+        # Points on a lattice, so there are many exact ties
+        points_1 = np.random.randint(0, 8, (12, 2)) * 7.5
+        points_2 = np.random.randint(0, 8, (9, 2)) * 7.5
+        expected = _expected(points_1, points_2)
+
+        assert spatial.closest_pair(points_1, points_2) == expected
+        assert spatial.closest_pair(points_1, points_2,
+                                    tree_1=cKDTree(points_1)) == expected
+        assert spatial.closest_pair(points_1, points_2,
+                                    tree_2=cKDTree(points_2)) == expected
+
+
+def test_nearest_prefers_the_first_point():
+    points = np.array([[0., 0.], [2., 0.], [0., 2.], [2., 2.]])
+    tree = cKDTree(points)
+
+    assert spatial.nearest(np.array([1., 1.]), points, tree) == 0
+    assert spatial.nearest(np.array([1.9, 1.]), points, tree) == 1
+    assert spatial.nearest(np.array([3., 3.]), points) == 3
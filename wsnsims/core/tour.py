@@ -4,10 +4,15 @@ import numpy as np
 import scipy.spatial as sp
 
 from wsnsims.core import linalg
+from wsnsims.core import tsp
 
 np.seterr(all='raise')
 
 
+class TourError(Exception):
+    pass
+
+
 class Tour(object):
     def __init__(self):
         """
@@ -36,6 +41,14 @@ class Tour(object):
         #: or cells).
         self.objects = None
 
+        #: The number of incremental edits (see insert_point() and
+        #: remove_point()) applied since this tour was last fully computed.
+        self.edits = 0
+
+        #: The length of the tour this one was spliced from when it was last
+        #: fully computed, or None if this tour was fully computed.
+        self.base_length = None
+
         #: Internal memo of the length of this tour
         self._length = np.inf
 
@@ -63,10 +76,86 @@ class Tour(object):
         self._length = total
         return self._length
 
+    @property
+    def drift(self):
+        """
+        How much longer this tour is than it was when last fully computed,
+        relative to that length. Splicing points in or out with
+        insert_point() and remove_point() can leave a tour worse than a full
+        computation would be, and this measures by how much it has grown.
+
+        :return: The relative excess length, or 0 for a fully computed tour
+        :rtype: float
+        """
+        if self.base_length is None or self.length <= self.base_length:
+            return 0.
+
+        if np.isclose(self.base_length, 0.):
+            return np.inf
+
+        return (self.length - self.base_length) / self.base_length
+
+
+def _collection_point(perp, p, radio_range):
+    """
+    Find the point at which a traveller on the tour path comes within radio
+    range of p, given the point on the path closest to p.
+    """
+
+    collect_point = perp - p
+    radius = np.linalg.norm(collect_point)
 
-def compute_tour(points, radio_range=0.):
+    if radius > radio_range:
+        collect_point /= radius
+        collect_point *= radio_range
+
+    collect_point += p
+    return collect_point
+
+
+def _closest_edge(collection_points, path, p):
+    """
+    Find the edge of an open path (the closing edge is implied) that is
+    closest to p. Returns the index at which p should be inserted into path,
+    along with the point on that edge closest to p.
+    """
+
+    # Score every edge of the current tour at once. Edge k runs from
+    # path[k - 1] to path[k], so the closing edge is scored first. Taking
+    # the first minimum preserves the tie-breaking of a sequential scan.
+    ends = collection_points[path]
+    starts = np.concatenate((ends[-1:], ends[:-1]))
+    distances, projections = linalg.closest_points(starts, ends, p)
+
+    closest_segment = int(np.argmin(distances))
+    return closest_segment, projections[closest_segment]
+
+
+def compute_tour(points, radio_range=0., solver='hull_insertion'):
     """
     For a given set of points, calculate a tour that covers each point once.
+
+    :param points: The set of 2D points over which to find a path.
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+
+    :param radio_range:
+    :type radio_range: float
+
+    :param solver: The name of a registered solver (see SOLVERS), or "auto" to
+                   pick one based on the number of points and the radio range
+                   (see AUTO_POLICY).
+    :type solver: str
+
+    :return: A Tour object containing the original points and a list of indexes
+    into those points describing the path between them.
+    """
+
+    name = select_solver(solver, len(points), radio_range)
+    return SOLVERS[name](points, radio_range)
+
+
+def hull_insertion_tour(points, radio_range=0.):
+    """
     This implementation of TSP is based on that used by IDM-kMDC, in which
     a convex hull is first found, then interior points are added to the nearest
     segment of the hull path.
@@ -118,54 +207,269 @@ def compute_tour(points, radio_range=0.):
     interior = np.delete(interior, vertices, 0)
 
     for point_idx in interior:
+        p = points[point_idx]
+        closest_segment, closest_perp = _closest_edge(collection_points,
+                                                      tour, p)
+        tour.insert(closest_segment, point_idx)
+        collection_points[point_idx] = _collection_point(closest_perp, p,
+                                                         radio_range)
 
-        closest_segment = -1
-        closest_distance = np.inf
-        closest_perp = np.zeros((1, 2))
+    tour.append(tour[0])
 
-        p = points[point_idx]
+    route.points = points
+    route.vertices = np.array(tour)
+    route.collection_points = collection_points
 
-        tail = len(tour) - 1
-        head = 0
-        while head < len(tour):
+    # TODO: Remove these asserts
+    assert np.array_equal(np.sort(route.vertices[:-1]),
+                          np.arange(len(points)))
+    assert len(tour) == len(points) + 1
+    assert len(route.points) == len(route.collection_points)
 
-            start_idx = tour[tail]
-            end_idx = tour[head]
-            start = collection_points[start_idx]
-            end = collection_points[end_idx]
+    return route
 
-            perp_len, perp_vec = linalg.closest_point(start, end, p)
 
-            if perp_len < closest_distance:
-                closest_segment = head
-                closest_distance = perp_len
-                closest_perp = perp_vec
+def ordered_tour(points, path, radio_range=0.):
+    """
+    Build a Tour that visits points in a given order. This is used by solvers
+    that only produce a visiting order. The collection point for each point
+    is where a traveller on the straight line between its neighbors on the
+    path would come within radio range of it.
 
-            tail = head
-            head += 1
+    :param points: The set of 2D points over which to find a path.
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param path: The order in which to visit the points
+    :type path: np.array
+    :param radio_range:
+    :type radio_range: float
 
-        tour.insert(closest_segment, point_idx)
+    :return: A Tour object containing the original points and a list of indexes
+    into those points describing the path between them.
+    :rtype: Tour
+    """
 
-        collect_point = closest_perp - p
-        radius = np.linalg.norm(collect_point)
+    if len(points) < 3:
+        return hull_insertion_tour(points, radio_range)
 
-        if radius > radio_range:
-            collect_point /= radius
-            collect_point *= radio_range
+    path = np.asarray(path)
+    hull = sp.ConvexHull(points, qhull_options='QJ Pp')
 
-        collect_point += p
-        collection_points[point_idx] = collect_point
+    ordered = points[path]
+    starts = np.roll(ordered, 1, axis=0)
+    ends = np.roll(ordered, -1, axis=0)
+    _, perps = linalg.closest_points(starts, ends, ordered)
 
-    tour.append(tour[0])
+    offsets = perps - ordered
+    radii = np.sqrt(linalg.row_dot(offsets, offsets))
+    scale = np.ones_like(radii)
+    too_far = radii > radio_range
+    scale[too_far] = radio_range / radii[too_far]
+
+    collection_points = np.empty_like(points)
+    collection_points[path] = ordered + offsets * scale[:, np.newaxis]
 
+    route = Tour()
     route.points = points
-    route.vertices = np.array(tour)
+    route.vertices = np.append(path, path[0])
     route.collection_points = collection_points
+    route.hull = np.copy(hull.vertices)
+    return route
 
-    # TODO: Remove these asserts
-    for i in range(len(points)):
-        assert i in tour
-    assert len(tour) == len(points) + 1
-    assert len(route.points) == len(route.collection_points)
 
-    return route
+def nearest_neighbor_2opt_tour(points, radio_range=0.):
+    """
+    Build a tour by nearest neighbor construction, improved with 2-opt.
+    """
+    path = tsp.two_opt(points, tsp.nearest_neighbor(points))
+    return ordered_tour(points, path, radio_range)
+
+
+def or_opt_tour(points, radio_range=0.):
+    """
+    Build a tour by hull insertion, refined by Or-opt chain relocation.
+    """
+    path = hull_insertion_tour(points, radio_range).vertices[:-1]
+    path = tsp.or_opt(points, path)
+    return ordered_tour(points, path, radio_range)
+
+
+def greedy_edge_tour(points, radio_range=0.):
+    """
+    Build a tour with the O(n log n) greedy-edge construction.
+    """
+    path = tsp.greedy_edge(points)
+    return ordered_tour(points, path, radio_range)
+
+
+#: The available tour solvers, by name. Each one takes the points and radio
+#: range, and returns a Tour. Use register_solver() to add more.
+SOLVERS = {
+    'hull_insertion': hull_insertion_tour,
+    'nearest_neighbor_2opt': nearest_neighbor_2opt_tour,
+    'or_opt': or_opt_tour,
+    'greedy_edge': greedy_edge_tour,
+}
+
+#: The policy used by the "auto" solver for tours without a radio range, as
+#: (point count, solver name) pairs. The first solver whose point count
+#: exceeds the number of points is used.
+AUTO_POLICY = [
+    (1000, 'hull_insertion'),
+    (np.inf, 'greedy_edge'),
+]
+
+#: The solver used by "auto" for tours with a radio range. The order based
+#: solvers (e.g., greedy_edge) pick their visiting order as if the radio range
+#: were zero and only then clip the collection points, so their tours are far
+#: longer than hull insertion's at realistic ranges (see
+#: benchmarks.solver_bench). Hull insertion is kept until a fast solver
+#: accounts for the radio range.
+AUTO_RANGED_SOLVER = 'hull_insertion'
+
+
+def register_solver(name, solver):
+    """
+    Make a tour solver available to compute_tour() and Environment.tour_solver
+
+    :param name: The name to register the solver under
+    :type name: str
+    :param solver: A callable taking (points, radio_range) and returning a Tour
+    :return: None
+    """
+    SOLVERS[name] = solver
+
+
+def select_solver(name, point_count, radio_range=0.):
+    """
+    Resolve a solver name, applying the "auto" policy if requested.
+
+    :param name: The name of a registered solver, or "auto"
+    :type name: str
+    :param point_count: The number of points in the tour
+    :type point_count: int
+    :param radio_range: The radio range of the tour
+    :type radio_range: float
+    :return: The name of a registered solver
+    :rtype: str
+    """
+
+    if name == 'auto' and radio_range > 0.:
+        return AUTO_RANGED_SOLVER
+
+    if name == 'auto':
+        for limit, solver in AUTO_POLICY:
+            if point_count < limit:
+                return solver
+
+    if name not in SOLVERS:
+        raise TourError("Unknown tour solver {}".format(name))
+
+    return name
+
+
+def _base_length(route):
+    """
+    :return: The length of a tour when it was last fully computed
+    :rtype: float
+    """
+    if route.base_length is None:
+        return route.length
+
+    return route.base_length
+
+
+def insert_point(route, point, obj=None, radio_range=0.):
+    """
+    Add a single point to an existing tour without recomputing it. The point
+    is treated exactly like an interior point in compute_tour(), meaning it is
+    spliced into the path at the nearest tour edge.
+
+    The original route is left untouched, as tours may be shared between
+    clusters.
+
+    :param route: The tour to extend
+    :type route: Tour
+    :param point: The 2D point to add
+    :type point: np.array
+    :param obj: The object corresponding to point, appended to route.objects
+    :param radio_range:
+    :type radio_range: float
+
+    :return: A new Tour including point, or None if point cannot be added
+             locally (the tour is too small, or point lies outside the hull
+             and would change it). Callers should fall back to compute_tour()
+             in that case.
+    :rtype: Tour | None
+    """
+
+    if route.hull is None or len(route.hull) < 3:
+        return None
+
+    if not linalg.inside_polygon(route.points[route.hull], point):
+        return None
+
+    path = list(route.vertices[:-1])
+    closest_segment, closest_perp = _closest_edge(route.collection_points,
+                                                  path, point)
+
+    point_idx = len(route.points)
+    path.insert(closest_segment, point_idx)
+    path.append(path[0])
+
+    new_route = Tour()
+    new_route.points = np.vstack((route.points, point))
+    new_route.vertices = np.array(path)
+    new_route.collection_points = np.vstack(
+        (route.collection_points,
+         _collection_point(closest_perp, point, radio_range)))
+    new_route.hull = route.hull
+    if route.objects is not None:
+        new_route.objects = route.objects + [obj]
+    new_route.edits = route.edits + 1
+    new_route.base_length = _base_length(route)
+    return new_route
+
+
+def remove_point(route, point_idx):
+    """
+    Remove a single point from an existing tour without recomputing it. The
+    point is spliced out by joining its neighbors on the path.
+
+    The original route is left untouched, as tours may be shared between
+    clusters.
+
+    :param route: The tour to shrink
+    :type route: Tour
+    :param point_idx: The index of the point to remove
+    :type point_idx: int
+
+    :return: A new Tour without the point, or None if the point cannot be
+             removed locally (the tour is too small, or the point is on the
+             hull). Callers should fall back to compute_tour() in that case.
+    :rtype: Tour | None
+    """
+
+    if route.hull is None or len(route.points) <= 3:
+        return None
+
+    if point_idx in route.hull:
+        return None
+
+    path = route.vertices[:-1]
+    path = path[path != point_idx]
+    path = path - (path > point_idx)
+
+    hull = route.hull - (route.hull > point_idx)
+
+    new_route = Tour()
+    new_route.points = np.delete(route.points, point_idx, 0)
+    new_route.vertices = np.append(path, path[0])
+    new_route.collection_points = np.delete(route.collection_points,
+                                            point_idx, 0)
+    new_route.hull = hull
+    if route.objects is not None:
+        new_route.objects = (route.objects[:point_idx] +
+                             route.objects[point_idx + 1:])
+    new_route.edits = route.edits + 1
+    new_route.base_length = _base_length(route)
+    return new_route
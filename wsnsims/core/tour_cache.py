@@ -0,0 +1,144 @@
+"""Cache of computed tours, keyed by the toured nodes"""
+
+import collections
+import logging
+
+logger = logging.getLogger(__name__)
+
+CacheStats = collections.namedtuple('CacheStats',
+                                    ['hits', 'misses', 'evictions', 'entries',
+                                     'nbytes'])
+
+
+def tour_key(nodes, radio_range, solver):
+    """
+    Build the cache key for a tour over the given nodes. The tour solvers
+    depend on the order of their input, so tours are keyed by the ordered
+    sequence of node identities, and a cached tour is always the one a fresh
+    build would give. Cached tours hold references to their nodes (via
+    Tour.objects), which guarantees the identities are not reused while an
+    entry is alive.
+
+    :param nodes: The objects being toured (segments, cells, relay nodes...)
+    :type nodes: list
+    :param radio_range: The radio range used for the tour
+    :type radio_range: float
+    :param solver: The name of the tour solver
+    :type solver: str
+    :return: A hashable key
+    :rtype: tuple
+    """
+    return tuple(id(node) for node in nodes), radio_range, solver
+
+
+def tour_nbytes(route):
+    """
+    Estimate the memory held by a tour.
+
+    :param route: The tour to measure
+    :type route: core.tour.Tour
+    :return: The approximate size in bytes
+    :rtype: int
+    """
+
+    size = 0
+    for array in (route.points, route.collection_points, route.vertices,
+                  route.hull):
+        if array is not None:
+            size += array.nbytes
+
+    if route.objects is not None:
+        size += 8 * len(route.objects)
+
+    return size
+
+
+class TourCache(object):
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024):
+        """
+        A least-recently-used cache of Tour objects. Each simulation
+        environment has its own cache (see Environment.tours), so that tours
+        (and the nodes they reference) do not outlive the scenario they were
+        computed for.
+
+        :param max_entries: The maximum number of tours to keep
+        :type max_entries: int
+        :param max_bytes: The maximum (estimated) memory held by cached tours
+        :type max_bytes: int
+        """
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._tours = collections.OrderedDict()
+        self._nbytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Look up a tour, marking it as recently used.
+
+        :param key: A key from tour_key()
+        :return: The cached tour, or None
+        :rtype: core.tour.Tour | None
+        """
+
+        route = self._tours.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._tours.move_to_end(key)
+        return route
+
+    def put(self, key, route):
+        """
+        Store a tour, evicting the least recently used tours as needed to stay
+        within the entry and memory limits.
+
+        :param key: A key from tour_key()
+        :param route: The tour to store
+        :type route: core.tour.Tour
+        :return: None
+        """
+
+        size = tour_nbytes(route)
+        if size > self.max_bytes:
+            return
+
+        if key in self._tours:
+            self._nbytes -= tour_nbytes(self._tours.pop(key))
+
+        self._tours[key] = route
+        self._nbytes += size
+
+        while (len(self._tours) > self.max_entries or
+               self._nbytes > self.max_bytes):
+            _, evicted = self._tours.popitem(last=False)
+            self._nbytes -= tour_nbytes(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all cached tours. The hit and miss counters are left untouched.
+
+        :return: None
+        """
+        self._tours.clear()
+        self._nbytes = 0
+
+    def stats(self):
+        """
+        :return: The current cache counters and footprint
+        :rtype: CacheStats
+        """
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          len(self._tours), self._nbytes)
+
+    def __len__(self):
+        return len(self._tours)
+
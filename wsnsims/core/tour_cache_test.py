@@ -0,0 +1,124 @@
+import numpy as np
+
+from wsnsims.core import data
+from wsnsims.core import segment
+from wsnsims.core import tour
+from wsnsims.core import tour_cache
+from wsnsims.core.cluster import BaseCluster
+from wsnsims.core.environment import Environment
+
+
+def _route(size):
+    return tour.compute_tour(np.random.rand(size, 2) * 100.)
+
+
+def test_cache_counts_hits_and_misses():
+    cache = tour_cache.TourCache()
+    route = _route(5)
+
+    assert cache.get('a') is None
+    cache.put('a', route)
+    assert cache.get('a') is route
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.entries == 1
+    assert stats.nbytes == tour_cache.tour_nbytes(route)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = tour_cache.TourCache(max_entries=2)
+    cache.put('a', _route(5))
+    cache.put('b', _route(5))
+    cache.get('a')
+    cache.put('c', _route(5))
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.stats().evictions == 1
+
+
+def test_cache_respects_memory_limit():
+    route = _route(10)
+    cache = tour_cache.TourCache(max_bytes=2 * tour_cache.tour_nbytes(route))
+    for key in range(5):
+        cache.put(key, route)
+
+    assert len(cache) == 2
+    assert cache.stats().nbytes <= cache.max_bytes
+
+
+def test_clusters_with_the_same_nodes_share_tours():
+    env = Environment()
+    env.tour_cache = True
+    segments = [segment.Segment(nd) for nd in np.random.rand(8, 2) * 100.]
+
+    first = BaseCluster(env)
+    for seg in segments:
+        first.add(seg)
+
+    second = BaseCluster(env)
+    for seg in segments:
+        second.add(seg)
+
+    assert first.tour is second.tour
+
+    # The solvers depend on input order, so a different order is not shared
+    reordered = BaseCluster(env)
+    reordered.nodes = list(reversed(segments))
+    assert reordered.tour is not first.tour
+
+    env.tour_cache = False
+    third = BaseCluster(env)
+    third.nodes = list(segments)
+    assert third.tour is not first.tour
+
+
+def test_tours_are_scoped_to_the_scenario():
+    env = Environment()
+    env.tour_cache = True
+    segments = [segment.Segment(nd) for nd in np.random.rand(6, 2) * 100.]
+    traffic = data.TrafficMatrix(segments, env)
+
+    cluster = BaseCluster(env)
+    cluster.nodes = list(segments)
+    assert cluster.tour
+    assert len(env.tours) == 1
+    assert len(Environment().tours) == 0
+
+    traffic.release()
+    assert len(env.tours) == 0
+
+
+def test_cached_tours_match_fresh_builds():
+    env = Environment()
+    env.tour_cache = True
+    np.random.seed(12)
+
+    # Spread the nodes well beyond the radio range, so the tours are not
+    # trivial
+    segments = [segment.Segment(nd) for nd in np.random.rand(30, 2) * 1000.]
+
+    first = BaseCluster(env)
+    first.nodes = list(segments)
+    shared = BaseCluster(env)
+    shared.nodes = list(segments)
+    assert shared.tour is first.tour
+
+    env.tour_cache = False
+    fresh = BaseCluster(env)
+    fresh.nodes = list(segments)
+    assert fresh.tour is not first.tour
+    assert fresh.tour_length == first.tour_length
+    assert np.array_equal(fresh.tour.vertices, first.tour.vertices)
+
+
+def test_tour_cache_is_opt_in():
+    env = Environment()
+    cluster = BaseCluster(env)
+    cluster.nodes = [segment.Segment(nd) for nd in np.random.rand(6, 2)]
+
+    assert cluster.tour
+    assert len(env.tours) == 0
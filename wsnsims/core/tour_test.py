@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from wsnsims.benchmarks.tour_bench import reference_tour
+from wsnsims.core import linalg
+from wsnsims.core import tour
+
+
+def test_closest_points_matches_closest_point():
+    np.random.seed(0)
+    starts = np.random.rand(200, 2) * 100.
+    ends = np.random.rand(200, 2) * 100.
+    ends[::10] = starts[::10]
+    p = np.array([50., 50.])
+
+    distances, projections = linalg.closest_points(starts, ends, p)
+    for i in range(len(starts)):
+        distance, projection = linalg.closest_point(starts[i], ends[i], p)
+        assert distance == distances[i]
+        assert np.array_equal(projection, projections[i])
+
+
+def test_tours_visit_each_point_once():
+    np.random.seed(1)
+    points = np.random.rand(50, 2) * 1200.
+    route = tour.compute_tour(points, radio_range=100.)
+
+    assert route.vertices[0] == route.vertices[-1]
+    assert sorted(route.vertices[:-1]) == list(range(len(points)))
+
+
+def test_tours_match_the_scalar_reference():
+    np.random.seed(2)
+    for size in [3, 10, 40, 200]:
+        points = np.random.rand(size, 2) * 1200.
+        route = tour.compute_tour(points, radio_range=100.)
+        assert np.array_equal(route.vertices, reference_tour(points, 100.))
+
+
+def test_all_solvers_visit_each_point_once():
+    np.random.seed(3)
+    for size in [1, 2, 3, 4, 25]:
+        points = np.random.rand(size, 2) * 1200.
+        for name in tour.SOLVERS:
+            route = tour.compute_tour(points, radio_range=50., solver=name)
+            assert sorted(set(route.vertices)) == list(range(size))
+            assert len(route.collection_points) == size
+            assert route.length >= 0.
+
+
+def test_auto_solver_selects_by_point_count():
+    for limit, name in tour.AUTO_POLICY:
+        if np.isinf(limit):
+            continue
+        assert tour.select_solver('auto', limit - 1) == name
+        assert tour.select_solver('auto', limit) != name
+
+
+def test_auto_solver_keeps_hull_insertion_with_a_radio_range():
+    for count in [10, 1000, 5000]:
+        assert tour.select_solver('auto', count, 100.) == 'hull_insertion'
+
+
+def test_unknown_solvers_raise():
+    with pytest.raises(tour.TourError):
+        tour.select_solver('no_such_solver', 10)
@@ -0,0 +1,331 @@
+"""Tour construction and refinement heuristics over plain point sets"""
+
+import numpy as np
+import scipy.spatial as sp
+
+#: Ignore "improvements" smaller than this to avoid cycling on round-off.
+EPSILON = 1e-9
+
+#: The number of nearest neighbors used as candidate edges by greedy_edge().
+GREEDY_NEIGHBORS = 10
+
+
+def _distance(points, a, b):
+    delta = points[a] - points[b]
+    return np.sqrt(np.sum(delta * delta, axis=-1))
+
+
+def path_length(points, path):
+    """
+    Find the length of a closed path over points.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param path: The order in which to visit the points. The return to the
+                 first point is implied.
+    :type path: np.array
+    :return: The total length of the closed path
+    :rtype: float
+    """
+    path = np.asarray(path)
+    if len(path) < 2:
+        return 0.
+
+    return float(np.sum(_distance(points, path, np.roll(path, -1))))
+
+
+def nearest_neighbor(points, start=0):
+    """
+    Build a path by repeatedly travelling to the closest unvisited point.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param start: The index of the first point to visit
+    :type start: int
+    :return: The order in which to visit the points
+    :rtype: np.array
+    """
+
+    count = len(points)
+    path = np.empty(count, dtype=int)
+    visited = np.zeros(count, dtype=bool)
+
+    current = start
+    for i in range(count):
+        path[i] = current
+        visited[current] = True
+        if i == count - 1:
+            break
+
+        distances = _distance(points, np.arange(count), current)
+        distances[visited] = np.inf
+        current = int(np.argmin(distances))
+
+    return path
+
+
+def two_opt(points, path, max_passes=50):
+    """
+    Improve a closed path by reversing sub-paths whenever doing so shortens
+    the tour. Each pass scores every candidate reversal for a given edge in
+    one vectorized step.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param path: The initial visiting order
+    :type path: np.array
+    :param max_passes: The maximum number of improvement passes
+    :type max_passes: int
+    :return: The improved visiting order
+    :rtype: np.array
+    """
+
+    path = np.array(path)
+    count = len(path)
+    if count < 4:
+        return path
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(count - 2):
+            a = path[i]
+            b = path[i + 1]
+
+            # Consider every edge (c, d) that does not share a point with
+            # edge (a, b). The closing edge is included by wrapping around.
+            j = np.arange(i + 2, count if i > 0 else count - 1)
+            if not len(j):
+                continue
+
+            c = path[j]
+            d = path[(j + 1) % count]
+
+            gain = (_distance(points, a, c) + _distance(points, b, d) -
+                    _distance(points, a, b) - _distance(points, c, d))
+
+            best = int(np.argmin(gain))
+            if gain[best] < -EPSILON:
+                k = j[best]
+                path[i + 1:k + 1] = path[i + 1:k + 1][::-1]
+                improved = True
+
+        if not improved:
+            break
+
+    return path
+
+
+def or_opt(points, path, max_segment=3, max_passes=50):
+    """
+    Improve a closed path by relocating short chains of consecutive points
+    (of up to max_segment points) to the position, in either orientation,
+    where they cost the least.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param path: The initial visiting order
+    :type path: np.array
+    :param max_segment: The longest chain of points to relocate
+    :type max_segment: int
+    :param max_passes: The maximum number of improvement passes
+    :type max_passes: int
+    :return: The improved visiting order
+    :rtype: np.array
+    """
+
+    path = np.array(path)
+    count = len(path)
+
+    for _ in range(max_passes):
+        improved = False
+        for length in range(1, max_segment + 1):
+            if count < length + 3:
+                break
+
+            i = 0
+            while i < count:
+                # Rotate so the chain starts at index 1. The chain runs from
+                # path[1] to path[length], with path[0] before it and
+                # path[length + 1] after it.
+                rotated = np.roll(path, 1 - i)
+                prev, first = rotated[0], rotated[1]
+                last, after = rotated[length], rotated[length + 1]
+
+                removal_gain = (_distance(points, prev, first) +
+                                _distance(points, last, after) -
+                                _distance(points, prev, after))
+
+                # Candidate edges (c, d) in the remaining path, which runs
+                # from "after" around to "prev". The (prev, after) edge is
+                # where the chain already sits, so it is left out.
+                rest = np.concatenate((rotated[length + 1:], rotated[:1]))
+                c = rest[:-1]
+                d = rest[1:]
+                base = _distance(points, c, d)
+                forward = (_distance(points, c, first) +
+                           _distance(points, last, d) - base)
+                backward = (_distance(points, c, last) +
+                            _distance(points, first, d) - base)
+
+                costs = np.minimum(forward, backward)
+                best = int(np.argmin(costs))
+                if costs[best] < removal_gain - EPSILON:
+                    chain = rotated[1:length + 1]
+                    if backward[best] < forward[best]:
+                        chain = chain[::-1]
+
+                    path = np.concatenate(
+                        (rest[:best + 1], chain, rest[best + 1:]))
+                    improved = True
+
+                i += 1
+
+        if not improved:
+            break
+
+    return path
+
+
+def _chain_fragments(points, fragments):
+    """
+    Chain path fragments into a single path, always jumping from the end of
+    the path to the closest free fragment end. The free ends are kept in a
+    KD-tree. Ends of fragments already on the path are skipped, and the tree
+    is rebuilt over the remaining ends once half of its entries are used up.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param fragments: The fragments, as lists of point indexes
+    :type fragments: list(list(int))
+    :return: The order in which to visit the points
+    :rtype: np.array
+    """
+
+    count = len(fragments)
+
+    # End i is the head of fragment i for i < count, else a tail
+    ends = np.array([f[0] for f in fragments] + [f[-1] for f in fragments])
+    owners = np.tile(np.arange(count), 2)
+    used = np.zeros(count, dtype=bool)
+
+    path = list(fragments[0])
+    used[0] = True
+    live = np.flatnonzero(~used[owners])
+    tree = sp.cKDTree(points[ends[live]]) if len(live) else None
+    stale = 0
+
+    for _ in range(count - 1):
+        # Widen the search until it reaches a free end, and past any ends
+        # tied with it
+        k = 2
+        while True:
+            k = min(k, len(live))
+            reach, found = tree.query(points[path[-1]], k=k)
+            found = live[np.atleast_1d(found)]
+            found = found[~used[owners[found]]]
+            if len(found):
+                distances = _distance(points, ends[found], path[-1])
+                closest = np.min(distances)
+                if k == len(live) or np.max(reach) > closest * (1. + 1e-9):
+                    break
+            k *= 2
+
+        # Break ties towards heads, then towards earlier fragments
+        end = np.min(found[distances == closest])
+
+        fragment = owners[end]
+        if end < count:
+            path.extend(fragments[fragment])
+        else:
+            path.extend(reversed(fragments[fragment]))
+
+        used[fragment] = True
+        stale += 2
+        if 2 * stale > len(live) and not np.all(used):
+            live = np.flatnonzero(~used[owners])
+            tree = sp.cKDTree(points[ends[live]])
+            stale = 0
+
+    return np.array(path)
+
+
+def greedy_edge(points, neighbors=GREEDY_NEIGHBORS):
+    """
+    Build a path with the greedy-edge heuristic. Candidate edges are limited
+    to each point's nearest neighbors (found with a KD-tree), so construction
+    is O(n log n). The shortest candidate edges are accepted as long as no
+    point gets more than two edges and no premature cycle is formed. The
+    resulting path fragments are then chained together nearest-end first,
+    with the free fragment ends looked up in a KD-tree.
+
+    :param points: The set of 2D points
+    :type points: np.array laid out as [[3,4], [9,2], ...]
+    :param neighbors: The number of nearest neighbors to consider per point
+    :type neighbors: int
+    :return: The order in which to visit the points
+    :rtype: np.array
+    """
+
+    count = len(points)
+    if count < 4:
+        return np.arange(count)
+
+    k = min(neighbors, count - 1) + 1
+    distances, indexes = sp.cKDTree(points).query(points, k=k)
+
+    src = np.repeat(np.arange(count), k - 1)
+    dst = indexes[:, 1:].ravel()
+    lengths = distances[:, 1:].ravel()
+
+    # Keep each undirected edge once, then sort by length
+    edges = np.sort(np.column_stack((src, dst)), axis=1)
+    edges, first = np.unique(edges, axis=0, return_index=True)
+    src, dst, lengths = edges[:, 0], edges[:, 1], lengths[first]
+    order = np.argsort(lengths, kind='stable')
+
+    degree = np.zeros(count, dtype=int)
+    parent = np.arange(count)
+    adjacency = [[] for _ in range(count)]
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for e in order:
+        a, b = src[e], dst[e]
+        if degree[a] > 1 or degree[b] > 1:
+            continue
+
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+
+        parent[root_a] = root_b
+        degree[a] += 1
+        degree[b] += 1
+        adjacency[a].append(b)
+        adjacency[b].append(a)
+
+    # Walk each fragment from one of its ends
+    fragments = list()
+    seen = np.zeros(count, dtype=bool)
+    for start in np.flatnonzero(degree < 2):
+        if seen[start]:
+            continue
+
+        fragment = [start]
+        seen[start] = True
+        previous, current = -1, start
+        while True:
+            step = [n for n in adjacency[current] if n != previous]
+            if not step:
+                break
+            previous, current = current, step[0]
+            fragment.append(current)
+            seen[current] = True
+
+        fragments.append(fragment)
+
+    return _chain_fragments(points, fragments)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from wsnsims.core import tsp
+
+
+def test_refinements_never_lengthen_a_path():
+    np.random.seed(4)
+    points = np.random.rand(60, 2) * 1200.
+
+    path = tsp.nearest_neighbor(points)
+    two_opt = tsp.two_opt(points, path)
+    or_opt = tsp.or_opt(points, two_opt)
+
+    assert sorted(or_opt) == list(range(len(points)))
+    assert tsp.path_length(points, two_opt) <= tsp.path_length(points, path)
+    assert tsp.path_length(points, or_opt) <= tsp.path_length(points, two_opt)
+
+
+def test_greedy_edge_visits_each_point_once():
+    np.random.seed(5)
+    points = np.random.rand(500, 2) * 1200.
+    path = tsp.greedy_edge(points)
+    assert sorted(path) == list(range(len(points)))
+
+
+def _chain_naive(points, fragments):
+    fragments = [list(f) for f in fragments]
+    path = fragments.pop(0)
+    while fragments:
+        heads = [np.linalg.norm(points[f[0]] - points[path[-1]])
+                 for f in fragments]
+        tails = [np.linalg.norm(points[f[-1]] - points[path[-1]])
+                 for f in fragments]
+        if min(heads) <= min(tails):
+            path.extend(fragments.pop(int(np.argmin(heads))))
+        else:
+            path.extend(reversed(fragments.pop(int(np.argmin(tails)))))
+    return path
+
+
+def test_fragment_chaining_matches_a_linear_scan():
+    np.random.seed(6)
+    for grid in [False, True]:
+        points = np.random.rand(300, 2) * 100.
+        if grid:
+            # Snap to a coarse grid so that many fragment ends are tied
+            points = np.round(points / 10.) * 10.
+
+        order = np.random.permutation(len(points))
+        cuts = np.sort(np.random.choice(np.arange(1, len(points)), 80,
+                                        replace=False))
+        fragments = [list(f) for f in np.split(order, cuts)]
+
+        path = tsp._chain_fragments(points, fragments)
+        assert list(path) == _chain_naive(points, fragments)
@@ -19,17 +19,26 @@ class Cell(object):
 
     count = 0
 
-    def __init__(self, row, column, environment):
+    def __init__(self, row, column, environment, cell_id=None, grid=None):
         """
 
         :param row:
         :param column:
         :param environment:
         :type environment: core.environment.Environment
+        :param cell_id: The ID of the cell, if one has been reserved for it
+        :type cell_id: int
+        :param grid: The grid the cell belongs to, used to find its
+                     neighbours on first use
+        :type grid: flower.grid.Grid
         """
 
-        self.cell_id = Cell.count
-        Cell.count += 1
+        if cell_id is None:
+            cell_id = Cell.count
+            Cell.count += 1
+
+        self.cell_id = cell_id
+        self.grid = grid
 
         # Maintain the grid position.
         self.grid_location = np.array([row, column])
@@ -43,8 +52,9 @@ class Cell(object):
         # The segments within radio range of this cell.
         self.segments = list()
 
-        # The (maximum eight) cells immediately adjacent to this cell.
-        self.neighbors = list()
+        # The (maximum eight) cells immediately adjacent to this cell. These
+        # are looked up in the grid on first use.
+        self._neighbors = None
 
         # The number of segments within radio range of any neighbor cell
         self.signal_hop_count = 0
@@ -58,6 +68,11 @@ class Cell(object):
         # The numeric identifier of the cluster this cell belongs to.
         self._cluster_id = -1
 
+        # The position store holding this cell's location, and its row there
+        # (see core.positions.PositionStore)
+        self.store = None
+        self.position = -1
+
     @property
     def cluster_id(self):
         return self._cluster_id
@@ -66,6 +81,20 @@ class Cell(object):
     def cluster_id(self, value):
         self._cluster_id = value
 
+    @property
+    def neighbors(self):
+        if self._neighbors is None:
+            if self.grid is not None:
+                self._neighbors = self.grid.cell_neighbors(self)
+            else:
+                self._neighbors = list()
+
+        return self._neighbors
+
+    @neighbors.setter
+    def neighbors(self, value):
+        self._neighbors = value
+
     @property
     def access(self):
         """
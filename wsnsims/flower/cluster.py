@@ -41,7 +41,8 @@ class FlowerCluster(BaseCluster):
         for cell in self.cells:
             cluster_segments.extend(cell.segments)
 
-        cluster_segments = list(set(cluster_segments))
+        cluster_segments = sorted(set(cluster_segments),
+                                  key=lambda s: s.segment_id)
         return cluster_segments
 
     @property
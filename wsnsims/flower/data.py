@@ -1,29 +1,135 @@
-import itertools
+import numpy as np
+import scipy.sparse as sp
 
-from wsnsims.core.data import segment_volume
 
-data_memo = {}
+class CellTraffic(object):
+    def __init__(self, cells, traffic):
+        """
+        The data volume sent between every ordered pair of grid cells. The
+        volume between two cells is the total traffic between the segments
+        within range of each, so the whole C x C matrix is computed in one
+        shot as S * V * S^T, where S is the sparse cell x segment incidence
+        matrix and V is the segment traffic matrix.
 
+        Cells that are not given all share one final row and column of
+        zeros, so only the cells within range of a segment need to be given.
 
-def cell_volume(src, dst, env):
-    """
+        :param cells: The cells in the simulation grid that cover segments
+        :type cells: list(flower.cell.Cell)
+        :param traffic: The segment traffic for the scenario
+        :type traffic: core.data.TrafficMatrix
+        """
+
+        #: The cells in the order of the matrix rows and columns
+        self.cells = list(cells)
+        self._indexes = {cell: i for i, cell in enumerate(self.cells)}
+
+        rows = list()
+        columns = list()
+        for i, cell in enumerate(self.cells):
+            rows.extend([i] * len(cell.segments))
+            columns.extend(seg.index for seg in cell.segments)
+
+        # The extra row is for any cell not in self.cells
+        shape = (len(self.cells) + 1, len(traffic.segments))
+        incidence = sp.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                  shape=shape)
+
+        # (S * (S * V)^T)^T == S * V * S^T, keeping the sparse operand on the
+        # left of each product.
+        outgoing = incidence.dot(traffic.volumes)
+
+        #: The volume sent from cells[i] to cells[j] is volumes[i, j]. The
+        #: last row and column are for cells not in self.cells.
+        self.volumes = np.asarray(incidence.dot(outgoing.T)).T
+
+    def indexes(self, cells):
+        """
+        :param cells: A collection of cells from the grid
+        :return: The matrix indexes of the cells
+        :rtype: np.array
+        """
+        other = len(self.cells)
+        return np.fromiter((self._indexes.get(cell, other) for cell in cells),
+                           dtype=int)
+
+    def volume(self, src, dst):
+        """
+        :param src: The sending cell
+        :type src: flower.cell.Cell
+        :param dst: The receiving cell
+        :type dst: flower.cell.Cell
+        :return: The data volume sent from src to dst
+        :rtype: float
+        """
+        other = len(self.cells)
+        return self.volumes[self._indexes.get(src, other),
+                            self._indexes.get(dst, other)]
+
+    def block_sum(self, src_cells, dst_cells):
+        """
+        Sum the volumes over every (src, dst) pair in the product of two
+        groups of cells.
 
-    :param src:
-    :type src: flower.cell.Cell
-    :param dst:
-    :type dst: flower.cell.Cell
-    :param env:
-    :type env: core.environment.Environment
-    :return:
+        :param src_cells: The sending cells
+        :param dst_cells: The receiving cells
+        :return: The total data volume
+        :rtype: float
+        """
+        src = self.indexes(src_cells)
+        dst = self.indexes(dst_cells)
+        return np.sum(self.volumes[np.ix_(src, dst)])
+
+    def pairwise_sum(self, cells):
+        """
+        Sum the volumes between every ordered pair of distinct cells in a
+        group.
+
+        :param cells: The cells exchanging data
+        :return: The total data volume
+        :rtype: float
+        """
+        indexes = self.indexes(cells)
+        block = self.volumes[np.ix_(indexes, indexes)]
+        return np.sum(block) - np.trace(block)
+
+    def group_sums(self, groups):
+        """
+        Sum the volumes between every ordered pair of groups of cells at
+        once. Entry [i, j] of the result equals block_sum(groups[i],
+        groups[j]).
+
+        :param groups: The groups of cells (for instance, each cluster's cells)
+        :type groups: list(list(flower.cell.Cell))
+        :return: The K x K matrix of total volumes between the groups
+        :rtype: np.array
+        """
+
+        membership = np.zeros((len(groups), len(self.volumes)))
+        for i, group in enumerate(groups):
+            np.add.at(membership[i], self.indexes(group), 1.)
+
+        return membership.dot(self.volumes).dot(membership.T)
+
+
+def cell_traffic(grid, traffic):
     """
+    Get the cell traffic for a scenario, computing it on first use. The result
+    is kept with the scenario's aggregated volumes, so it is dropped when the
+    scenario is released (see TrafficMatrix.release()).
 
-    if (src, dst) in data_memo:
-        return data_memo[(src, dst)]
+    :param grid: The simulation grid
+    :type grid: flower.grid.Grid
+    :param traffic: The segment traffic for the scenario
+    :type traffic: core.data.TrafficMatrix
+    :return: The traffic between all cells of the grid
+    :rtype: CellTraffic
+    """
 
-    segment_pairs = itertools.product(src.segments, dst.segments)
-    total_volume = 0.  # pq.bit
-    for src, dst in segment_pairs:
-        total_volume += segment_volume(src, dst, env)
+    key = (CellTraffic, id(grid))
+    volumes = traffic.aggregates.get(key)
+    if volumes is None:
+        volumes = CellTraffic(grid.occupied(), traffic)
+        traffic.aggregates[key] = volumes
 
-    data_memo[(src, dst)] = total_volume
-    return total_volume
+    return volumes
@@ -0,0 +1,45 @@
+import itertools
+
+import numpy as np
+
+from wsnsims.core import data as core_data
+from wsnsims.core import segment
+from wsnsims.core.environment import Environment
+from wsnsims.flower import data
+from wsnsims.flower import grid
+
+
+def test_cell_traffic_matches_segment_pair_sums():
+    env = Environment()
+    env.grid_width = env.grid_height = 400.
+    np.random.seed(5)
+    locs = np.random.rand(25, 2) * env.grid_height
+    segments = [segment.Segment(nd) for nd in locs]
+    traffic = core_data.TrafficMatrix(segments, env)
+    cells = list(grid.Grid(segments, env).cells())
+
+    volumes = data.CellTraffic(cells, traffic)
+    for src, dst in itertools.product(cells, repeat=2):
+        expected = sum(traffic.volume(s, d) for s, d in
+                       itertools.product(src.segments, dst.segments))
+        assert np.isclose(volumes.volume(src, dst), expected)
+
+    groups = [cells[:3], cells[2:6], cells[7:8]]
+    sums = volumes.group_sums(groups)
+    for (i, src), (j, dst) in itertools.product(enumerate(groups), repeat=2):
+        assert np.isclose(sums[i, j], volumes.block_sum(src, dst))
+
+
+def test_cell_traffic_is_computed_once_per_scenario():
+    env = Environment()
+    env.grid_width = env.grid_height = 300.
+    segments = [segment.Segment(nd) for nd in np.random.rand(10, 2) * 300.]
+    traffic = core_data.TrafficMatrix(segments, env)
+    simulation_grid = grid.Grid(segments, env)
+
+    first = data.cell_traffic(simulation_grid, traffic)
+    assert data.cell_traffic(simulation_grid, traffic) is first
+    assert len(traffic.aggregates) == 1
+
+    traffic.release()
+    assert data.cell_traffic(simulation_grid, traffic) is not first
@@ -1,8 +1,8 @@
-import itertools
+import collections
 
 import numpy as np
 
-from wsnsims.flower.data import cell_volume
+from wsnsims.flower.data import cell_traffic
 
 
 class FLOWEREnergyModelError(Exception):
@@ -31,23 +31,23 @@ class FLOWEREnergyModel(object):
         :rtype: pq.bit
         """
 
+        volumes = cell_traffic(self.sim.grid, self.sim.traffic)
+
         if not intercluster_only:
             # Handle the intra-cluster data volume
-            cell_pairs = itertools.permutations(cluster.cells, 2)
-            internal_volume = np.sum(
-                [cell_volume(s, d, self.env) for s, d in cell_pairs])
+            internal_volume = volumes.pairwise_sum(cluster.cells)
         else:
             internal_volume = 0.  # * pq.bit
 
         # Handle the inter-cluster data volume
-        external_cells = list(set(self.sim.cells) - set(cluster.cells))
+        cluster_cells = set(cluster.cells)
+        external_cells = [c for c in self.sim.cells if c not in cluster_cells]
         # Outgoing data ...
-        cell_pairs = list(itertools.product(cluster.cells, external_cells))
+        external_volume = volumes.block_sum(cluster.cells, external_cells)
 
         # Incoming data ...
-        cell_pairs += list(itertools.product(external_cells, cluster.cells))
-        external_volume = np.sum(
-            [cell_volume(s, d, self.env) for s, d in cell_pairs])  # * pq.bit
+        external_volume += volumes.block_sum(external_cells,
+                                             cluster.cells)  # * pq.bit
 
         total_volume = internal_volume + external_volume
         return total_volume
@@ -85,42 +85,27 @@ class FLOWEREnergyModel(object):
                 if cell in cluster.cells:
                     cells.remove(cell)
 
+        volumes = cell_traffic(self.sim.grid, self.sim.traffic)
+
         if cells:
             # Handle the intra-hub data volume
-            cell_pairs = itertools.permutations(hub.cells, 2)
-            volume = np.sum([cell_volume(s, d, self.env)
-                             for s, d in cell_pairs])  # * pq.bit
+            volume = volumes.pairwise_sum(hub.cells)  # * pq.bit
         else:
             volume = 0  # * pq.bit
 
-        cluster_pairs = list()
-        # Handle the incoming volume from each cluster
-        for cluster in self.sim.clusters:
-            # If a cluster shares an anchor with another, then the hub MDC
-            # won't need to handle data between those clusters. Therefore, we
-            # need to carefully build our set of cluster pairs.
-
-            other_clusters = list(self.sim.clusters)
-
-            # Filter out clusters that share an anchor with this one
-            neighbors = self.neighbor_clusters(cluster)
-            for neighbor in neighbors:
-                other_clusters.remove(neighbor)
+        # Handle the incoming volume from each cluster. If a cluster shares
+        # an anchor with another, then the hub MDC won't need to handle data
+        # between those clusters. Every other pair of clusters is counted in
+        # both directions, once from each side.
+        clusters = self.sim.clusters
+        group_volumes = volumes.group_sums([c.cells for c in clusters])
+        for i, cluster in enumerate(clusters):
+            for j, other_cluster in enumerate(clusters):
+                if other_cluster.anchor == cluster.anchor:
+                    continue
 
-            for other_cluster in other_clusters:
-                # Cluster -> Other Cluster
-                cluster_pairs.append((cluster, other_cluster))
-
-                # Other Cluster -> Cluster
-                cluster_pairs.append((other_cluster, cluster))
-
-        for src_cluster, dst_cluster in cluster_pairs:
-            src_cells = src_cluster.cells
-            dst_cells = dst_cluster.cells
-
-            cell_pairs = itertools.product(src_cells, dst_cells)
-            volume += np.sum(
-                [cell_volume(s, d, self.env) for s, d in cell_pairs])
+                # Cluster -> Other Cluster and Other Cluster -> Cluster
+                volume += group_volumes[i, j] + group_volumes[j, i]
 
         return volume
 
@@ -147,14 +132,7 @@ class FLOWEREnergyModel(object):
         :rtype: flower.cluster.FlowerCluster
         """
 
-        all_clusters = self.sim.clusters + [self.sim.hub]
-
-        found_cluster = None
-        for clust in all_clusters:
-            if clust.cluster_id == cluster_id:
-                found_cluster = clust
-                break
-
+        found_cluster = self.sim.membership.find(cluster_id)
         if not found_cluster:
             raise FLOWEREnergyModelError(
                 "Could not find cluster {}".format(cluster_id))
@@ -191,3 +169,369 @@ class FLOWEREnergyModel(object):
         energy = self.total_comms_energy(clust)
         energy += self.total_movement_energy(clust)
         return energy
+
+
+#: The saved accounts of an energy ledger (see EnergyLedger.snapshot())
+LedgerSnapshot = collections.namedtuple('LedgerSnapshot',
+                                        ['members', 'counts', 'sent',
+                                         'received', 'self_volume', 'moves',
+                                         'energies'])
+
+
+class EnergyLedger(object):
+    def __init__(self, energy_model, resync_interval=64):
+        """
+        Running energy accounts for the clusters of a FLOWER simulation. For
+        each cluster, the ledger keeps the volume its cells send to (and
+        receive from) every cell of the grid. The ledger follows each cluster
+        it has measured through the same hooks as a membership index (see
+        core.cluster.BaseCluster.membership_indexes), so when a cluster gains
+        or loses a cell, only that cell's row and column of the cell traffic
+        are added or subtracted. Trial moves in the optimization loops are
+        then measured without summing over every pair of cells again.
+
+        The totals are the same as those of FLOWEREnergyModel, up to floating
+        point rounding. To keep rounding errors from building up, a cluster's
+        accounts are recomputed from scratch every resync_interval moves, and
+        whenever its cells are replaced wholesale. A trial move is undone by
+        swapping back the accounts saved by snapshot() (see rollback()).
+
+        Each cluster's total energy is also kept until its accounts or its
+        tour change (for the hub, until any cluster or anchor changes), so
+        measuring the energy balance after a trial move only recomputes the
+        energies of the clusters the move touched.
+
+        :param energy_model: The energy model of the simulation
+        :type energy_model: FLOWEREnergyModel
+        :param resync_interval: The number of single cell moves after which a
+                                cluster's accounts are recomputed
+        :type resync_interval: int
+        """
+
+        self.sim = energy_model.sim
+        self.env = energy_model.env
+        self.resync_interval = resync_interval
+
+        #: The cells each cluster's accounts currently cover
+        self._members = {}
+
+        #: The number of each cluster's cells on each row of the cell traffic.
+        #: Every cell outside of the traffic's cells shares its last row, so
+        #: that row may hold several of a cluster's cells.
+        self._counts = {}
+
+        #: Volume sent from each cluster's cells to every cell of the grid
+        self._sent = {}
+
+        #: Volume sent from every cell of the grid to each cluster's cells
+        self._received = {}
+
+        #: Volume each cluster's cells send to themselves
+        self._self_volume = {}
+
+        #: Single cell moves applied to each cluster since its last resync
+        self._moves = {}
+
+        #: The last total energy of each cluster, with the state it was
+        #: computed for (see _energy_key())
+        self._energies = {}
+
+        self._cover = None
+        self._cover_mask = None
+
+    def _volumes(self):
+        return cell_traffic(self.sim.grid, self.sim.traffic)
+
+    def _cover_cells(self):
+        """
+        :return: A mask over the grid of the cells used by the simulation
+        :rtype: np.array
+        """
+
+        if self._cover is not self.sim.cells:
+            volumes = self._volumes()
+            self._cover = self.sim.cells
+            self._cover_mask = np.zeros(len(volumes.volumes), dtype=bool)
+            self._cover_mask[volumes.indexes(self.sim.cells)] = True
+
+        return self._cover_mask
+
+    def _count(self, cells):
+        """
+        :return: The number of the given cells on each row of the cell traffic
+        :rtype: np.array
+        """
+        volumes = self._volumes()
+        return np.bincount(volumes.indexes(cells),
+                           minlength=len(volumes.volumes)).astype(float)
+
+    def _recompute(self, cluster):
+        """
+        Compute a cluster's accounts from scratch.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :return: None
+        """
+
+        volumes = self._volumes().volumes
+        counts = self._count(cluster.cells)
+
+        self._members[cluster] = set(cluster.cells)
+        self._counts[cluster] = counts
+        self._sent[cluster] = counts.dot(volumes)
+        self._received[cluster] = volumes.dot(counts)
+        self._self_volume[cluster] = np.diagonal(volumes).dot(counts)
+        self._moves[cluster] = 0
+        self._forget_energy(cluster)
+
+    def _accounts(self, cluster):
+        """
+        Start following a cluster, if the ledger is not already.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :return: The number of the cluster's cells on each row of the cell
+                 traffic
+        :rtype: np.array
+        """
+
+        if cluster not in self._members:
+            cluster.membership_indexes.append(self)
+            self._recompute(cluster)
+
+        return self._counts[cluster]
+
+    def _move(self, cluster, cell, sign):
+        """
+        Add (sign = 1) or subtract (sign = -1) a single cell's traffic to or
+        from a cluster's accounts.
+
+        :return: None
+        """
+
+        members = self._members[cluster]
+        if (cell in members) == (sign > 0):
+            return
+
+        if sign > 0:
+            self._members[cluster] = members | {cell}
+        else:
+            self._members[cluster] = members - {cell}
+
+        # The accounts are replaced rather than changed in place, so that
+        # snapshots can share them (see snapshot()).
+        volumes = self._volumes()
+        index = volumes.indexes([cell])[0]
+        counts = self._counts[cluster].copy()
+        counts[index] += sign
+        self._counts[cluster] = counts
+        self._sent[cluster] = (self._sent[cluster] +
+                               sign * volumes.volumes[index])
+        self._received[cluster] = (self._received[cluster] +
+                                   sign * volumes.volumes[:, index])
+        self._self_volume[cluster] += sign * volumes.volumes[index, index]
+
+        self._moves[cluster] += 1
+        self._forget_energy(cluster)
+        if self._moves[cluster] >= self.resync_interval:
+            self._recompute(cluster)
+
+    def _forget_energy(self, cluster):
+        """
+        Drop the kept total energy of a cluster whose accounts just changed,
+        and of the hub, which depends on the accounts of every cluster.
+
+        :return: None
+        """
+        self._energies.pop(cluster, None)
+        self._energies.pop(self.sim.hub, None)
+
+    def _energy_key(self, cluster):
+        """
+        :return: The state a cluster's total energy depends on, besides its
+                 accounts. This is the cluster's tour, and for the hub, the
+                 current clusters and their anchors as well.
+        :rtype: tuple
+        """
+        if cluster == self.sim.hub:
+            return (cluster.tour,) + tuple(
+                (c, c.anchor) for c in self.sim.clusters)
+
+        return cluster.tour,
+
+    def update(self, cluster):
+        """
+        Re-read all of the cells of a cluster. Called by the cluster when its
+        cells are replaced or rolled back, or its anchor changes.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :return: None
+        """
+        if set(cluster.cells) != self._members[cluster]:
+            self._recompute(cluster)
+
+    def added(self, cluster, node):
+        """
+        Record a cell just added to a cluster.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :param node: The added cell
+        :type node: flower.cell.Cell
+        :return: None
+        """
+        self._move(cluster, node, 1.)
+
+    def removed(self, cluster, node):
+        """
+        Record a cell just removed from a cluster.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :param node: The removed cell
+        :type node: flower.cell.Cell
+        :return: None
+        """
+        self._move(cluster, node, -1.)
+
+    def snapshot(self):
+        """
+        Save the accounts of every cluster the ledger follows, so that a trial
+        move can be undone by rollback() without recomputing them. The
+        accounts are never changed in place, so this only copies references.
+
+        :return: The saved accounts
+        :rtype: LedgerSnapshot
+        """
+        return LedgerSnapshot(dict(self._members), dict(self._counts),
+                              dict(self._sent), dict(self._received),
+                              dict(self._self_volume), dict(self._moves),
+                              dict(self._energies))
+
+    def rollback(self, snapshot):
+        """
+        Restore the accounts saved by snapshot(). Clusters the ledger started
+        following since then are dropped, and are measured again if needed.
+
+        :param snapshot: The accounts returned by snapshot()
+        :type snapshot: LedgerSnapshot
+        :return: None
+        """
+        for cluster in self._members:
+            if (cluster not in snapshot.members and
+                    self in cluster.membership_indexes):
+                cluster.membership_indexes.remove(self)
+
+        self._members = dict(snapshot.members)
+        self._counts = dict(snapshot.counts)
+        self._sent = dict(snapshot.sent)
+        self._received = dict(snapshot.received)
+        self._self_volume = dict(snapshot.self_volume)
+        self._moves = dict(snapshot.moves)
+        self._energies = dict(snapshot.energies)
+
+    def detach(self, clusters):
+        """
+        Stop following the given clusters (e.g., once they are replaced), and
+        drop their accounts.
+
+        :param clusters:
+        :type clusters: list(flower.cluster.FlowerCluster)
+        :return: None
+        """
+        for cluster in clusters:
+            if self in cluster.membership_indexes:
+                cluster.membership_indexes.remove(self)
+
+            for accounts in (self._members, self._counts, self._sent,
+                             self._received, self._self_volume, self._moves):
+                accounts.pop(cluster, None)
+            self._forget_energy(cluster)
+
+    def resync(self):
+        """
+        Recompute the accounts of every cluster the ledger follows from
+        scratch, dropping any accumulated rounding error.
+
+        :return: None
+        """
+        for cluster in self._members:
+            self._recompute(cluster)
+
+    def cluster_data_volume(self, cluster):
+        """
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :return: The same volume as FLOWEREnergyModel.cluster_data_volume()
+        :rtype: float
+        """
+
+        counts = self._accounts(cluster)
+        external = self._cover_cells() & (counts == 0)
+
+        volume = self._sent[cluster].dot(counts)
+        volume -= self._self_volume[cluster]
+        volume += np.sum(self._sent[cluster][external])
+        volume += np.sum(self._received[cluster][external])
+        return volume
+
+    def hub_data_volume(self, hub):
+        """
+        :param hub:
+        :type hub: flower.cluster.FlowerHub
+        :return: The same volume as FLOWEREnergyModel.hub_data_volume()
+        :rtype: float
+        """
+
+        hub_counts = self._accounts(hub)
+        clusters = self.sim.clusters
+        memberships = np.array([self._accounts(c) for c in clusters])
+
+        # Cells are matched by identity here, not by row, as the cells
+        # outside of the cell traffic all share a row.
+        volume = 0.
+        if any(all(cell not in self._members[c] for c in clusters)
+               for cell in self._members[hub]):
+            volume += self._sent[hub].dot(hub_counts)
+            volume -= self._self_volume[hub]
+
+        if clusters:
+            sent = np.array([self._sent[c] for c in clusters])
+            group_volumes = sent.dot(memberships.T)
+
+            # Label each cluster by its anchor, and count the traffic between
+            # every pair of clusters with different anchors (both ways).
+            labels = dict()
+            anchors = np.array([labels.setdefault(c.anchor, len(labels))
+                                for c in clusters])
+            apart = anchors[:, np.newaxis] != anchors[np.newaxis, :]
+            volume += np.sum(group_volumes[apart] + group_volumes.T[apart])
+
+        return volume
+
+    def total_energy(self, cluster):
+        """
+        Get the sum of communication and movement energy for a cluster.
+
+        :param cluster:
+        :type cluster: flower.cluster.FlowerCluster
+        :return:
+        :rtype: pq.J
+        """
+
+        key = self._energy_key(cluster)
+        kept = self._energies.get(cluster)
+        if kept and kept[0] == key:
+            return kept[1]
+
+        if cluster == self.sim.hub:
+            data_volume = self.hub_data_volume(cluster)
+        else:
+            data_volume = self.cluster_data_volume(cluster)
+
+        energy = data_volume * self.env.comms_cost
+        energy += cluster.tour_length * self.env.move_cost
+        self._energies[cluster] = key, energy
+        return energy
@@ -0,0 +1,156 @@
+import numpy as np
+
+from wsnsims.core.environment import Environment
+from wsnsims.flower.flower_sim import FLOWER
+
+
+def _assert_ledger_matches(sim):
+    for cluster in sim.clusters + [sim.hub]:
+        expected = sim.energy_model.total_energy(cluster.cluster_id)
+        assert np.isclose(sim.ledger.total_energy(cluster), expected)
+
+
+def test_ledger_follows_trial_moves():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 5
+    np.random.seed(4)
+    sim = FLOWER(env).compute_paths()
+    _assert_ledger_matches(sim)
+
+    # Move a cell to the hub, as in FLOWER.optimization(), and back again
+    donor = max(sim.clusters, key=lambda c: len(c.cells))
+    cell = donor.cells[-1]
+    donor.remove(cell)
+    sim.hub.add(cell)
+    sim.update_anchors()
+    _assert_ledger_matches(sim)
+
+    sim.hub.remove(cell)
+    donor.add(cell)
+    sim.update_anchors()
+    _assert_ledger_matches(sim)
+
+
+def test_ledger_follows_many_trial_moves():
+    env = Environment()
+    env.segment_count = 40
+    env.mdc_count = 6
+    np.random.seed(9)
+    sim = FLOWER(env).compute_paths()
+    sim.ledger.resync_interval = 16
+
+    # Random trial moves between the clusters and the hub, some kept and
+    # some rolled back, as in the optimization loops
+    for step in range(200):
+        clusters = [c for c in sim.clusters + [sim.hub] if len(c.cells) > 1]
+        donor = clusters[np.random.randint(len(clusters))]
+        others = [c for c in sim.clusters + [sim.hub] if c is not donor]
+        receiver = others[np.random.randint(len(others))]
+        cell = donor.cells[np.random.randint(len(donor.cells))]
+
+        saved = sim.snapshot()
+        donor.remove(cell)
+        receiver.add(cell)
+        sim.update_anchors()
+        _assert_ledger_matches(sim)
+
+        if step % 3:
+            sim.rollback(saved)
+            _assert_ledger_matches(sim)
+
+    sim.ledger.resync()
+    _assert_ledger_matches(sim)
+
+
+def test_rollback_restores_the_saved_accounts():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 5
+    np.random.seed(4)
+    sim = FLOWER(env).compute_paths()
+    _assert_ledger_matches(sim)
+
+    donor = max(sim.clusters, key=lambda c: len(c.cells))
+    saved = sim.snapshot()
+    _, accounts = saved
+
+    cell = donor.cells[-1]
+    donor.remove(cell)
+    sim.hub.add(cell)
+    sim.update_anchors()
+    _assert_ledger_matches(sim)
+
+    # The saved accounts are swapped back in, not computed again
+    sim.rollback(saved)
+    restored = sim.ledger.snapshot()
+    for cluster in [donor, sim.hub]:
+        assert restored.sent[cluster] is accounts.sent[cluster]
+        assert restored.received[cluster] is accounts.received[cluster]
+    _assert_ledger_matches(sim)
+
+
+def test_ledger_tells_apart_cells_outside_the_traffic():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 5
+    np.random.seed(4)
+    sim = FLOWER(env).compute_paths()
+    _assert_ledger_matches(sim)
+
+    # Cells covering no segments share a single row of the cell traffic, so
+    # give the hub and a cluster one each. Every other hub cell is shared
+    # with the cluster, so the hub only counts its own traffic because of
+    # its empty cell.
+    empty = [c for c in sim.grid.cells() if not c.segments]
+    cluster = max(sim.clusters, key=lambda c: len(c.cells))
+    for cell in list(sim.hub.cells):
+        sim.hub.remove(cell)
+    for cell in cluster.cells:
+        sim.hub.add(cell)
+
+    cluster.add(empty[0])
+    sim.hub.add(empty[1])
+    sim.update_anchors()
+    assert sim.energy_model.hub_data_volume(sim.hub) > 0.
+    _assert_ledger_matches(sim)
+
+    sim.hub.remove(empty[1])
+    sim.update_anchors()
+    _assert_ledger_matches(sim)
+
+
+def test_ledger_drops_replaced_clusters():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 5
+    np.random.seed(4)
+    sim = FLOWER(env).compute_paths()
+    _assert_ledger_matches(sim)
+
+    replaced = sim.clusters[0]
+    sim.clusters = sim.clusters[1:]
+    assert sim.ledger not in replaced.membership_indexes
+    assert replaced not in sim.ledger.snapshot().members
+    _assert_ledger_matches(sim)
+
+
+def test_balance_change_after_a_trial_move():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 5
+    np.random.seed(4)
+    sim = FLOWER(env).compute_paths()
+    balance = sim.energy_balance()
+    assert sim.balance_change(balance) == 0.
+
+    donor = max(sim.clusters, key=lambda c: len(c.cells))
+    cell = donor.cells[-1]
+    donor.remove(cell)
+    sim.hub.add(cell)
+    sim.update_anchors()
+
+    energies = [sim.energy_model.total_energy(c.cluster_id)
+                for c in sim.clusters + [sim.hub]]
+    assert np.isclose(sim.balance_change(balance),
+                      np.std(energies) - balance)
@@ -2,6 +2,7 @@ import logging
 
 import numpy as np
 
+from wsnsims.core import delay
 from wsnsims.flower.energy import FLOWEREnergyModel
 from wsnsims.flower.movement import FLOWERMovementModel
 
@@ -30,34 +31,95 @@ class FLOWERRunner(object):
         self.movement_model = FLOWERMovementModel(self.sim, self.env)
         self.energy_model = FLOWEREnergyModel(self.sim, self.env)
 
+        #: Cached all-pairs delay matrix (see delay_matrix())
+        self._delays = None
+
+    def delay_matrix(self):
+        """
+        Compute the communication delay between every pair of cells at once.
+        Entry [i, j] is the delay from cell i to cell j (in the order of
+        sim.cells), and matches communication_delay(). The diagonal is
+        meaningless.
+
+        :return: An N x N matrix of delays in seconds
+        :rtype: np.array
+        """
+
+        if self._delays is not None:
+            return self._delays
+
+        cells = self.sim.cells
+        travel_delay = self.movement_model.distance_matrix(cells)
+        travel_delay /= self.env.mdc_speed
+
+        clusters = [self.sim.hub] + self.sim.clusters
+        memberships = self.sim.membership.cluster_indexes(cells)
+        if np.any(memberships < 0):
+            cell = cells[np.argmin(memberships)]
+            raise FLOWERRunnerError("No cluster found for {}".format(cell))
+
+        counts = delay.transmission_counts(memberships, 0)
+
+        volumes = data.cell_traffic(self.sim.grid, self.sim.traffic)
+        transmission_delay = counts * volumes.volumes[
+            np.ix_(volumes.indexes(cells), volumes.indexes(cells))]
+        transmission_delay /= self.env.comms_rate
+
+        tour_times = dict()
+        for cluster in clusters:
+            tour_times[cluster] = self.tour_time(cluster)
+
+        holding_times = np.empty((len(clusters), len(clusters)))
+        for i, begin_cluster in enumerate(clusters):
+            for j, end_cluster in enumerate(clusters):
+                holding_times[i, j] = self._holding_time(
+                    begin_cluster, end_cluster, tour_times.__getitem__)
+
+        relay_delay = holding_times[np.ix_(memberships, memberships)]
+
+        self._delays = travel_delay + transmission_delay + relay_delay
+        return self._delays
+
     def maximum_communication_delay(self):
         """
-        Compute the average communication delay across all segments.
+        Compute the maximum communication delay across all cells.
 
         :return: The delay time in seconds
         :rtype: pq.quantity.Quantity
         """
 
-        cell_pairs = ((src, dst) for src in self.sim.cells for dst in
-                      self.sim.cells if src != dst)
-
-        delays = []
-        for src, dst in cell_pairs:
-            delay = self.communication_delay(src, dst)
-            delays.append(delay)
-
-        delays = np.array(delays)
-        max_delay = np.max(delays)
+        max_delay = np.max(delay.pair_delays(self.delay_matrix()))
         # max_delay *= pq.second
 
         return max_delay
 
+    def average_communication_delay(self):
+        """
+        Compute the average communication delay across all cells.
+
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.mean(delay.pair_delays(self.delay_matrix()))
+
+    def communication_delay_percentile(self, percentile):
+        """
+        Compute a percentile of the communication delays across all cells.
+
+        :param percentile: The percentile to compute, between 0 and 100
+        :type percentile: float
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.percentile(delay.pair_delays(self.delay_matrix()),
+                             percentile)
+
     def cell_cluster(self, cell):
-        for cluster in [self.sim.hub] + self.sim.clusters:
-            if cell in cluster.cells:
-                return cluster
+        clusters = self.sim.membership.clusters_of(cell)
+        if clusters:
+            return clusters[0]
 
-        raise FLOWERRunnerError("No cluster found for %s", cell)
+        raise FLOWERRunnerError("No cluster found for {}".format(cell))
 
     def communication_delay(self, begin, end):
         """
@@ -73,7 +135,7 @@ class FLOWERRunner(object):
         :rtype: pq.second
         """
 
-        travel_delay, path = self.movement_model.shortest_distance(begin, end)
+        travel_delay = self.movement_model.distance(begin, end)
         travel_delay /= self.env.mdc_speed
 
         begin_cluster = self.cell_cluster(begin)
@@ -87,7 +149,8 @@ class FLOWERRunner(object):
             transmission_count = 3
 
         transmission_delay = transmission_count
-        transmission_delay *= data.cell_volume(begin, end, self.env)
+        volumes = data.cell_traffic(self.sim.grid, self.sim.traffic)
+        transmission_delay *= volumes.volume(begin, end)
         transmission_delay /= self.env.comms_rate
 
         relay_delay = self.holding_time(begin, end)
@@ -108,25 +171,39 @@ class FLOWERRunner(object):
 
         begin_cluster = self.cell_cluster(begin)
         end_cluster = self.cell_cluster(end)
+        return self._holding_time(begin_cluster, end_cluster, self.tour_time)
+
+    def _holding_time(self, begin_cluster, end_cluster, tour_time):
+        """
+        Find the holding time for data sent between two clusters.
+
+        :param begin_cluster:
+        :type begin_cluster: flower.cluster.FlowerCluster
+        :param end_cluster:
+        :type end_cluster: flower.cluster.FlowerCluster
+        :param tour_time: A callable giving the tour time of a cluster
+        :return:
+        :rtype: pq.second
+        """
 
         if begin_cluster == end_cluster:
             return 0.  # * pq.second
 
         if begin_cluster.anchor == end_cluster.anchor:
-            delay = self.tour_time(end_cluster)
+            delay = tour_time(end_cluster)
             return delay
 
         elif begin_cluster == self.sim.hub:
-            delay = self.tour_time(end_cluster)
+            delay = tour_time(end_cluster)
             return delay
 
         elif end_cluster == self.sim.hub:
-            delay = self.tour_time(end_cluster)
+            delay = tour_time(end_cluster)
             return delay
 
         else:
-            delay = self.tour_time(self.sim.hub)
-            delay += self.tour_time(end_cluster)
+            delay = tour_time(self.sim.hub)
+            delay += tour_time(end_cluster)
             return delay
 
     def tour_time(self, cluster):
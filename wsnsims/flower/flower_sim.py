@@ -1,6 +1,5 @@
 """Main FLOWER simulation logic"""
 
-import collections
 import logging
 import warnings
 from typing import List
@@ -8,6 +7,10 @@ from typing import List
 import matplotlib.pyplot as plt
 import numpy as np
 
+from wsnsims.core import cover
+from wsnsims.core import data
+from wsnsims.core import membership
+from wsnsims.core import positions
 from wsnsims.core import segment
 from wsnsims.core.cluster import closest_nodes
 from wsnsims.core.comparisons import much_greater_than
@@ -18,8 +21,9 @@ from wsnsims.flower.cluster import FlowerCluster
 from wsnsims.flower.cluster import FlowerHub
 from wsnsims.flower.cluster import FlowerVirtualCluster
 from wsnsims.flower.cluster import FlowerVirtualHub
+from wsnsims.flower.energy import EnergyLedger
 from wsnsims.flower.energy import FLOWEREnergyModel
-from wsnsims.tocs.cluster import combine_clusters
+from wsnsims.tocs.cluster import agglomerate_clusters
 
 logger = logging.getLogger(__name__)
 warnings.filterwarnings('error')
@@ -41,9 +45,11 @@ class FLOWER(object):
 
         locs = np.random.rand(self.env.segment_count, 2) * self.env.grid_height
         self.segments = [segment.Segment(loc) for loc in locs]
+        self.positions = positions.PositionStore(self.segments)
+        self.traffic = data.TrafficMatrix(self.segments, self.env)
 
         self.grid = grid.Grid(self.segments, self.env)
-        self.cells = list(self.grid.cells())
+        self.cells = list(self.grid.occupied())
 
         segment_centroid = np.mean(locs, axis=0)
         logger.debug("Centroid located at %s", segment_centroid)
@@ -51,8 +57,11 @@ class FLOWER(object):
 
         self.energy_model = FLOWEREnergyModel(self, self.env)
 
+        #: Running per-cluster energy totals for the optimization loops
+        self.ledger = EnergyLedger(self.energy_model)
+
         self.virtual_clusters = list()  # type: List[FlowerVirtualCluster]
-        self.clusters = list()  # type: List[FlowerCluster]
+        self._clusters = list()  # type: List[FlowerCluster]
 
         # Create a virtual cell to represent the center of the damaged area
         virtual_center_cell = self.damaged
@@ -68,6 +77,37 @@ class FLOWER(object):
         self.em_is_large = False
         self.ec_is_large = False
 
+        #: Cluster membership lookups (see the membership property)
+        self._membership = None
+
+    @property
+    def clusters(self):
+        """
+        :return: The non-hub clusters of the simulation
+        :rtype: list(flower.cluster.FlowerCluster)
+        """
+        return self._clusters
+
+    @clusters.setter
+    def clusters(self, value):
+        # Clusters that are replaced are no longer followed by the ledger
+        self.ledger.detach([c for c in self._clusters if c not in value])
+        self._clusters = value
+
+    @property
+    def membership(self):
+        """
+        The membership index over the current clusters. It is rebuilt
+        whenever the list of clusters changes, and otherwise kept up to date
+        by the clusters themselves.
+
+        :return: The index over [sim.hub] + sim.clusters
+        :rtype: core.membership.MembershipIndex
+        """
+        self._membership = membership.refresh(
+            self._membership, [self.hub] + self.clusters, relays=False)
+        return self._membership
+
     def show_state(self):
 
         fig = plt.figure()
@@ -121,79 +161,42 @@ class FLOWER(object):
 
     def find_cells(self):
 
-        for cell in self.grid.cells():
-            # Calculate the cell's proximity as it's cell distance from
-            # the center of the "damaged area."
-            cell.proximity = grid.cell_distance(cell, self.damaged)
-
-        # Calculate the number of one-hop segments within range of each cell
-        for cell in self.grid.cells():
-            segments = set()
-            for nbr in cell.neighbors:
-                segments = set.union(segments, nbr.segments)
-                segments = segments.difference(cell.segments)
-
-            cell.single_hop_count = len(segments)
-
         # First, we need to filter the "families" for the set coverage. We
         # start by filtering for access, then 1-hop count, then proximity.
-        families = [c for c in self.grid.cells() if c.segments]
+        # Only the cells with access are ever candidates, so the rest of the
+        # grid is left alone.
+        families = list(self.grid.occupied())
+        coverage = self.grid.coverage[
+            [self.grid.index(cell) for cell in families]]
+
+        # Calculate each cell's proximity as its cell distance from the
+        # center of the "damaged area," and the number of one-hop segments
+        # within range of each cell
+        proximities = self.grid.proximity(self.damaged, families)
+        single_hop_counts = self.grid.single_hop_counts(families)
+        for cell, proximity, single_hop_count in zip(families, proximities,
+                                                     single_hop_counts):
+            cell.proximity = proximity
+            cell.single_hop_count = single_hop_count
 
         # Group by segments covered, this also has the effect of filtering by
-        # access.
-        family_map = collections.defaultdict(list)
-        for cell in families:
-            family_map[tuple(cell.segments)].append(cell)
-
-        # Filter by 1-hop
-        for segments, cells in family_map.items():
-            if len(cells) == 1:
-                continue
-
-            best_1_hop = 0
-            best_cells = list()
-            for cell in cells:
-                if cell.single_hop_count > best_1_hop:
-                    best_1_hop = cell.single_hop_count
-                    best_cells.clear()
-                    best_cells.append(cell)
-                elif cell.single_hop_count == best_1_hop:
-                    best_cells.append(cell)
-
-            family_map[segments] = best_cells
-
-        # Filter by proximity
-        for segments, cells in family_map.items():
-            if len(cells) == 1:
-                continue
-
-            best_proximity = np.inf
-            best_cells = list()
-            for cell in cells:
-                if cell.proximity < best_proximity:
-                    best_proximity = cell.proximity
-                    best_cells.clear()
-                    best_cells.append(cell)
-
-            assert best_cells
-            family_map[segments] = best_cells
-
-        families = list()
-        for _, cells in family_map.items():
-            families.extend(cells)
+        # access. Within each group, keep the cell with the best 1-hop count,
+        # then the best proximity, then the first in the grid.
+        groups = cover.row_groups(coverage)
+        order = np.lexsort((np.arange(len(families)), proximities,
+                            -single_hop_counts, groups))
+        firsts = np.ones(len(order), dtype=bool)
+        firsts[1:] = groups[order[1:]] != groups[order[:-1]]
+        best = order[firsts]
 
         # Calculate the set cover over the segments
-        cover = list()
-        uncovered = set(self.segments)
-
-        while uncovered:
-            selected = max(families, key=lambda s: len(
-                uncovered.intersection(set(s.segments))))
-            uncovered -= set(selected.segments)
-            cover.append(selected)
+        try:
+            picks = cover.greedy_cover(coverage[best])
+        except ValueError as e:
+            raise FlowerError("Segments out of range of every cell") from e
 
         # Initialized!!
-        cell_cover = list(cover)
+        cell_cover = [families[best[i]] for i in picks]
         logger.debug("Length of cover: %d", len(cell_cover))
 
         assert self.env.mdc_count < len(cell_cover)
@@ -201,7 +204,7 @@ class FLOWER(object):
         # Remove duplication among the cells
         cell_cover.sort(key=lambda c: len(c.segments), reverse=True)
 
-        covered_segments = list()
+        covered_segments = set()
         for cell in cell_cover:
             segments = list(cell.segments)
             for seg in segments:
@@ -209,7 +212,7 @@ class FLOWER(object):
                     # This segment is already served by another cell
                     cell.segments.remove(seg)
                 else:
-                    covered_segments.append(seg)
+                    covered_segments.add(seg)
 
         segment_count = 0
         for cell in cell_cover:
@@ -257,9 +260,9 @@ class FLOWER(object):
 
         # Combine the clusters until we have MDC_COUNT - 1 non-central, virtual
         # clusters
-        while len(self.virtual_clusters) >= self.env.mdc_count:
-            self.virtual_clusters = combine_clusters(self.virtual_clusters,
-                                                     self.virtual_hub)
+        self.virtual_clusters = agglomerate_clusters(self.virtual_clusters,
+                                                     self.virtual_hub,
+                                                     self.env.mdc_count)
 
         # FLOWER has some dependencies on the order of cluster IDs, so we need
         # to sort and re-label each virtual cluster.
@@ -346,7 +349,8 @@ class FLOWER(object):
                 else:
                     # Find the set of cells that are not already in the hub
                     # cluster
-                    available_cells = list(set(cells) - set(self.hub.cells))
+                    hub_cells = set(self.hub.cells)
+                    available_cells = [c for c in cells if c not in hub_cells]
 
                     # Out of those cells, find the one that is closest to the
                     # damaged area
@@ -422,7 +426,7 @@ class FLOWER(object):
                         r, c_least)
 
     def total_cluster_energy(self, c):
-        energy = self.energy_model.total_energy(c.cluster_id)
+        energy = self.ledger.total_energy(c)
         logger.debug("%s requires %s to traverse.", c, energy)
         return energy
 
@@ -448,6 +452,20 @@ class FLOWER(object):
         balance = np.std(energy)
         return balance
 
+    def balance_change(self, balance):
+        """
+        Find how much the energy balance has changed since it was measured as
+        balance (e.g., before a trial move). The ledger keeps the energy of
+        every cluster the move did not touch, so only the energies of the
+        changed clusters and the hub are recomputed.
+
+        :param balance: A previous result of energy_balance()
+        :type balance: float
+        :return: The current energy balance minus the previous one
+        :rtype: float
+        """
+        return self.energy_balance() - balance
+
     def update_anchors(self, custom=None):
 
         if custom:
@@ -467,6 +485,33 @@ class FLOWER(object):
                 _, anchor = closest_nodes(clust, self.hub)
                 clust.anchor = anchor
 
+    def snapshot(self):
+        """
+        Save the state of every cluster (including the hub and the anchors set
+        by update_anchors()) and the energy ledger's accounts, so that a trial
+        move can be undone by rollback() without rebuilding any tours or
+        recomputing any energies.
+
+        :return: The saved state
+        """
+        clusters = self.clusters + [self.hub]
+        return [(c, c.snapshot()) for c in clusters], self.ledger.snapshot()
+
+    def rollback(self, snapshot):
+        """
+        Undo every cluster edit made since snapshot() was called.
+
+        :param snapshot: The state returned by snapshot()
+        :return: None
+        """
+        cluster_states, ledger_state = snapshot
+
+        # The ledger's accounts go back first, so the clusters find them
+        # already matching their cells as they are rolled back.
+        self.ledger.rollback(ledger_state)
+        for cluster, state in cluster_states:
+            cluster.rollback(state)
+
     def optimization(self):
 
         for r in range(101):
@@ -480,6 +525,8 @@ class FLOWER(object):
             c_least = self.lowest_energy_cluster()
             c_most = self.highest_energy_cluster()
 
+            saved = self.snapshot()
+
             if self.hub == c_least:
                 _, c_in = closest_nodes([c_most.anchor], c_most)
 
@@ -488,15 +535,13 @@ class FLOWER(object):
 
                 # check the effects and revert if necessary
                 self.update_anchors()
-                new_balance = self.energy_balance()
+                change = self.balance_change(balance)
                 logger.debug("Completed %d rounds of 2b", r)
 
                 # if this round didn't reduce stdev, then revert the changes
                 # and exit the loop
-                if new_balance >= balance:
-                    self.hub.remove(c_in)
-                    c_most.add(c_in)
-                    self.update_anchors()
+                if change >= 0.:
+                    self.rollback(saved)
                     break
 
             elif self.hub == c_most:
@@ -510,15 +555,13 @@ class FLOWER(object):
 
                 # check the effects and revert if necessary
                 self.update_anchors()
-                new_balance = self.energy_balance()
+                change = self.balance_change(balance)
                 logger.debug("Completed %d rounds of 2b", r)
 
                 # if this round didn't reduce the energy balance, then revert
                 # the changes and exit the loop.
-                if new_balance >= balance:
-                    c_least.remove(c_out)
-                    self.hub.add(c_out)
-                    self.update_anchors()
+                if change >= 0.:
+                    self.rollback(saved)
                     break
 
             else:
@@ -535,19 +578,13 @@ class FLOWER(object):
 
                 # check the effects and revert if necessary
                 self.update_anchors()
-                new_balance = self.energy_balance()
+                change = self.balance_change(balance)
                 logger.debug("Completed %d rounds of 2b", r)
 
                 # if this round didn't reduce stdev, then revert the changes
                 # and exit the loop
-                if new_balance >= balance:
-                    c_least.remove(c_out)
-                    self.hub.add(c_out)
-
-                    self.hub.remove(c_in)
-                    c_most.add(c_in)
-
-                    self.update_anchors()
+                if change >= 0.:
+                    self.rollback(saved)
                     break
 
     def optimize_large_ec(self):
@@ -579,18 +616,18 @@ class FLOWER(object):
             # find the cell in c_most nearest the neighbor
             c_out, _ = closest_nodes(c_most, neighbor)
 
+            saved = self.snapshot()
             c_most.remove(c_out)
             neighbor.add(c_out)
 
             # emulate a do ... while loop
-            stdev_new = self.energy_balance()
+            change = self.balance_change(balance)
             logger.debug("Completed %d rounds of Ec >> Em", r + 1)
 
             # if this round didn't reduce balance, then revert the changes and
             # exit the loop
-            if stdev_new >= balance:
-                neighbor.remove(c_out)
-                c_most.add(c_out)
+            if change >= 0.:
+                self.rollback(saved)
                 break
 
     def compute_paths(self):
@@ -0,0 +1,16 @@
+import numpy as np
+
+from wsnsims.core.environment import Environment
+from wsnsims.flower.flower_sim import FLOWER
+
+
+def _metrics(seed):
+    np.random.seed(seed)
+    runner = FLOWER(Environment()).run()
+    return (runner.maximum_communication_delay(), runner.energy_balance(),
+            runner.average_energy(), runner.max_buffer_size())
+
+
+def test_runs_with_the_same_seed_are_identical():
+    for seed in range(5):
+        assert _metrics(seed) == _metrics(seed)
@@ -5,7 +5,10 @@ import logging
 import math
 
 import numpy as np
+import scipy.sparse as sp
 
+from wsnsims.core import positions
+from wsnsims.core import spatial
 from wsnsims.flower.cell import Cell, side_length
 
 logger = logging.getLogger(__name__)
@@ -16,6 +19,11 @@ class Grid(object):
 
     def __init__(self, segments, environment):
         """
+        The grid is kept as dense arrays over all of its cells (the cell at
+        each row and column, the cell centres and the segments each cell
+        covers), and Cell objects are only created for the cells that are
+        actually used, such as the cells covering a segment. Cells are
+        numbered in row-major order.
 
         :param segments:
         :type segments: np.array
@@ -30,7 +38,25 @@ class Grid(object):
         self.width = self._env.grid_width
         self.height = self._env.grid_height
 
-        self._grid = list()
+        #: The index of the cell at each row and column
+        self.ids = np.zeros((0, 0), dtype=int)
+
+        #: The locations of all cell centres, one row per cell index. Cells
+        #: are placed in the store as they are created.
+        self.positions = None
+
+        #: Entry [i, j] is True if cell i is within radio range of
+        #: self.segments[j]
+        self.coverage = sp.csr_matrix((0, len(self.segments)), dtype=bool)
+
+        #: The cell ID of the cell with index 0. IDs for every cell of the
+        #: grid are reserved up front, so they do not depend on the order
+        #: the cells are created in.
+        self._first_id = 0
+
+        #: The Cell objects created so far, by cell index
+        self._cells = dict()
+
         self._layout_cells()
 
     def _layout_cells(self):
@@ -53,20 +79,136 @@ class Grid(object):
         logger.debug("Grid is %d x %d cells", self.rows, self.cols)
 
         # Initialize the grid
-        self._grid = list()
-        for row in range(self.rows):
-            new_row = list()
-            for col in range(self.cols):
-                new_cell = Cell(row, col, self._env)
-                new_row.append(new_cell)
+        self.ids = np.arange(self.rows * self.cols).reshape(self.rows,
+                                                            self.cols)
+        self._first_id = Cell.count
+        Cell.count += self.ids.size
+        self._cells = dict()
+
+        rows, cols = np.divmod(self.ids.ravel(), self.cols)
+        centers = np.empty((self.ids.size, 2))
+        centers[:, 0] = cols * side_len + (side_len / 2.)
+        centers[:, 1] = rows * side_len + (side_len / 2.)
+        self.positions = positions.PositionStore(points=centers)
+
+        self.coverage = self._covered_segments()
+
+    def _stencil_neighbors(self, rows, cols, radius=1, include_self=False):
+        """
+        Find the neighbours of many grid positions at once, by applying a
+        stencil of row and column offsets to all of them. The offsets are in
+        the same order cell_neighbors() uses, and only neighbours on the grid
+        are kept (the positions themselves may be off the grid).
+
+        :param rows: The row of each position
+        :type rows: np.array
+        :param cols: The column of each position
+        :type cols: np.array
+        :param radius: The cell distance of the neighbours
+        :type radius: int
+        :param include_self: Count each position as one of its own neighbours
+        :type include_self: bool
+        :return: Two arrays, the position in rows and cols of each owner and
+                 the cell index of each of its neighbours
+        :rtype: (np.array, np.array)
+        """
+
+        offsets = np.array([(d_row, d_col) for d_row, d_col in
+                            itertools.product(range(-radius, radius + 1),
+                                              repeat=2)
+                            if include_self or d_row or d_col])
+
+        rows = np.asarray(rows, dtype=int)
+        cols = np.asarray(cols, dtype=int)
+        neighbor_rows = rows[:, np.newaxis] + offsets[:, 0]
+        neighbor_cols = cols[:, np.newaxis] + offsets[:, 1]
+        valid = ((0 <= neighbor_rows) & (neighbor_rows < self.rows) &
+                 (0 <= neighbor_cols) & (neighbor_cols < self.cols))
+
+        owners, offset_indexes = np.nonzero(valid)
+        neighbors = (neighbor_rows * self.cols + neighbor_cols)[
+            owners, offset_indexes]
+        return owners, neighbors
+
+    def _covered_segments(self):
+        """
+        Find the segments within radio range of every cell at once. Each
+        segment is bucketed into the cell that contains it, and only the
+        cells within reach of that bucket (the 3 x 3 block around it, for
+        cells of side_length()) are tested.
+
+        :return: The cell x segment coverage matrix
+        :rtype: sp.csr_matrix
+        """
+
+        shape = (self.ids.size, len(self.segments))
+        if not len(self.segments):
+            return sp.csr_matrix(shape, dtype=bool)
+
+        side_len = side_length(self._env)
+        radio_range = self._env.comms_range
+
+        # A cell centre is half a cell from the edges of its bucket, so this
+        # many buckets either side can reach a segment.
+        reach = max(0, int(math.ceil(radio_range / side_len - 0.5)))
+
+        points = positions.gather(self.segments)
+        buckets = np.floor(points[:, ::-1] / side_len).astype(int)
 
-            self._grid.append(new_row)
+        seg_indexes, cell_indexes = self._stencil_neighbors(
+            buckets[:, 0], buckets[:, 1], radius=reach, include_self=True)
 
-        for row in range(self.rows):
-            for col in range(self.cols):
-                current_cell = self.cell(row, col)
-                current_cell.neighbors = self.cell_neighbors(current_cell)
-                current_cell.segments = self.cell_segments(current_cell)
+        differences = (self.positions.points[cell_indexes] -
+                       points[seg_indexes])
+        distances = np.linalg.norm(differences, axis=1)
+        in_range = distances < radio_range
+
+        # The vectorized norm can differ from np.linalg.norm() of a single
+        # pair in the last bit, so pairs right on the edge of the range are
+        # measured again one at a time.
+        borderline = np.flatnonzero(
+            np.abs(distances - radio_range) <= radio_range * 1e-9)
+        for i in borderline:
+            in_range[i] = np.linalg.norm(differences[i]) < radio_range
+
+        coverage = sp.csr_matrix(
+            (np.ones(np.count_nonzero(in_range), dtype=bool),
+             (cell_indexes[in_range], seg_indexes[in_range])), shape=shape)
+        coverage.sort_indices()
+        return coverage
+
+    def index(self, cell):
+        """
+        :param cell: A cell of this grid
+        :type cell: Cell
+        :return: The index of the cell
+        :rtype: int
+        """
+        row, col = cell.grid_location
+        return self.ids[row, col]
+
+    def _cell(self, index):
+        """
+        Get the cell with the given index, creating it on first use.
+
+        :param index: The cell index
+        :type index: int
+        :rtype: Cell
+        """
+
+        cell = self._cells.get(index)
+        if cell is None:
+            row, col = divmod(int(index), self.cols)
+            cell = Cell(row, col, self._env, cell_id=self._first_id + index,
+                        grid=self)
+            self.positions.place(cell, index)
+
+            start, stop = self.coverage.indptr[index:index + 2]
+            cell.segments = [self.segments[i] for i in
+                             self.coverage.indices[start:stop]]
+            self._cells[index] = cell
+
+        return cell
 
     def closest_cell(self, position):
         """
@@ -77,24 +219,34 @@ class Grid(object):
         :rtype: Cell
         """
 
-        closest_cell = None
-        closest_distance = np.inf
-        for cell in self.cells():
-            distance = np.linalg.norm(position - cell.location.nd)
-            if distance < closest_distance:
-                closest_cell = cell
-                closest_distance = distance
+        # The closest cell centre is in the cell holding the position (or
+        # the nearest cell on the grid to it), or on the edge of a
+        # neighbouring cell for positions on a cell boundary.
+        point = np.asarray(position, dtype=float)
+        bucket = np.floor(point[::-1] / side_length(self._env)).astype(int)
+        row, col = np.clip(bucket, 0, [self.rows - 1, self.cols - 1])
 
-        return closest_cell
+        _, candidates = self._stencil_neighbors([row], [col],
+                                                include_self=True)
+        index = spatial.nearest(point, self.positions.points[candidates])
+        return self._cell(candidates[index])
 
     def cells(self):
         """
         Get an iterator over all cells in the grid
         :rtype: collections.Iterator(Cell)
         """
-        for row in self._grid:
-            for cell in row:
-                yield cell
+        for index in range(self.ids.size):
+            yield self._cell(index)
+
+    def occupied(self):
+        """
+        Get an iterator over the cells within range of at least one segment,
+        in the order of cells()
+        :rtype: collections.Iterator(Cell)
+        """
+        for index in np.flatnonzero(np.diff(self.coverage.indptr)):
+            yield self._cell(index)
 
     def cell(self, row, col):
         """
@@ -102,26 +254,47 @@ class Grid(object):
         :rtype: Cell
         """
 
-        return self._grid[row][col]
+        return self._cell(self.ids[row, col])
 
-    def cell_segments(self, cell):
+    def proximity(self, cell, cells):
         """
-        Find all segments within range of the given cell.
+        Find the cell distance from one cell to many others at once.
 
-        :param cell:
+        :param cell: The cell to measure from
         :type cell: Cell
-        :return: The list of segments.
-        :rtype: list(core.segment.Segment)
+        :param cells: The cells to measure to
+        :type cells: list(Cell)
+        :return: The cell distance to each of cells
+        :rtype: np.array
         """
 
-        segments = list()
-        radio_range = self._env.comms_range
-        for seg in self.segments:
-            distance = np.linalg.norm(cell.location.nd - seg.location.nd)
-            if distance < radio_range:
-                segments.append(seg)
+        locations = np.array([c.grid_location for c in cells],
+                             dtype=int).reshape(-1, 2)
+        return np.max(np.abs(locations - cell.grid_location), axis=1)
+
+    def single_hop_counts(self, cells):
+        """
+        Count, for each of many cells, the segments that are within range
+        of one of its neighbours but not of the cell itself.
+
+        :param cells: The cells to count for
+        :type cells: list(Cell)
+        :return: The one-hop segment count of each cell
+        :rtype: np.array
+        """
 
-        return segments
+        locations = np.array([c.grid_location for c in cells],
+                             dtype=int).reshape(-1, 2)
+        indexes = self.ids[locations[:, 0], locations[:, 1]]
+        owners, neighbors = self._stencil_neighbors(locations[:, 0],
+                                                    locations[:, 1])
+        adjacency = sp.csr_matrix(
+            (np.ones(len(owners)), (owners, neighbors)),
+            shape=(len(indexes), self.ids.size))
+
+        covered = adjacency.dot(self.coverage.astype(float))
+        own = covered.multiply(self.coverage[indexes])
+        return covered.getnnz(axis=1) - own.getnnz(axis=1)
 
     def on_grid(self, coordinates):
         (row, col) = coordinates
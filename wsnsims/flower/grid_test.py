@@ -0,0 +1,112 @@
+import itertools
+
+import numpy as np
+
+from wsnsims.core import segment
+from wsnsims.core.environment import Environment
+from wsnsims.flower import grid
+from wsnsims.flower.cell import side_length
+
+
+def _cell_segments(g, cell):
+    return [seg for seg in g.segments if np.linalg.norm(
+        cell.location.nd - seg.location.nd) < g._env.comms_range]
+
+
+def _check_layout(g):
+    for cell in g.cells():
+        assert cell.neighbors == g.cell_neighbors(cell)
+        assert cell.segments == _cell_segments(g, cell)
+
+
+def test_layout_matches_per_cell_search():
+    env = Environment()
+    env.grid_height = 600.
+    env.grid_width = 400.
+    env.comms_range = 75.
+
+    np.random.seed(4)
+    locs = np.random.rand(30, 2) * env.grid_height
+    _check_layout(grid.Grid([segment.Segment(nd) for nd in locs], env))
+
+
+def test_layout_on_cell_boundaries():
+    env = Environment()
+    env.grid_height = 300.
+    env.grid_width = 300.
+    env.comms_range = 50.
+
+    # Segments on the corners and edges of cells, so many are on bucket
+    # boundaries or at the edge of the radio range
+    side_len = side_length(env)
+    steps = np.arange(0., 10.) * side_len / 2.
+    locs = np.array(list(itertools.product(steps, repeat=2)))
+    _check_layout(grid.Grid([segment.Segment(nd) for nd in locs], env))
+
+
+def test_cells_are_created_on_first_use():
+    env = Environment()
+    env.grid_height = 2000.
+    env.grid_width = 2000.
+    env.comms_range = 50.
+
+    np.random.seed(8)
+    locs = np.random.rand(5, 2) * env.grid_height
+    segments = [segment.Segment(nd) for nd in locs]
+    g = grid.Grid(segments, env)
+
+    occupied = list(g.occupied())
+    assert len(g._cells) == len(occupied) < g.rows * g.cols
+    assert g.cell(*occupied[0].grid_location) is occupied[0]
+
+    # IDs follow the grid order, whatever order cells are created in
+    last = g.cell(g.rows - 1, g.cols - 1)
+    first = g.cell(0, 0)
+    assert last.cell_id - first.cell_id == g.rows * g.cols - 1
+
+    for cell in occupied:
+        assert cell.segments == _cell_segments(g, cell)
+        assert np.array_equal(cell.location.nd,
+                              g.positions.points[g.index(cell)])
+
+
+def test_single_hop_counts_match_neighbor_search():
+    env = Environment()
+    env.grid_height = 400.
+    env.grid_width = 400.
+    env.comms_range = 60.
+
+    np.random.seed(3)
+    locs = np.random.rand(40, 2) * env.grid_height
+    g = grid.Grid([segment.Segment(nd) for nd in locs], env)
+
+    cells = list(g.cells())
+    counts = g.single_hop_counts(cells)
+    for cell, count in zip(cells, counts):
+        segments = set()
+        for nbr in cell.neighbors:
+            segments.update(nbr.segments)
+
+        assert count == len(segments - set(cell.segments))
+
+    center = g.center()
+    assert list(g.proximity(center, cells)) == [
+        grid.cell_distance(center, cell) for cell in cells]
+
+
+def test_closest_cell_matches_linear_scan():
+    env = Environment()
+    env.grid_height = 300.
+    env.grid_width = 200.
+    env.comms_range = 40.
+    g = grid.Grid([], env)
+
+    cells = list(g.cells())
+    np.random.seed(6)
+    side_len = side_length(env)
+    points = np.vstack((np.random.rand(50, 2) * 400. - 50.,
+                        np.random.randint(0, 12, (20, 2)) * side_len / 2.))
+    for point in points:
+        expected = min(cells,
+                       key=lambda c: np.linalg.norm(c.location.nd - point))
+        assert g.closest_cell(point) is expected
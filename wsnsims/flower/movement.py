@@ -1,9 +1,7 @@
 import itertools
 import logging
 
-import numpy as np
-
-import scipy.sparse.csgraph as sp
+from wsnsims.core import paths
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +17,14 @@ class FLOWERMovementModel(object):
 
         self._cell_indexes = {}
 
+        #: The cell at each node index (the inverse of _cell_indexes)
+        self._cells = list()
+
         #: Cached version of the adjacency matrix. Weights are path lengths.
         self._adj_mat = self._compute_adjacency_matrix()
 
-        self._distance_mat, self._preds = self._compute_paths()
+        #: Shortest path queries over the tour graph
+        self._paths = self._compute_paths()
 
     def _compute_adjacency_matrix(self):
         """
@@ -43,83 +45,100 @@ class FLOWERMovementModel(object):
             # Add the "damaged" virtual cell to the index if we need it
             self._cell_indexes[self.sim.damaged] = len(self.sim.cells)
 
-        node_count = len(list(self._cell_indexes.keys()))
-        g_sparse = np.zeros((node_count, node_count), dtype=float)
-        g_sparse[:] = np.inf
+        self._cells = [None] * len(self._cell_indexes)
+        for cell, index in self._cell_indexes.items():
+            self._cells[index] = cell
 
-        for cluster in self.sim.clusters + [self.sim.hub]:
-            cluster_tour = cluster.tour
-            i = len(cluster_tour.vertices) - 1
-            j = 0
-            while j < len(cluster_tour.vertices):
-                start_vertex = cluster_tour.vertices[i]
-                stop_vertex = cluster_tour.vertices[j]
+        node_count = len(list(self._cell_indexes.keys()))
+        tours = [c.tour for c in self.sim.clusters + [self.sim.hub]]
+        return paths.tour_graph(tours, self._cell_indexes, node_count,
+                                points='points')
 
-                start_pt = cluster_tour.points[start_vertex]
-                stop_pt = cluster_tour.points[stop_vertex]
-                distance = np.linalg.norm(stop_pt - start_pt)
+    def _compute_paths(self):
+        """
+        Set up shortest path queries over the tours of the simulation. Only
+        the junctions shared between tours need an all-pairs search (see
+        core.paths.TourPaths).
 
-                start_seg = cluster_tour.objects[start_vertex]
-                stop_seg = cluster_tour.objects[stop_vertex]
+        :return: The shortest paths over adjacency matrix self._adj_mat
+        :rtype: core.paths.TourPaths
+        """
 
-                start_index = self._cell_indexes[start_seg]
-                stop_index = self._cell_indexes[stop_seg]
+        tours = [c.tour for c in self.sim.clusters + [self.sim.hub]]
+        cycles = paths.tour_cycles(tours, self._cell_indexes)
+        return paths.TourPaths(self._adj_mat, cycles)
 
-                g_sparse[start_index, stop_index] = distance
+    def distance_matrix(self, cells):
+        """
+        Get the shortest distances between every pair of the given cells.
 
-                i = j
-                j += 1
+        :param cells:
+        :type cells: list(flower.cell.Cell)
+        :return: An N x N matrix where entry [i, j] is the shortest distance
+                 from cells[i] to cells[j]
+        :rtype: np.array
+        """
 
-        g_sparse = sp.csgraph_from_dense(g_sparse, null_value=np.inf)
-        return g_sparse
+        indexes = [self._cell_indexes[cell] for cell in cells]
+        return self._paths.distance_matrix(indexes)
 
-    def _compute_paths(self):
+    def distance(self, begin, end):
         """
-        Run Dijkstra's algorithm over the adjacency matrix for the paths
-        produced by the simulation.
+        Get the shortest distance between any two cells.
 
-        :return: The distance matrix based on adjacency matrix self._adj_mat
-        :rtype: np.array
+        :param begin:
+        :type begin: flower.cell.Cell
+        :param end:
+        :type end: flower.cell.Cell
+        :return: The distance
+        :rtype: float
         """
 
-        distance_mat, preds = sp.dijkstra(self._adj_mat, directed=True,
-                                          return_predecessors=True)
-        # assert not np.any(np.isinf(distance_mat))
-        if np.any(np.isinf(distance_mat)):
-            logger.debug("Found inf distance!!")
+        distance = self._paths.distance(self._cell_indexes[begin],
+                                        self._cell_indexes[end])
+        # distance *= pq.meter
 
-        return distance_mat, preds
+        return distance
 
-    def shortest_distance(self, begin, end):
+    def shortest_path(self, begin, end):
         """
-        Get the shortest distance between any two segments.
+        Lazily yield the cells along the path found by shortest_distance(),
+        so callers that only look at part of the path (or at none of it) do
+        not pay to build it.
 
         :param begin:
         :type begin: flower.cell.Cell
         :param end:
         :type end: flower.cell.Cell
-        :return: float, list(int)
+        :return: The cells along the path
+        :rtype: iterator(flower.cell.Cell)
         """
 
-        begin_index = self._cell_indexes[begin]
-        end_index = self._cell_indexes[end]
+        # As in the predecessor walk this replaces, the path is the shortest
+        # route from end back to begin, listed starting from begin.
+        route = self._paths.path(self._cell_indexes[end],
+                                 self._cell_indexes[begin], reverse=True)
 
-        distance = self._distance_mat[begin_index, end_index]
-        # distance *= pq.meter
+        found = False
+        for index in route:
+            found = True
+            yield self._cells[index]
 
-        path = [begin]
-        inv_index = {v: k for k, v in self._cell_indexes.items()}
-        while True:
-            next_index = self._preds[end_index, begin_index]
-            if next_index == -9999:
-                break
+        if not found:
+            yield begin
 
-            begin_index = next_index
+    def shortest_distance(self, begin, end):
+        """
+        Get the shortest distance between any two segments.
 
-            seg = inv_index[next_index]
-            path.append(seg)
+        :param begin:
+        :type begin: flower.cell.Cell
+        :param end:
+        :type end: flower.cell.Cell
+        :return: float, list(flower.cell.Cell)
+        """
 
-        return distance, path
+        return self.distance(begin, end), list(self.shortest_path(begin, end))
 
     def print_all_distances(self):
 
@@ -127,5 +146,5 @@ class FLOWERMovementModel(object):
             self.sim.cells + [self.sim.damaged], 2)
 
         for src, dst in cell_pairs:
-            distance, _ = self.shortest_distance(src, dst)
+            distance = self.distance(src, dst)
             logger.debug("%s -> %s: %f", src, dst, distance)
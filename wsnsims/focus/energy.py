@@ -1,12 +1,10 @@
-import collections
-import itertools
 import logging
 
 import numpy as np
 
 import scipy.sparse.csgraph as sp
 
-from wsnsims.core.data import segment_volume
+from wsnsims.core import cluster_graph
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +27,12 @@ class FOCUSEnergyModel(object):
         self.env = environment
         self.cluster_graph = self.build_cluster_graph()
 
-        self._ids_to_clusters = {}
         self._ids_to_movement_energy = {}
         self._ids_to_comms_energy = {}
 
+        #: Cached results of all_cluster_volumes(), by intercluster_only
+        self._volumes = {}
+
         self._calculate_cluster_speeds()
 
     def _calculate_cluster_speeds(self):
@@ -84,33 +84,45 @@ class FOCUSEnergyModel(object):
         logger.debug("Set %s speed to %s", child, child.mdc_speed)
 
     def build_cluster_graph(self):
+        """
+        Link every pair of clusters whose tours share a segment (such as a
+        relay segment). The shared segments come from the simulation's
+        membership index, rather than comparing the tours of every pair of
+        clusters.
+
+        :return: The adjacency matrix of the clusters, in the order of
+                 sim.clusters
+        :rtype: sp.csr_matrix
+        """
 
-        cluster_graph = collections.defaultdict(list)
-        for cluster in self.sim.clusters:
-
-            other_clusters = list(self.sim.clusters)
-            other_clusters.remove(cluster)
-            for other_cluster in other_clusters:
-                overlaps = set(cluster.tour.objects).intersection(
-                    other_cluster.tour.objects)
-
-                if len(overlaps) > 0:
-                    cluster_graph[cluster].append(other_cluster)
-
-        node_count = len(self.sim.clusters)
-        dense = np.zeros((node_count, node_count), dtype=float)
+        memberships = self.sim.membership.membership_matrix().astype(int)
+        dense = np.dot(memberships.T, memberships)
+        dense = (dense > 0).astype(float)
+        np.fill_diagonal(dense, 0.)
 
-        for cluster, neighbors in cluster_graph.items():
+        sparse = sp.csgraph_from_dense(dense)
+        return sparse
 
-            cluster_index = self.sim.clusters.index(cluster)
-            for neighbor in neighbors:
-                neighbor_index = self.sim.clusters.index(neighbor)
+    def all_cluster_volumes(self, intercluster_only=False):
+        """
+        Compute the data volume handled by every cluster at once. The branches
+        around each cluster come from a single pass over the cluster graph,
+        and the traffic between them from one cluster-to-cluster volume
+        matrix (see core.cluster_graph.relay_volumes()).
+
+        :param intercluster_only: Leave out the intra-cluster traffic
+        :type intercluster_only: bool
+        :return: The volume of each cluster, in the order of sim.clusters
+        :rtype: np.array
+        """
 
-                dense[cluster_index, neighbor_index] = 1
-                dense[neighbor_index, cluster_index] = 1
+        intercluster_only = bool(intercluster_only)
+        if intercluster_only not in self._volumes:
+            self._volumes[intercluster_only] = cluster_graph.relay_volumes(
+                self.sim.clusters, self.cluster_graph, self.sim.traffic,
+                intercluster_only)
 
-        sparse = sp.csgraph_from_dense(dense)
-        return sparse
+        return self._volumes[intercluster_only]
 
     def cluster_data_volume(self, cluster_id, intercluster_only=False):
         """
@@ -122,72 +134,8 @@ class FOCUSEnergyModel(object):
         """
 
         current_cluster = self._find_cluster(cluster_id)
-        cluster_index = self.sim.clusters.index(current_cluster)
-        cluster_tree, preds = sp.breadth_first_order(self.cluster_graph,
-                                                     cluster_index,
-                                                     directed=False,
-                                                     return_predecessors=True)
-
-        children_indexes = list()
-        for index in cluster_tree:
-            if preds[index] == cluster_index:
-                children_indexes.append(index)
-
-        cluster_graph = self.cluster_graph.toarray()
-        cluster_graph[cluster_index] = 0
-        cluster_graph[:, cluster_index] = 0
-
-        components_count, labels = sp.connected_components(cluster_graph,
-                                                           directed=False)
-
-        cluster_groups = collections.defaultdict(list)
-        for index, label in enumerate(labels):
-            if index == cluster_index:
-                continue
-
-            cluster_groups[label].append(self.sim.clusters[index])
-
-        # Build a set of "super clusters." These are just collections of all
-        # segments from the clusters that make up each child branch from the
-        # current cluster.
-        super_clusters = collections.defaultdict(list)
-        for label, clusters in cluster_groups.items():
-            for cluster in clusters:
-                super_clusters[label].extend(cluster.tour.objects)
-
-        # Now, we get the list of segment pairs that will communicate through
-        # the current cluster. This does not include the segments within the
-        # current cluster, as those will be accounted for separately.
-        sc_index_pairs = itertools.permutations(super_clusters.keys(), 2)
-        segment_pairs = list()
-        for src_sc_index, dst_sc_index in sc_index_pairs:
-            src_segments = super_clusters[src_sc_index]
-            dst_segments = super_clusters[dst_sc_index]
-            segment_pairs.extend(
-                list(itertools.product(src_segments, dst_segments)))
-
-        intercluster_volume = np.sum([segment_volume(src, dst, self.env)
-                                      for src, dst in segment_pairs])
-
-        if not intercluster_only:
-            # NOW we calculate the intra-cluster volume
-            segment_pairs = itertools.permutations(
-                current_cluster.tour.objects, 2)
-            intracluster_volume = np.sum([segment_volume(src, dst, self.env)
-                                          for src, dst in
-                                          segment_pairs])
-        else:
-            intracluster_volume = 0.
-
-        # ... and the outgoing data volume from this cluster
-        other_segments = list(
-            set(self.sim.segments) - set(current_cluster.tour.objects))
-        segment_pairs = itertools.product(current_cluster.tour.objects,
-                                          other_segments)
-        intercluster_volume += np.sum([segment_volume(s, d, self.env)
-                                       for s, d in segment_pairs])
-
-        return intercluster_volume + intracluster_volume
+        cluster_index = self.sim.membership.index(current_cluster)
+        return self.all_cluster_volumes(intercluster_only)[cluster_index]
 
     def total_comms_energy(self, cluster_id):
 
@@ -207,20 +155,11 @@ class FOCUSEnergyModel(object):
         :return:
         :rtype: focus.cluster.FOCUSCluster
         """
-        if cluster_id in self._ids_to_clusters:
-            return self._ids_to_clusters[cluster_id]
-
-        found_cluster = None
-        for clust in self.sim.clusters:
-            if clust.cluster_id == cluster_id:
-                found_cluster = clust
-                break
-
+        found_cluster = self.sim.membership.find(cluster_id)
         if not found_cluster:
             raise FOCUSEnergyModelError(
                 "Could not find cluster {}".format(cluster_id))
 
-        self._ids_to_clusters[cluster_id] = found_cluster
         return found_cluster
 
     def total_movement_energy(self, cluster_id):
@@ -2,11 +2,10 @@ import logging
 
 import numpy as np
 
-import ordered_set as orderedset
+from wsnsims.core import delay
 from wsnsims.focus.energy import FOCUSEnergyModel
 from wsnsims.focus.movement import FOCUSMovementModel
 
-from wsnsims.core import data
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +27,13 @@ class FOCUSRunner(object):
         self.movement_model = FOCUSMovementModel(self.sim, self.env)
         self.energy_model = FOCUSEnergyModel(self.sim, self.env)
 
+        #: Cached all-pairs delay matrix (see delay_matrix())
+        self._delays = None
+
+        #: Cached per-pair transmission counts and holding times (see
+        #: path_tables())
+        self._path_tables = None
+
     def print_all_distances(self):
         """
         For debugging, iterate over all segments and print the tour distances
@@ -46,92 +52,110 @@ class FOCUSRunner(object):
 
         self.sim.show_state()
 
-    def maximum_communication_delay(self):
+    def delay_matrix(self):
         """
-        Compute the average communication delay across all segments.
+        Compute the communication delay between every pair of segments at
+        once. Entry [i, j] is the delay from segment i to segment j (in the
+        order of sim.segments), and matches communication_delay(). The
+        diagonal is meaningless.
 
-        :return: The delay time in seconds
-        :rtype: pq.quantity.Quantity
+        Travel time depends on the tours each path runs along, as each
+        cluster's MDC has its own speed, and comes from the movement model. The transmission count and holding time come from
+        path_tables().
+
+        :return: An N x N matrix of delays in seconds
+        :rtype: np.array
         """
 
-        segment_pairs = ((src, dst) for src in self.sim.segments for dst in
-                         self.sim.segments if src != dst)
+        if self._delays is not None:
+            return self._delays
 
-        delays = []
-        for src, dst in segment_pairs:
-            delay = self.communication_delay(src, dst)
-            delays.append(delay)
+        segments = self.sim.segments
+        travel_delay = self.movement_model.travel_time_matrix(segments)
 
-        delays = np.array(delays)
-        max_delay = np.max(delays)
-        # max_delay *= pq.second
+        counts, relay_delay = self.path_tables()
 
-        return max_delay
+        traffic = self.sim.traffic
+        volumes = traffic.volumes[np.ix_(traffic.indexes(segments),
+                                         traffic.indexes(segments))]
 
-    def segment_clusters(self, segment):
+        transmission_delay = counts * volumes
+        transmission_delay /= self.env.comms_rate
+
+        self._delays = travel_delay + transmission_delay + relay_delay
+        return self._delays
+
+    def path_tables(self):
         """
+        Tabulate the number of clusters on the path between every pair of
+        segments (its transmission count), and the time the data is held by
+        the clusters after the first. The clusters on each path come from the
+        movement model for all pairs at once, so both are then simple table
+        lookups. Entry [i, j] is for the path from segment i to segment j (in
+        the order of sim.segments).
 
-        :param segment:
-        :type segment: core.segment.Segment
-        :return:
-        :rtype: list(core.cluster.BaseCluster)
+        :return: The N x N transmission counts and holding times
+        :rtype: (np.array, np.array)
         """
-        clusters = list()
-        for cluster in self.sim.clusters:
-            if segment in cluster.tour.objects:
-                clusters.append(cluster)
 
-        return clusters
+        if self._path_tables is not None:
+            return self._path_tables
 
-    def count_clusters(self, path):
-        """
+        present, first = self.movement_model.path_cluster_matrix(
+            self.sim.segments)
+        counts = np.sum(present, axis=2)
 
-        :param path:
-        :type path: list(core.segment.Segment)
-        :return:
-        :rtype: list(core.cluster.BaseCluster)
-        """
-        path_clusters = list()
-        current_segment = path[0]
-        for next_segment in path[1:]:
+        tour_times = np.array([self.tour_time(c) for c in self.sim.clusters])
+        rows, columns = np.nonzero(first >= 0)
+        present[rows, columns, first[rows, columns]] = False
+        holding_times = np.dot(present, tour_times)
 
-            current_clusters = self.segment_clusters(current_segment)
-            next_clusters = self.segment_clusters(next_segment)
+        self._path_tables = counts, holding_times
+        return self._path_tables
 
-            if len(current_clusters) > 1 and len(next_clusters) > 1:
-                # Both are on relay points, so the current_segment cluster must
-                # be the common one between them.
+    def maximum_communication_delay(self):
+        """
+        Compute the maximum communication delay across all segments.
 
-                for cluster in current_clusters:
-                    if cluster in next_clusters:
-                        path_clusters.append(cluster)
-                        break
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
 
-            elif len(current_clusters) > 1:
-                # The current_segment segment is on a relay point. In this
-                # case, the next_segment segment is not on a relay point, so
-                # we can just use that.
+        max_delay = np.max(delay.pair_delays(self.delay_matrix()))
+        # max_delay *= pq.second
 
-                path_clusters.append(next_clusters[0])
+        return max_delay
 
-            elif len(next_clusters) > 1:
-                # The next_segment segment is on a relay point. In this case,
-                # the current_segment segment is only in one cluster, so we
-                # just use that.
+    def average_communication_delay(self):
+        """
+        Compute the average communication delay across all segments.
 
-                path_clusters.append(current_clusters[0])
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.mean(delay.pair_delays(self.delay_matrix()))
 
-            else:
-                # Neither segments are relay points, just use the
-                # current_segment cluster
-                pass
+    def communication_delay_percentile(self, percentile):
+        """
+        Compute a percentile of the communication delays across all segments.
+
+        :param percentile: The percentile to compute, between 0 and 100
+        :type percentile: float
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.percentile(delay.pair_delays(self.delay_matrix()),
+                             percentile)
 
-            # Move current_segment to the next_segment segment
-            current_segment = next_segment
+    def segment_clusters(self, segment):
+        """
 
-        # Remove any duplicates
-        path_clusters = list(orderedset.OrderedSet(path_clusters))
-        return path_clusters
+        :param segment:
+        :type segment: core.segment.Segment
+        :return:
+        :rtype: list(core.cluster.BaseCluster)
+        """
+        return self.sim.membership.clusters_of(segment)
 
     def communication_delay(self, begin, end):
         """
@@ -147,59 +171,21 @@ class FOCUSRunner(object):
         :rtype: pq.second
         """
 
-        duration, path = self.movement_model.shortest_distance(begin, end)
-        path_clusters = self.count_clusters(path)
-
-        segment_speed_pairs = list()
-        path_index = 0
-        last_segment = None
-        for path_cluster in path_clusters:
-            segments = list()
-            if last_segment:
-                segments.append(last_segment)
-
-            while path[path_index] in path_cluster.tour.objects:
-                segments.append(path[path_index])
-                last_segment = path[path_index]
-
-                path_index += 1
-                if path_index >= len(path):
-                    break
-
-            segment_speed_pairs.append((path_cluster.mdc_speed, segments))
-
-        travel_delay = 0.  # * pq.second
-        for speed, segments in segment_speed_pairs:
-            cluster_distance = 0  # * pq.meter
-            start_segment = segments[0]
-            for end_segment in segments[1:]:
-                distance = np.linalg.norm(
-                    start_segment.location.nd - end_segment.location.nd)
-                cluster_distance += distance
+        travel_delay = self.movement_model.travel_time(begin, end)
 
-            travel_delay += cluster_distance / speed
+        counts, holding_times = self.path_tables()
+        i = begin.index
+        j = end.index
 
-        transmission_delay = len(path_clusters)
-        transmission_delay *= data.segment_volume(begin, end, self.env)
+        transmission_delay = counts[i, j]
+        transmission_delay *= self.sim.traffic.volume(begin, end)
         transmission_delay /= self.env.comms_rate
 
-        relay_delay = self.holding_time(path_clusters[1:])
+        relay_delay = holding_times[i, j]
 
         total_delay = travel_delay + transmission_delay + relay_delay
         return total_delay
 
-    def holding_time(self, clusters):
-        """
-
-        :param clusters:
-        :type clusters: list(BaseCluster)
-        :return:
-        :rtype: pq.second
-        """
-
-        latency = np.sum([self.tour_time(c) for c in clusters])
-        return latency
-
     def tour_time(self, cluster):
         """
 
@@ -214,7 +200,8 @@ class FOCUSRunner(object):
         else:
             travel_time = cluster.tour_length / cluster.mdc_speed
 
-        data_volume = self.energy_model.cluster_data_volume(cluster.cluster_id)
+        volumes = self.energy_model.all_cluster_volumes()
+        data_volume = volumes[self.sim.membership.index(cluster)]
         transmit_time = data_volume / self.env.comms_rate
 
         total_time = travel_time + transmit_time
@@ -249,11 +236,8 @@ class FOCUSRunner(object):
 
     def max_buffer_size(self):
 
-        data_volumes = list()
-        for cluster in self.sim.clusters:
-            volume = self.energy_model.cluster_data_volume(
-                cluster.cluster_id, intercluster_only=False)
-            data_volumes.append(volume)
+        data_volumes = self.energy_model.all_cluster_volumes(
+            intercluster_only=False)
 
         max_data_volume = np.max(data_volumes)
         return max_data_volume
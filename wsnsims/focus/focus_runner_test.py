@@ -0,0 +1,44 @@
+import itertools
+
+import numpy as np
+
+from wsnsims.core.environment import Environment
+from wsnsims.focus.focus_sim import FOCUS
+from wsnsims.focus.movement import FOCUSMovementModel
+
+
+def test_delay_matrix_matches_communication_delay():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 6
+    np.random.seed(2)
+    runner = FOCUS(env).run()
+
+    segments = runner.sim.segments
+    delays = runner.delay_matrix()
+    assert np.all(np.isfinite(delays))
+
+    for (i, begin), (j, end) in itertools.permutations(enumerate(segments), 2):
+        assert np.isclose(delays[i, j],
+                          runner.communication_delay(begin, end))
+
+
+def test_travel_time_follows_the_path_hop_by_hop():
+    env = Environment()
+    env.segment_count = 30
+    env.mdc_count = 6
+    np.random.seed(2)
+    runner = FOCUS(env).run()
+
+    # With every MDC at unit speed, the travel time is the length of the
+    # path between segment locations
+    for cluster in runner.sim.clusters:
+        cluster.mdc_speed = 1.
+    movement_model = FOCUSMovementModel(runner.sim, env)
+
+    segments = runner.sim.segments
+    for begin, end in itertools.permutations(segments, 2):
+        path = list(movement_model.shortest_path(begin, end))
+        length = sum(np.linalg.norm(a.location.nd - b.location.nd)
+                     for a, b in zip(path, path[1:]))
+        assert np.isclose(movement_model.travel_time(begin, end), length)
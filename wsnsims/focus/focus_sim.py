@@ -9,6 +9,9 @@ import scipy.sparse.csgraph as sp
 import scipy.spatial.distance as sp_dist
 from pyclustering.cluster.cure import cure as Cure
 
+from wsnsims.core import data
+from wsnsims.core import membership
+from wsnsims.core import positions
 from wsnsims.core.environment import Environment
 from wsnsims.core.segment import Segment
 from wsnsims.focus.cluster import FOCUSCluster
@@ -28,9 +31,28 @@ class FOCUS(object):
 
         locs = np.random.rand(self.env.segment_count, 2) * self.env.grid_height
         self.segments = [Segment(nd) for nd in locs]
+        self.positions = positions.PositionStore(self.segments)
+        self.traffic = data.TrafficMatrix(self.segments, self.env)
 
         self.clusters = list()  # type: typing.List[FOCUSCluster]
 
+        #: Cluster membership lookups (see the membership property)
+        self._membership = None
+
+    @property
+    def membership(self):
+        """
+        The membership index over the current clusters. It is rebuilt
+        whenever the list of clusters changes, and otherwise kept up to date
+        by the clusters themselves.
+
+        :return: The index over sim.clusters
+        :rtype: core.membership.MembershipIndex
+        """
+        self._membership = membership.refresh(self._membership,
+                                              self.clusters)
+        return self._membership
+
     def show_state(self):
         fig = plt.figure()
         ax = fig.add_subplot(111)
@@ -82,10 +104,11 @@ class FOCUS(object):
                     compression=0.2)
 
         cure.process()
-        loc_clusters = cure.get_clusters()
+
+        # CURE gives each cluster as the indexes of its points
         segment_clusters = list()
-        for loc_cluster in loc_clusters:
-            segment_cluster = self.to_segments(loc_cluster)
+        for index_cluster in cure.get_clusters():
+            segment_cluster = [self.segments[i] for i in index_cluster]
             segment_clusters.append(segment_cluster)
 
         for segment_cluster in segment_clusters:
@@ -142,13 +165,8 @@ class FOCUS(object):
         tnw_1 = cluster_1.tour_length
         tnw_2 = cluster_2.tour_length
 
-        cluster_1.add(rep_segment_2)
-        tn_1 = cluster_1.tour_length
-        cluster_1.remove(rep_segment_2)
-
-        cluster_2.add(rep_segment_1)
-        tn_2 = cluster_2.tour_length
-        cluster_2.remove(rep_segment_1)
+        tn_1 = cluster_1.tour_length_with(rep_segment_2)
+        tn_2 = cluster_2.tour_length_with(rep_segment_1)
 
         w_1 = (tn_1 - tnw_1)
         w_2 = (tn_2 - tnw_2)
@@ -166,11 +184,9 @@ class FOCUS(object):
 
         expand = {}
 
-        cluster_pairs = itertools.combinations(self.clusters, 2)
-        for cluster_pair in cluster_pairs:
-            weights, segs = self.compute_edge_weights(*cluster_pair)
-            c1_index = self.clusters.index(cluster_pair[0])
-            c2_index = self.clusters.index(cluster_pair[1])
+        cluster_pairs = itertools.combinations(enumerate(self.clusters), 2)
+        for (c1_index, cluster_1), (c2_index, cluster_2) in cluster_pairs:
+            weights, segs = self.compute_edge_weights(cluster_1, cluster_2)
 
             dense[c1_index, c2_index] = weights[0]
             dense[c2_index, c1_index] = weights[1]
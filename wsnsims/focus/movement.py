@@ -1,8 +1,9 @@
+import collections
 import logging
 
 import numpy as np
 
-import scipy.sparse.csgraph as sp
+from wsnsims.core import paths
 
 logger = logging.getLogger(__name__)
 
@@ -21,10 +22,22 @@ class FOCUSMovementModel(object):
 
         self._segment_indexes = {}
 
+        #: The segment at each node index (the inverse of _segment_indexes)
+        self._segments = list()
+
         #: Cached version of the adjacency matrix. Weights are path lengths.
         self._adj_mat = self._compute_adjacency_matrix()
 
-        self._distance_mat, self._preds = self._compute_paths()
+        #: Shortest path queries over the tour graph
+        self._paths = self._compute_paths()
+
+        #: The cluster index counted for each edge of each tour
+        self._edge_clusters = self._compute_edge_clusters()
+
+        #: The time each tour's MDC takes for each hop of its tour (see
+        #: _compute_hop_times()). The MDC speeds are only known once the
+        #: simulation has run, so this is filled in on first use.
+        self._hop_times = None
 
     def _compute_adjacency_matrix(self):
         """
@@ -43,6 +56,7 @@ class FOCUSMovementModel(object):
                 seg = clust.tour.objects[seg_vertex]
                 if seg not in self._segment_indexes:
                     self._segment_indexes[seg] = i
+                    self._segments.append(seg)
                     i += 1
 
         # First we need to get the total number of segments and relay nodes so
@@ -51,51 +65,102 @@ class FOCUSMovementModel(object):
         # rendezvous point per cluster, we can just use the number of clusters.
 
         node_count = len(self.sim.segments)
-        g_sparse = np.zeros((node_count, node_count), dtype=float)
-        g_sparse[:] = np.inf
+        tours = [c.tour for c in self.sim.clusters]
+        return paths.tour_graph(tours, self._segment_indexes, node_count)
 
-        for clust in self.sim.clusters:
-            cluster_tour = clust.tour
-            i = len(cluster_tour.vertices) - 1
-            j = 0
-            while j < len(cluster_tour.vertices):
-                start_vertex = cluster_tour.vertices[i]
-                stop_vertex = cluster_tour.vertices[j]
+    def _compute_paths(self):
+        """
+        Set up shortest path queries over the tours of the simulation. Only
+        the junctions shared between tours need an all-pairs search (see
+        core.paths.TourPaths).
 
-                start_pt = cluster_tour.collection_points[start_vertex]
-                stop_pt = cluster_tour.collection_points[stop_vertex]
-                distance = np.linalg.norm(stop_pt - start_pt)
+        :return: The shortest paths over adjacency matrix self._adj_mat
+        :rtype: core.paths.TourPaths
+        """
 
-                start_seg = cluster_tour.objects[start_vertex]
-                stop_seg = cluster_tour.objects[stop_vertex]
+        tours = [c.tour for c in self.sim.clusters]
+        cycles = paths.tour_cycles(tours, self._segment_indexes)
+        return paths.TourPaths(self._adj_mat, cycles)
 
-                start_index = self._segment_indexes[start_seg]
-                stop_index = self._segment_indexes[stop_seg]
+    def _compute_edge_clusters(self):
+        """
+        Work out which cluster (if any) a path is counted as passing through
+        when it uses each edge of the tour graph.
 
-                g_sparse[start_index, stop_index] = distance
+        :return: The cluster index of each tour edge (see
+                 core.paths.edge_clusters())
+        :rtype: list(np.array)
+        """
 
-                i = j
-                j += 1
+        memberships = collections.defaultdict(list)
+        for cluster_index, cluster in enumerate(self.sim.clusters):
+            for seg in set(cluster.tour.objects):
+                if seg in self._segment_indexes:
+                    memberships[self._segment_indexes[seg]].append(
+                        cluster_index)
 
-        g_sparse = sp.csgraph_from_dense(g_sparse, null_value=np.inf)
-        return g_sparse
+        tours = [c.tour for c in self.sim.clusters]
+        cycles = paths.tour_cycles(tours, self._segment_indexes)
+        return paths.edge_clusters(cycles, memberships)
 
-    def _compute_paths(self):
+    def distance_matrix(self, segments):
         """
-        Run Dijkstra's algorithm over the adjacency matrix for the paths
-        produced by the simulation.
+        Get the shortest distances between every pair of the given segments.
 
-        :return: The distance matrix based on adjacency matrix self._adj_mat
+        :param segments:
+        :type segments: list(core.segment.Segment)
+        :return: An N x N matrix where entry [i, j] is the shortest distance
+                 from segments[i] to segments[j]
         :rtype: np.array
         """
 
-        distance_mat, preds = sp.dijkstra(self._adj_mat, directed=True,
-                                          return_predecessors=True)
-        # assert not np.any(np.isinf(distance_mat))
-        if np.any(np.isinf(distance_mat)):
-            logger.debug("Found inf distance!!")
+        indexes = [self._segment_indexes[seg] for seg in segments]
+        return self._paths.distance_matrix(indexes)
+
+    def distance(self, begin, end):
+        """
+        Get the shortest distance between any two segments.
+
+        :param begin:
+        :type begin: core.segment.Segment
+        :param end:
+        :type end: core.segment.Segment
+        :return: The distance
+        :rtype: float
+        """
+
+        distance = self._paths.distance(self._segment_indexes[begin],
+                                        self._segment_indexes[end])
+        # distance *= pq.meter
+
+        return distance
+
+    def shortest_path(self, begin, end):
+        """
+        Lazily yield the segments along the path found by
+        shortest_distance(), so callers that only look at part of the path
+        (or at none of it) do not pay to build it.
+
+        :param begin:
+        :type begin: core.segment.Segment
+        :param end:
+        :type end: core.segment.Segment
+        :return: The segments along the path
+        :rtype: iterator(core.segment.Segment)
+        """
+
+        # As in the predecessor walk this replaces, the path is the shortest
+        # route from end back to begin, listed starting from begin.
+        route = self._paths.path(self._segment_indexes[end],
+                                 self._segment_indexes[begin], reverse=True)
+
+        found = False
+        for index in route:
+            found = True
+            yield self._segments[index]
 
-        return distance_mat, preds
+        if not found:
+            yield begin
 
     def shortest_distance(self, begin, end):
         """
@@ -105,25 +170,106 @@ class FOCUSMovementModel(object):
         :type begin: core.segment.Segment
         :param end:
         :type end: core.segment.Segment
-        :return: float, list(int)
+        :return: float, list(core.segment.Segment)
         """
 
-        begin_index = self._segment_indexes[begin]
-        end_index = self._segment_indexes[end]
+        return self.distance(begin, end), list(self.shortest_path(begin, end))
 
-        distance = self._distance_mat[begin_index, end_index]
-        # distance *= pq.meter
+    def _compute_hop_times(self):
+        """
+        Work out the time each tour's MDC takes for every hop of its tour.
+        Hops are measured between segment locations.
+
+        :return: For each tour, the time its MDC takes to travel from each
+                 stop to the next one
+        :rtype: list(np.array)
+        """
+
+        tours = [c.tour for c in self.sim.clusters]
+        cycles = paths.tour_cycles(tours, self._segment_indexes)
+
+        hop_times = list()
+        for cluster, cycle in zip(self.sim.clusters, cycles):
+            locations = np.array([self._segments[i].location.nd
+                                  for i in cycle])
+            lengths = np.linalg.norm(
+                np.roll(locations, -1, axis=0) - locations, axis=1)
+
+            if np.all(np.isclose(cluster.mdc_speed, 0.)):
+                hop_times.append(np.zeros(len(lengths)))
+            else:
+                hop_times.append(lengths / cluster.mdc_speed)
+
+        return hop_times
+
+    def _hop_time_tables(self):
+        """
+        :return: For each tour, the time its MDC takes to travel from each
+                 stop to the next one (see _compute_hop_times())
+        :rtype: list(np.array)
+        """
+        if self._hop_times is None:
+            self._hop_times = self._compute_hop_times()
+
+        return self._hop_times
+
+    def travel_time(self, begin, end):
+        """
+        Find the time spent travelling along the shortest path between two
+        segments. Each hop of the path is travelled at the speed of the MDC
+        whose tour it is on. The path itself is never built.
+
+        :param begin:
+        :type begin: core.segment.Segment
+        :param end:
+        :type end: core.segment.Segment
+        :return: The travel time
+        :rtype: pq.second
+        """
 
-        path = [begin]
-        inv_index = {v: k for k, v in self._segment_indexes.items()}
-        while True:
-            next_index = self._preds[end_index, begin_index]
-            if next_index == -9999:
-                break
+        # The path runs from end back to begin (see shortest_path())
+        hop_times = self._paths.edge_values(self._segment_indexes[end],
+                                            self._segment_indexes[begin],
+                                            self._hop_time_tables())
+        return np.sum(hop_times)
 
-            begin_index = next_index
+    def travel_time_matrix(self, segments):
+        """
+        Find the travel time (see travel_time()) between every pair of the
+        given segments. The times come from running sums along the tours, so
+        neither the paths nor their hops are listed one pair at a time.
+
+        :param segments:
+        :type segments: list(core.segment.Segment)
+        :return: An N x N matrix where entry [i, j] is the travel time from
+                 segments[i] to segments[j]
+        :rtype: np.array
+        """
+
+        indexes = [self._segment_indexes[seg] for seg in segments]
+
+        # The path runs from end back to begin (see shortest_path())
+        return self._paths.sum_matrix(indexes, self._hop_time_tables()).T
+
+    def path_cluster_matrix(self, segments):
+        """
+        Find the clusters passed through by the shortest path between every
+        pair of the given segments, as tables. Routes between relay points
+        are only followed once per pair of relays.
+
+        :param segments:
+        :type segments: list(core.segment.Segment)
+        :return: An N x N x K matrix where entry [i, j, k] is True if the
+                 path from segments[i] to segments[j] passes through
+                 sim.clusters[k], and an N x N matrix of the index of the
+                 first cluster on each path (or -1 if there is none)
+        :rtype: (np.array, np.array)
+        """
 
-            seg = inv_index[next_index]
-            path.append(seg)
+        indexes = [self._segment_indexes[seg] for seg in segments]
+        present, last = self._paths.label_matrix(
+            indexes, self._edge_clusters, len(self.sim.clusters))
 
-        return distance, path
+        # The path runs from end back to begin (see shortest_path()), so the
+        # last cluster met along the route is the first one on the path.
+        return present.transpose(1, 0, 2), last.T
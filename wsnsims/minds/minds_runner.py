@@ -1,13 +1,11 @@
-import itertools
 import logging
 
 import numpy as np
 
-import ordered_set as orderedset
+from wsnsims.core import delay
 from wsnsims.minds.energy import MINDSEnergyModel
 from wsnsims.minds.movement import MINDSMovementModel
 
-from wsnsims.core import data
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +27,13 @@ class MINDSRunner(object):
         self.movement_model = MINDSMovementModel(self.sim, self.env)
         self.energy_model = MINDSEnergyModel(self.sim, self.env)
 
+        #: Cached all-pairs delay matrix (see delay_matrix())
+        self._delays = None
+
+        #: Cached per-pair transmission counts and holding times (see
+        #: path_tables())
+        self._path_tables = None
+
     def print_all_distances(self):
         """
         For debugging, iterate over all segments and print the tour distances
@@ -47,91 +52,110 @@ class MINDSRunner(object):
 
         self.sim.show_state()
 
-    def maximum_communication_delay(self):
+    def delay_matrix(self):
         """
-        Compute the average communication delay across all segments.
+        Compute the communication delay between every pair of segments at
+        once. Entry [i, j] is the delay from segment i to segment j (in the
+        order of sim.segments), and matches communication_delay(). The
+        diagonal is meaningless.
 
-        :return: The delay time in seconds
-        :rtype: pq.quantity.Quantity
+        Travel comes from the shortest distance matrix, while the
+        transmission count and holding time come from path_tables().
+
+        :return: An N x N matrix of delays in seconds
+        :rtype: np.array
         """
 
-        segment_pairs = itertools.permutations(self.sim.segments, 2)
+        if self._delays is not None:
+            return self._delays
 
-        delays = []
-        for src, dst in segment_pairs:
-            delay = self.communication_delay(src, dst)
-            delays.append(delay)
+        segments = self.sim.segments
+        travel_delay = self.movement_model.distance_matrix(segments)
+        travel_delay /= self.env.mdc_speed
 
-        delays = np.array(delays)
-        max_delay = np.max(delays)
-        # max_delay *= pq.second
+        counts, relay_delay = self.path_tables()
 
-        return max_delay
+        traffic = self.sim.traffic
+        volumes = traffic.volumes[np.ix_(traffic.indexes(segments),
+                                         traffic.indexes(segments))]
 
-    def segment_clusters(self, segment):
+        transmission_delay = counts * volumes
+        transmission_delay /= self.env.comms_rate
+
+        self._delays = travel_delay + transmission_delay + relay_delay
+        return self._delays
+
+    def path_tables(self):
         """
+        Tabulate the number of clusters on the path between every pair of
+        segments (its transmission count), and the time the data is held by
+        the clusters after the first. The clusters on each path come from the
+        movement model for all pairs at once, so both are then simple table
+        lookups. Entry [i, j] is for the path from segment i to segment j (in
+        the order of sim.segments).
 
-        :param segment:
-        :type segment: core.segment.Segment
-        :return:
-        :rtype: list(core.cluster.BaseCluster)
+        :return: The N x N transmission counts and holding times
+        :rtype: (np.array, np.array)
         """
-        clusters = list()
-        for cluster in self.sim.clusters:
-            if segment in cluster.tour.objects:
-                clusters.append(cluster)
 
-        return clusters
+        if self._path_tables is not None:
+            return self._path_tables
 
-    def count_clusters(self, path):
-        """
+        present, first = self.movement_model.path_cluster_matrix(
+            self.sim.segments)
+        counts = np.sum(present, axis=2)
 
-        :param path:
-        :type path: list(core.segment.Segment)
-        :return:
-        :rtype: list(core.cluster.BaseCluster)
-        """
-        path_clusters = list()
-        current_segment = path[0]
-        for next_segment in path[1:]:
+        tour_times = np.array([self.tour_time(c) for c in self.sim.clusters])
+        rows, columns = np.nonzero(first >= 0)
+        present[rows, columns, first[rows, columns]] = False
+        holding_times = np.dot(present, tour_times)
+
+        self._path_tables = counts, holding_times
+        return self._path_tables
 
-            current_clusters = self.segment_clusters(current_segment)
-            next_clusters = self.segment_clusters(next_segment)
+    def maximum_communication_delay(self):
+        """
+        Compute the maximum communication delay across all segments.
 
-            if len(current_clusters) > 1 and len(next_clusters) > 1:
-                # Both are on relay points, so the current_segment cluster must
-                # be the common one between them.
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
 
-                for cluster in current_clusters:
-                    if cluster in next_clusters:
-                        path_clusters.append(cluster)
-                        break
+        max_delay = np.max(delay.pair_delays(self.delay_matrix()))
+        # max_delay *= pq.second
 
-            elif len(current_clusters) > 1:
-                # The current_segment segment is on a relay point. In this
-                # case, the next_segment segment is not on a relay point, so
-                # we can just use that.
+        return max_delay
 
-                path_clusters.append(next_clusters[0])
+    def average_communication_delay(self):
+        """
+        Compute the average communication delay across all segments.
 
-            elif len(next_clusters) > 1:
-                # The next_segment segment is on a relay point. In this case,
-                # the current_segment segment is only in one cluster, so we
-                # just use that.
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.mean(delay.pair_delays(self.delay_matrix()))
 
-                path_clusters.append(current_clusters[0])
+    def communication_delay_percentile(self, percentile):
+        """
+        Compute a percentile of the communication delays across all segments.
 
-            else:
-                # Neither segments are relay points, just use the
-                # current_segment cluster
-                pass
+        :param percentile: The percentile to compute, between 0 and 100
+        :type percentile: float
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.percentile(delay.pair_delays(self.delay_matrix()),
+                             percentile)
 
-            # Move current_segment to the next_segment segment
-            current_segment = next_segment
+    def segment_clusters(self, segment):
+        """
 
-        # Remove any duplicates
-        path_clusters = list(orderedset.OrderedSet(path_clusters))
-        return path_clusters
+        :param segment:
+        :type segment: core.segment.Segment
+        :return:
+        :rtype: list(core.cluster.BaseCluster)
+        """
+        return self.sim.membership.clusters_of(segment)
 
     def communication_delay(self, begin, end):
         """
@@ -147,32 +171,22 @@ class MINDSRunner(object):
         :rtype: pq.second
         """
 
-        duration, path = self.movement_model.shortest_distance(begin, end)
+        duration = self.movement_model.distance(begin, end)
         travel_delay = duration / self.env.mdc_speed
 
-        path_clusters = self.count_clusters(path)
+        counts, holding_times = self.path_tables()
+        i = begin.index
+        j = end.index
 
-        transmission_delay = len(path_clusters)
-        transmission_delay *= data.segment_volume(begin, end, self.env)
+        transmission_delay = counts[i, j]
+        transmission_delay *= self.sim.traffic.volume(begin, end)
         transmission_delay /= self.env.comms_rate
 
-        relay_delay = self.holding_time(path_clusters[1:])
+        relay_delay = holding_times[i, j]
 
         total_delay = travel_delay + transmission_delay + relay_delay
         return total_delay
 
-    def holding_time(self, clusters):
-        """
-
-        :param clusters:
-        :type clusters: list(BaseCluster)
-        :return:
-        :rtype: pq.second
-        """
-
-        latency = np.sum([self.tour_time(c) for c in clusters])  # * pq.second
-        return latency
-
     def tour_time(self, cluster):
         """
 
@@ -184,7 +198,8 @@ class MINDSRunner(object):
 
         travel_time = cluster.tour_length / self.env.mdc_speed
 
-        data_volume = self.energy_model.cluster_data_volume(cluster.cluster_id)
+        volumes = self.energy_model.all_cluster_volumes()
+        data_volume = volumes[self.sim.membership.index(cluster)]
         transmit_time = data_volume / self.env.comms_rate
 
         total_time = travel_time + transmit_time
@@ -219,11 +234,8 @@ class MINDSRunner(object):
 
     def max_buffer_size(self):
 
-        data_volumes = list()
-        for cluster in self.sim.clusters:
-            volume = self.energy_model.cluster_data_volume(
-                cluster.cluster_id, intercluster_only=True)
-            data_volumes.append(volume)
+        data_volumes = self.energy_model.all_cluster_volumes(
+            intercluster_only=True)
 
         max_data_volume = np.max(data_volumes) # * pq.bit
         return max_data_volume
@@ -7,6 +7,9 @@ import scipy.sparse.csgraph as sp
 from scipy.sparse import csr_matrix
 
 from wsnsims.core import cluster
+from wsnsims.core import data
+from wsnsims.core import membership
+from wsnsims.core import positions
 from wsnsims.core import segment
 from wsnsims.core.environment import Environment
 from wsnsims.minds import minds_runner
@@ -24,12 +27,32 @@ class MINDS(object):
         self.env = environment
         locs = np.random.rand(self.env.segment_count, 2) * self.env.grid_height
         self.segments = [segment.Segment(nd) for nd in locs]
+        self.positions = positions.PositionStore(self.segments)
 
         for i, seg in enumerate(self.segments):
             seg.segment_id = i
 
+        self.traffic = data.TrafficMatrix(self.segments, self.env)
+
         self.clusters = []
 
+        #: Cluster membership lookups (see the membership property)
+        self._membership = None
+
+    @property
+    def membership(self):
+        """
+        The membership index over the current clusters. It is rebuilt
+        whenever the list of clusters changes, and otherwise kept up to date
+        by the clusters themselves.
+
+        :return: The index over sim.clusters
+        :rtype: core.membership.MembershipIndex
+        """
+        self._membership = membership.refresh(self._membership,
+                                              self.clusters)
+        return self._membership
+
     def show_state(self):
         fig = plt.figure()
         ax = fig.add_subplot(111)
@@ -1,3 +1,5 @@
+import collections
+import heapq
 import itertools
 import logging
 
@@ -136,6 +138,76 @@ def combine_clusters(clusters, centroid):
     return new_clusters
 
 
+def agglomerate_clusters(clusters, centroid, cluster_count):
+    """
+    Repeatedly combine the cheapest pair of clusters until fewer than
+    cluster_count remain. This produces the same result as calling
+    combine_clusters() in a loop, but every pair is only scored once. The
+    pair costs are kept in a heap, and after each merge only the pairs
+    involving the new cluster are scored. The tour of each cluster merged
+    with the centroid (the baseline of its combination cost) is also only
+    computed once.
+
+    :param clusters: The initial clusters
+    :type clusters: list(core.cluster.BaseCluster)
+    :param centroid: The central cluster
+    :type centroid: core.cluster.BaseCluster
+    :param cluster_count: Stop once there are fewer clusters than this
+    :type cluster_count: int
+    :return: The combined clusters
+    :rtype: list(core.cluster.BaseCluster)
+    """
+
+    # Clusters are numbered in list order, with new clusters appended to the
+    # end, just as combine_clusters() does. Breaking cost ties on these
+    # numbers matches the itertools.combinations() order used there.
+    sequence = itertools.count()
+    alive = collections.OrderedDict()
+    baselines = dict()
+    heap = list()
+
+    def score(index_i, index_j):
+        c_i = alive[index_i]
+        c_j = alive[index_j]
+
+        if index_i not in baselines:
+            baselines[index_i] = c_i.merge(centroid).tour_length
+
+        tc_1 = c_i.merge(c_j).merge(centroid)
+        combination_cost = tc_1.tour_length - baselines[index_i]
+        heapq.heappush(heap, (combination_cost, index_i, index_j))
+
+    for clust in clusters:
+        alive[next(sequence)] = clust
+
+    for index_i, index_j in itertools.combinations(alive.keys(), 2):
+        score(index_i, index_j)
+
+    while len(alive) >= cluster_count:
+        cost, index_i, index_j = heapq.heappop(heap)
+        if index_i not in alive or index_j not in alive:
+            # One of the pair has already been merged away
+            continue
+
+        c_i = alive.pop(index_i)
+        c_j = alive.pop(index_j)
+        baselines.pop(index_i, None)
+        baselines.pop(index_j, None)
+        logger.debug("Combining %s and %s (Cost: %f)", c_i, c_j, cost)
+
+        new_cluster = c_i.merge(c_j)
+        for node in new_cluster.nodes:
+            node.cluster_id = new_cluster.cluster_id
+
+        new_index = next(sequence)
+        others = list(alive.keys())
+        alive[new_index] = new_cluster
+        for index in others:
+            score(index, new_index)
+
+    return list(alive.values())
+
+
 class RelayNode(object):
     def __init__(self, position):
         self.location = point.Vec2(position)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from wsnsims.core import segment
+from wsnsims.core.environment import Environment
+from wsnsims.tocs.cluster import ToCSCentroid, ToCSCluster
+from wsnsims.tocs.cluster import agglomerate_clusters, combine_clusters
+
+
+def _singletons(env, locations):
+    clusters = list()
+    for nd in locations:
+        clust = ToCSCluster(env)
+        clust.add(segment.Segment(nd))
+        clusters.append(clust)
+    return clusters
+
+
+def test_agglomeration_matches_repeated_combination():
+    env = Environment()
+    np.random.seed(6)
+    locations = np.random.rand(20, 2) * env.grid_height
+    centroid = ToCSCentroid(env)
+
+    combined = _singletons(env, locations)
+    while len(combined) >= env.mdc_count:
+        combined = combine_clusters(combined, centroid)
+
+    agglomerated = _singletons(env, locations)
+    agglomerated = agglomerate_clusters(agglomerated, centroid, env.mdc_count)
+
+    def labels(clusters):
+        return [[tuple(seg.location.nd) for seg in c.segments]
+                for c in clusters]
+
+    expected = labels(combined)
+    actual = labels(agglomerated)
+    assert actual == expected
+    assert len(actual) == env.mdc_count - 1
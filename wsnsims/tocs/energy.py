@@ -1,9 +1,5 @@
-import itertools
-
 import numpy as np
 
-from wsnsims.core.data import segment_volume
-
 
 class ToCSEnergyModelError(Exception):
     pass
@@ -22,82 +18,113 @@ class ToCSEnergyModel(object):
         self.sim = simulation_data
         self.env = environment
 
-        self._ids_to_clusters = {}
         self._ids_to_movement_energy = {}
         self._ids_to_comms_energy = {}
 
-    def cluster_data_volume(self, cluster_id, intercluster_only=False):
-        """
+        #: Cached results of all_cluster_volumes(), by intercluster_only
+        self._volumes = {}
 
-        :param cluster_id:
-        :param intercluster_only:
-        :return:
-        :rtype: pq.bit
+    def all_cluster_volumes(self, intercluster_only=False):
+        """
+        Compute the data volume handled by every cluster in one pass over the
+        traffic matrix. Each cluster is described by a boolean membership
+        mask over the segments, which turns its intra-cluster, outgoing and
+        incoming traffic into masked block sums. The centroid additionally
+        relays all traffic between (and within) the other clusters, in both
+        directions.
+
+        The result is computed once per value of intercluster_only, as the
+        clusters are fixed by the time the energy model is used.
+
+        :param intercluster_only: Leave out the intra-cluster traffic of the
+                                  non-centroid clusters
+        :type intercluster_only: bool
+        :return: The volumes for sim.clusters, followed by the centroid
+        :rtype: np.array
         """
 
-        cluster = self._find_cluster(cluster_id)
+        intercluster_only = bool(intercluster_only)
+        if intercluster_only in self._volumes:
+            return self._volumes[intercluster_only]
 
-        if not intercluster_only:
-            # Handle the intra-cluster data volume
-            segment_pairs = itertools.permutations(cluster.segments, 2)
-            internal_volume = np.sum(
-                [segment_volume(s, d, self.env) for s, d in segment_pairs])
-        else:
-            internal_volume = 0
+        traffic = self.sim.traffic
+        clusters = self.sim.clusters + [self.sim.centroid]
 
-        # Handle the inter-cluster data volume
+        members = np.zeros((len(clusters), len(traffic.segments)), dtype=bool)
+        for i, clust in enumerate(clusters):
+            members[i, traffic.indexes(clust.segments)] = True
 
-        external_segments = list(
-            set(self.sim.segments) - set(cluster.segments))
-        # Outgoing data ...
-        segment_pairs = list(
-            itertools.product(cluster.segments, external_segments))
+        # Self traffic only counts when relayed through the centroid
+        volumes = np.copy(traffic.volumes)
+        np.fill_diagonal(volumes, 0.)
 
-        # Incoming data ...
-        segment_pairs += list(
-            itertools.product(external_segments, cluster.segments))
-        external_volume = np.sum(
-            [segment_volume(s, d, self.env) for s, d in segment_pairs])
+        weights = members.astype(float)
+        sent = weights.dot(volumes)
+        received = weights.dot(volumes.T)
 
-        total_volume = internal_volume + external_volume
-        return total_volume
+        internal = np.sum(sent, axis=1, where=members)
+        outgoing = np.sum(sent, axis=1, where=~members)
+        incoming = np.sum(received, axis=1, where=~members)
 
-    def centroid_data_volume(self, cluster_id):
+        cluster_volumes = outgoing + incoming
+        if not intercluster_only:
+            cluster_volumes[:-1] += internal[:-1]
+
+        in_clusters = np.sum(weights[:-1], axis=0)
+        relayed = 2. * in_clusters.dot(traffic.volumes).dot(in_clusters)
+        cluster_volumes[-1] = internal[-1] + relayed
+
+        self._volumes[intercluster_only] = cluster_volumes
+        return cluster_volumes
+
+    def cluster_data_volume(self, cluster_id, intercluster_only=False):
         """
 
-        :param cluster_id:
+        :param cluster_id: The id of a non-centroid cluster
+        :param intercluster_only:
         :return:
         :rtype: pq.bit
+        :raises ToCSEnergyModelError: If cluster_id is the centroid's
         """
 
-        centroid = self._find_cluster(cluster_id)
+        index = self._cluster_index(cluster_id, centroid=False)
+        return self.all_cluster_volumes(intercluster_only)[index]
+
+    def centroid_data_volume(self, cluster_id):
+        """
 
-        # Handle the intra-centroid data volume
-        segment_pairs = itertools.permutations(centroid.segments, 2)
-        volume = np.sum(
-            [segment_volume(s, d, self.env) for s, d in segment_pairs])
+        :param cluster_id: The id of the centroid
+        :return:
+        :rtype: pq.bit
+        :raises ToCSEnergyModelError: If cluster_id is not the centroid's
+        """
 
-        cluster_pairs = list()
-        # Handle the incoming volume from each cluster
-        for cluster in self.sim.clusters:
+        index = self._cluster_index(cluster_id, centroid=True)
+        return self.all_cluster_volumes()[index]
 
-            other_clusters = list(self.sim.clusters)
-            for other_cluster in other_clusters:
-                # Cluster -> Other Cluster
-                cluster_pairs.append((cluster, other_cluster))
+    def _cluster_index(self, cluster_id, centroid):
+        """
 
-                # Other Cluster -> Cluster
-                cluster_pairs.append((other_cluster, cluster))
+        :param cluster_id:
+        :param centroid: Whether cluster_id is expected to be the centroid's
+        :type centroid: bool
+        :return: The position of the cluster in sim.clusters, or
+                 len(sim.clusters) for the centroid
+        :rtype: int
+        :raises ToCSEnergyModelError: If the cluster is (or is not) the
+                                      centroid against expectations
+        """
 
-        for src_cluster, dst_cluster in cluster_pairs:
-            src_segments = src_cluster.segments
-            dst_segments = dst_cluster.segments
+        cluster = self._find_cluster(cluster_id)
+        if (cluster == self.sim.centroid) != centroid:
+            raise ToCSEnergyModelError(
+                "Cluster {} is {}the centroid".format(
+                    cluster_id, "not " if centroid else ""))
 
-            segment_pairs = itertools.product(src_segments, dst_segments)
-            volume += np.sum(
-                [segment_volume(s, d, self.env) for s, d in segment_pairs])
+        if centroid:
+            return len(self.sim.clusters)
 
-        return volume
+        return self.sim.membership.index(cluster)
 
     def total_comms_energy(self, cluster_id):
 
@@ -121,20 +148,11 @@ class ToCSEnergyModel(object):
         :return:
         :rtype: tocs.cluster.ToCSCluster
         """
-        if cluster_id in self._ids_to_clusters:
-            return self._ids_to_clusters[cluster_id]
-
-        found_cluster = None
-        for clust in self.sim.clusters + [self.sim.centroid]:
-            if clust.cluster_id == cluster_id:
-                found_cluster = clust
-                break
-
+        found_cluster = self.sim.membership.find(cluster_id)
         if not found_cluster:
             raise ToCSEnergyModelError(
                 "Could not find cluster {}".format(cluster_id))
 
-        self._ids_to_clusters[cluster_id] = found_cluster
         return found_cluster
 
     def total_movement_energy(self, cluster_id):
@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from wsnsims.core import data
+from wsnsims.core import membership
+from wsnsims.core import segment
+from wsnsims.core.environment import Environment
+from wsnsims.tocs.cluster import ToCSCentroid, ToCSCluster
+from wsnsims.tocs.energy import ToCSEnergyModel, ToCSEnergyModelError
+
+
+class _Simulation(object):
+    def __init__(self, env):
+        np.random.seed(11)
+        locs = np.random.rand(12, 2) * env.grid_height
+        self.segments = [segment.Segment(nd) for nd in locs]
+        self.traffic = data.TrafficMatrix(self.segments, env)
+
+        self.clusters = list()
+        for members in (self.segments[:4], self.segments[4:9]):
+            clust = ToCSCluster(env)
+            for seg in members:
+                clust.add(seg)
+            self.clusters.append(clust)
+
+        self.centroid = ToCSCentroid(env)
+        for seg in self.segments[9:]:
+            self.centroid.add_segment(seg)
+
+        self.membership = membership.MembershipIndex(
+            self.clusters + [self.centroid])
+
+
+def _pair_sum(traffic, pairs):
+    return sum(traffic.volume(src, dst) for src, dst in pairs)
+
+
+def test_all_cluster_volumes_match_pairwise_sums():
+    env = Environment()
+    sim = _Simulation(env)
+    model = ToCSEnergyModel(sim, env)
+    traffic = sim.traffic
+
+    for intercluster_only in (False, True):
+        volumes = model.all_cluster_volumes(intercluster_only)
+
+        for clust, volume in zip(sim.clusters, volumes):
+            external = [s for s in sim.segments if s not in clust.segments]
+            expected = _pair_sum(
+                traffic, itertools.product(clust.segments, external))
+            expected += _pair_sum(
+                traffic, itertools.product(external, clust.segments))
+            if not intercluster_only:
+                expected += _pair_sum(
+                    traffic, itertools.permutations(clust.segments, 2))
+
+            assert np.isclose(volume, expected)
+
+        relayed = [s for c in sim.clusters for s in c.segments]
+        expected = _pair_sum(
+            traffic, itertools.permutations(sim.centroid.segments, 2))
+        expected += 2 * _pair_sum(
+            traffic, itertools.product(relayed, relayed))
+        assert np.isclose(volumes[-1], expected)
+
+
+def test_single_cluster_volumes_come_from_the_vector():
+    env = Environment()
+    sim = _Simulation(env)
+    model = ToCSEnergyModel(sim, env)
+
+    volumes = model.all_cluster_volumes()
+    assert model.cluster_data_volume(sim.clusters[1].cluster_id) == volumes[1]
+    assert model.centroid_data_volume(sim.centroid.cluster_id) == volumes[-1]
+
+
+def test_volumes_reject_the_wrong_kind_of_cluster():
+    env = Environment()
+    sim = _Simulation(env)
+    model = ToCSEnergyModel(sim, env)
+
+    with pytest.raises(ToCSEnergyModelError):
+        model.cluster_data_volume(sim.centroid.cluster_id)
+
+    with pytest.raises(ToCSEnergyModelError):
+        model.centroid_data_volume(sim.clusters[0].cluster_id)
@@ -1,8 +1,6 @@
 import logging
 
-import numpy as np
-
-import scipy.sparse.csgraph as sp
+from wsnsims.core import paths
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +22,8 @@ class ToCSMovementModel(object):
         #: Cached version of the adjacency matrix. Weights are path lengths.
         self._adj_mat = self._compute_adjacency_matrix()
 
-        self._distance_mat = self._compute_paths()
+        #: Shortest path queries over the tour graph
+        self._paths = self._compute_paths()
 
     def _compute_adjacency_matrix(self):
         """
@@ -51,50 +50,36 @@ class ToCSMovementModel(object):
         # rendezvous point per cluster, we can just use the number of clusters.
 
         node_count = len(self.sim.segments) + len(self.sim.clusters)
-        g_sparse = np.zeros((node_count, node_count), dtype=float)
-        g_sparse[:] = np.inf
-
-        for clust in self.sim.clusters + [self.sim.centroid]:
-            cluster_tour = clust.tour
-            i = len(cluster_tour.vertices) - 1
-            j = 0
-            while j < len(cluster_tour.vertices):
-                start_vertex = cluster_tour.vertices[i]
-                stop_vertex = cluster_tour.vertices[j]
-
-                start_pt = cluster_tour.collection_points[start_vertex]
-                stop_pt = cluster_tour.collection_points[stop_vertex]
-                distance = np.linalg.norm(stop_pt - start_pt)
-
-                start_seg = cluster_tour.objects[start_vertex]
-                stop_seg = cluster_tour.objects[stop_vertex]
-
-                start_index = self._segment_indexes[start_seg]
-                stop_index = self._segment_indexes[stop_seg]
+        tours = [c.tour for c in self.sim.clusters + [self.sim.centroid]]
+        return paths.tour_graph(tours, self._segment_indexes, node_count)
 
-                g_sparse[start_index, stop_index] = distance
+    def _compute_paths(self):
+        """
+        Set up shortest path queries over the tours of the simulation. Only
+        the junctions shared between tours need an all-pairs search (see
+        core.paths.TourPaths).
 
-                i = j
-                j += 1
+        :return: The shortest paths over adjacency matrix self._adj_mat
+        :rtype: core.paths.TourPaths
+        """
 
-        g_sparse = sp.csgraph_from_dense(g_sparse, null_value=np.inf)
-        return g_sparse
+        tours = [c.tour for c in self.sim.clusters + [self.sim.centroid]]
+        cycles = paths.tour_cycles(tours, self._segment_indexes)
+        return paths.TourPaths(self._adj_mat, cycles)
 
-    def _compute_paths(self):
+    def distance_matrix(self, segments):
         """
-        Run Dijkstra's algorithm over the adjacency matrix for the paths
-        produced by the simulation.
+        Get the shortest distances between every pair of the given segments.
 
-        :return: The distance matrix based on adjacency matrix self._adj_mat
+        :param segments:
+        :type segments: list(core.segment.Segment)
+        :return: An N x N matrix where entry [i, j] is the shortest distance
+                 from segments[i] to segments[j]
         :rtype: np.array
         """
 
-        distance_mat = sp.dijkstra(self._adj_mat, directed=True)
-        # assert not np.any(np.isinf(distance_mat))
-        if np.any(np.isinf(distance_mat)):
-            logger.debug("Found inf distance!!")
-
-        return distance_mat
+        indexes = [self._segment_indexes[seg] for seg in segments]
+        return self._paths.distance_matrix(indexes)
 
     def shortest_distance(self, begin, end):
         """
@@ -110,6 +95,6 @@ class ToCSMovementModel(object):
         begin_index = self._segment_indexes[begin]
         end_index = self._segment_indexes[end]
 
-        distance = self._distance_mat[begin_index, end_index]
+        distance = self._paths.distance(begin_index, end_index)
         # distance *= pq.meter
         return distance
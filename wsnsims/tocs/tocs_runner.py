@@ -1,6 +1,6 @@
 import numpy as np
 
-from wsnsims.core import data
+from wsnsims.core import delay
 from wsnsims.tocs.energy import ToCSEnergyModel
 
 from wsnsims.tocs.movement import ToCSMovementModel
@@ -26,28 +26,86 @@ class ToCSRunner(object):
         self.movement_model = ToCSMovementModel(self.sim, self.env)
         self.energy_model = ToCSEnergyModel(self.sim, self.env)
 
+        #: Cached all-pairs delay matrix (see delay_matrix())
+        self._delays = None
+
+        #: Cached per-cluster timings (see tour_times() and holding_times())
+        self._tour_times = None
+        self._holding_times = None
+
+        #: Maps cluster IDs to their positions in sim.clusters + [centroid]
+        self._cluster_indexes = None
+
+    def delay_matrix(self):
+        """
+        Compute the communication delay between every pair of segments at
+        once. Entry [i, j] is the delay from segment i to segment j (in the
+        order of sim.segments), and matches communication_delay(). The
+        diagonal is meaningless.
+
+        :return: An N x N matrix of delays in seconds
+        :rtype: np.array
+        """
+
+        if self._delays is not None:
+            return self._delays
+
+        segments = self.sim.segments
+        travel_delay = self.movement_model.distance_matrix(segments)
+        travel_delay /= self.env.mdc_speed
+
+        memberships = [self._cluster_index(seg) for seg in segments]
+        counts = delay.transmission_counts(memberships, len(self.sim.clusters))
+
+        traffic = self.sim.traffic
+        volumes = traffic.volumes[np.ix_(traffic.indexes(segments),
+                                         traffic.indexes(segments))]
+
+        transmission_delay = counts * volumes
+        transmission_delay /= self.env.comms_rate
+
+        memberships = np.array(memberships)
+        relay_delay = self.holding_times()[memberships]
+        relay_delay = np.repeat(relay_delay[:, np.newaxis], len(segments), 1)
+        relay_delay[memberships[:, np.newaxis] == memberships] = 0.
+
+        self._delays = travel_delay + transmission_delay + relay_delay
+        return self._delays
+
     def maximum_communication_delay(self):
         """
-        Compute the average communication delay across all segments.
+        Compute the maximum communication delay across all segments.
 
         :return: The delay time in seconds
         :rtype: pq.quantity.Quantity
         """
 
-        segment_pairs = ((src, dst) for src in self.sim.segments for dst in
-                         self.sim.segments if src != dst)
-
-        delays = []
-        for src, dst in segment_pairs:
-            delay = self.communication_delay(src, dst)
-            delays.append(delay)
-
-        delays = np.array(delays)
-        max_delay = np.max(delays)
+        max_delay = np.max(delay.pair_delays(self.delay_matrix()))
         # max_delay *= pq.second
 
         return max_delay
 
+    def average_communication_delay(self):
+        """
+        Compute the average communication delay across all segments.
+
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.mean(delay.pair_delays(self.delay_matrix()))
+
+    def communication_delay_percentile(self, percentile):
+        """
+        Compute a percentile of the communication delays across all segments.
+
+        :param percentile: The percentile to compute, between 0 and 100
+        :type percentile: float
+        :return: The delay time in seconds
+        :rtype: pq.quantity.Quantity
+        """
+        return np.percentile(delay.pair_delays(self.delay_matrix()),
+                             percentile)
+
     def communication_delay(self, begin, end):
         """
         Compute the communication delay between any two segments. This is done
@@ -74,7 +132,7 @@ class ToCSRunner(object):
             transmission_count = 3
 
         transmission_delay = transmission_count
-        transmission_delay *= data.segment_volume(begin, end, self.env)
+        transmission_delay *= self.sim.traffic.volume(begin, end)
         transmission_delay /= self.env.comms_rate
 
         relay_delay = self.holding_time(begin, end)
@@ -91,13 +149,7 @@ class ToCSRunner(object):
         :rtype: tocs.cluster.ToCSCluster
         """
 
-        cluster_id = seg.cluster_id
-        found_cluster = None
-        for clust in self.sim.clusters + [self.sim.centroid]:
-            if clust.cluster_id == cluster_id:
-                found_cluster = clust
-                break
-
+        found_cluster = self.sim.membership.find(seg.cluster_id)
         if not found_cluster:
             raise ToCSRunnerError("Could not find cluster for {}".format(seg))
 
@@ -117,17 +169,76 @@ class ToCSRunner(object):
         if begin.cluster_id == end.cluster_id:
             return 0.
 
-        begin_cluster = self.find_cluster(begin)
-        centroid_time = self.tour_time(self.sim.centroid)
+        return self.holding_times()[self._cluster_index(begin)]
 
-        latency = centroid_time
-        for cluster in self.sim.clusters:
-            if cluster == begin_cluster:
-                continue
+    def _cluster_index(self, seg):
+        """
+        Find the position of a segment's cluster in sim.clusters, where the
+        centroid comes after all other clusters.
 
-            latency += self.tour_time(cluster)
+        :param seg:
+        :type seg: core.segment.Segment
+        :return:
+        :rtype: int
+        """
+
+        if self._cluster_indexes is None:
+            self._cluster_indexes = dict()
+            clusters = self.sim.clusters + [self.sim.centroid]
+            for i, clust in enumerate(clusters):
+                self._cluster_indexes.setdefault(clust.cluster_id, i)
+
+        try:
+            return self._cluster_indexes[seg.cluster_id]
+        except KeyError:
+            raise ToCSRunnerError("Could not find cluster for {}".format(seg))
 
-        return latency
+    def tour_times(self):
+        """
+        Get the tour time of every cluster, computing them on first use.
+
+        :return: The tour times of sim.clusters, followed by the centroid
+        :rtype: np.array
+        """
+
+        if self._tour_times is None:
+            clusters = self.sim.clusters + [self.sim.centroid]
+            lengths = np.array([clust.tour_length for clust in clusters])
+            volumes = self.energy_model.all_cluster_volumes()
+
+            travel_times = lengths / self.env.mdc_speed
+            transmit_times = volumes / self.env.comms_rate
+            self._tour_times = travel_times + transmit_times
+
+        return self._tour_times
+
+    def holding_times(self):
+        """
+        Get the holding time for data leaving each cluster, computing them on
+        first use. Such data waits for the centroid MDC and every other
+        cluster's MDC to complete a tour.
+
+        :return: The holding times for sim.clusters, followed by the centroid
+        :rtype: np.array
+        """
+
+        if self._holding_times is not None:
+            return self._holding_times
+
+        tour_times = self.tour_times()
+        holding_times = list()
+        for i in range(len(tour_times)):
+            latency = tour_times[-1]
+            for j in range(len(self.sim.clusters)):
+                if j == i:
+                    continue
+
+                latency += tour_times[j]
+
+            holding_times.append(latency)
+
+        self._holding_times = np.array(holding_times)
+        return self._holding_times
 
     def tour_time(self, clust):
         """
@@ -180,15 +291,6 @@ class ToCSRunner(object):
 
     def max_buffer_size(self):
 
-        data_volumes = list()
-        for cluster in self.sim.clusters:
-            volume = self.energy_model.cluster_data_volume(
-                cluster.cluster_id, intercluster_only=False)
-            data_volumes.append(volume)
-
-        centroid_volume = self.energy_model.centroid_data_volume(
-            self.sim.centroid.cluster_id)
-        data_volumes.append(centroid_volume)
-
+        data_volumes = self.energy_model.all_cluster_volumes()
         max_data_volume = np.max(data_volumes)
         return max_data_volume
@@ -5,12 +5,15 @@ import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import path as mp
 
+from wsnsims.core import data
 from wsnsims.core import linalg
+from wsnsims.core import membership
+from wsnsims.core import positions
 from wsnsims.core import segment
 from wsnsims.core.comparisons import much_greater_than
 from wsnsims.core.environment import Environment
 from wsnsims.tocs.cluster import ToCSCluster, ToCSCentroid, RelayNode
-from wsnsims.tocs.cluster import combine_clusters
+from wsnsims.tocs.cluster import agglomerate_clusters
 from wsnsims.tocs.tocs_runner import ToCSRunner
 
 logger = logging.getLogger(__name__)
@@ -27,6 +30,8 @@ class TOCS(object):
         self.env = environment
         locs = np.random.rand(self.env.segment_count, 2) * self.env.grid_height
         self.segments = [segment.Segment(nd) for nd in locs]
+        self.positions = positions.PositionStore(self.segments)
+        self.traffic = data.TrafficMatrix(self.segments, self.env)
         self._center = linalg.centroid(locs)
 
         # Create the centroid cluster
@@ -34,6 +39,9 @@ class TOCS(object):
 
         self.clusters = list()  # type: typing.List[ToCSCluster]
 
+        #: Cluster membership lookups (see the membership property)
+        self._membership = None
+
         self._length_threshold = 0.5
 
     @property
@@ -43,6 +51,20 @@ class TOCS(object):
 
         return self.centroid.location.nd
 
+    @property
+    def membership(self):
+        """
+        The membership index over the current clusters. It is rebuilt
+        whenever the list of clusters changes, and otherwise kept up to date
+        by the clusters themselves.
+
+        :return: The index over sim.clusters + [sim.centroid]
+        :rtype: core.membership.MembershipIndex
+        """
+        self._membership = membership.refresh(self._membership,
+                                              self.clusters + [self.centroid])
+        return self._membership
+
     def show_state(self):
         fig = plt.figure()
         ax = fig.add_subplot(111)
@@ -90,8 +112,8 @@ class TOCS(object):
             clust.add(seg)
             self.clusters.append(clust)
 
-        while len(self.clusters) >= self.env.mdc_count:
-            self.clusters = combine_clusters(self.clusters, self.centroid)
+        self.clusters = agglomerate_clusters(self.clusters, self.centroid,
+                                             self.env.mdc_count)
 
     def find_initial_rendezvous_points(self):
         """